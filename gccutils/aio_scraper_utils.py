@@ -0,0 +1,244 @@
+from gccutils.form_state import extract_form_state
+from gccutils.instrumentation import classify_response
+from gccutils.parse_pool import extract_page
+from gccutils.scraper_utils import ScraperUtils
+from gccutils.session_steps import arun_steps
+import asyncio
+import time
+
+try:
+    import httpx
+except ImportError:  # only required by the asyncio scrapers
+    httpx = None
+
+
+class AioScraperUtils(ScraperUtils):
+    """An asyncio counterpart of `ScraperUtils` built on an `httpx.AsyncClient`.
+
+    Every method that sends a request is a coroutine, everything that only inspects
+    the current page (`html`, `form_state`, `prepare_payload`, ...) is shared with
+    `ScraperUtils` and works exactly the same. So are the retries, the recovery of
+    expired sessions and the login, which are written as steps (see `session_steps`)
+    that the coroutines await; only sending a single request and waiting are done here.
+    """
+
+    TRANSPORT_ERRORS = (httpx.TransportError,) if httpx is not None else ()
+
+    def __init__(self, parser=None, partial_postbacks=None, limiter=None, session_store=None,
+                 session_slot='default', retry_policy=None, metrics=None, base_url=None, **client_kwargs):
+        """Constructor
+
+        :param parser: the html parser backend to use, defaults to `ScraperUtils.DEFAULT_PARSER`
+        :param partial_postbacks: whether to use asynchronous postbacks, defaults to `ScraperUtils.PARTIAL_POSTBACKS`
+        :param limiter: an optional `asyncio.Semaphore` bounding the requests in flight, may be shared
+        :param session_store: a `SessionStore` to persist logins in, defaults to `ScraperUtils.SESSION_STORE`
+        :param session_slot: distinguishes the stored sessions of instances logged in as the same user
+        :param retry_policy: the `RetryPolicy` of every request, defaults to `ScraperUtils.RETRY_POLICY`
+        :param metrics: an optional `ScraperMetrics` to report requests, logins and errors to
+        :param base_url: the url of the portal, defaults to `ScraperUtils.BASE_URL`
+        :param client_kwargs: optional arguments for the underlying `httpx.AsyncClient`
+        :raises ImportError: if httpx is not installed
+        """
+
+        if httpx is None:
+            raise ImportError('the asyncio scrapers require httpx, install it with `pip install httpx`')
+
+        super().__init__(parser, partial_postbacks, session_store, session_slot, retry_policy, metrics, base_url)
+        client_kwargs.setdefault('follow_redirects', True)  # matches the behaviour of requests
+        client_kwargs.setdefault('timeout', None)           # the retry policy sets the timeouts per request
+        self.session = httpx.AsyncClient(**client_kwargs)
+        self.limiter = limiter
+
+    def _timeouts(self, policy):
+        """ Returns the timeouts of the next request as an `httpx.Timeout`. """
+
+        connect, read = super()._timeouts(policy)
+        return httpx.Timeout(read, connect=connect, pool=connect)
+
+    async def _sleep(self, seconds):
+        """ Waits between the attempts of a request without blocking the event loop. """
+
+        await asyncio.sleep(seconds)
+
+    @staticmethod
+    def _was_connected(error):
+        """ Tells whether a failed request got as far as a connection, see `ScraperUtils._was_connected`. """
+
+        return not isinstance(error, (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout))
+
+    async def _request(self, method, url, **kwargs):
+        """ Sends a single request, waiting for the limiter and concurrency controller if there are any. """
+
+        controller = self.controller
+        if controller is None:
+            return await self._send_limited(method, url, **kwargs)
+
+        await controller.acquire(self.remaining_time())
+        start = time.monotonic()
+        failed = True
+        try:
+            response = await self._send_limited(method, url, **kwargs)
+            failed = response.status_code == 429 or response.status_code >= 500
+            return response
+        except asyncio.CancelledError:
+            failed = False  # stopped by the manager, which says nothing about the server
+            raise
+        finally:
+            controller.release(time.monotonic() - start, failed)
+
+    async def _send_limited(self, method, url, **kwargs):
+        """ Sends a single request, waiting for the limiter if there is one. """
+
+        if self.limiter is None:
+            return await self._transmit(method, url, **kwargs)
+        async with self.limiter:
+            return await self._transmit(method, url, **kwargs)
+
+    async def _transmit(self, method, url, **kwargs):
+        """ Sends a single request over the http client, timing it for the hooks if there are any. """
+
+        if not self.is_timed():
+            return await self.session.request(method, url, **kwargs)
+
+        event = self._start_event(method, url)
+        marks = {}
+
+        async def _trace(name, info):
+            marks[name] = time.perf_counter()
+
+        start = time.perf_counter()
+        try:
+            response = await self.session.request(method, url, extensions={'trace': _trace}, **kwargs)
+        except Exception as e:
+            event.total = time.perf_counter() - start
+            event.error = self._classify_exception(e)
+            raise
+
+        event.total = time.perf_counter() - start
+        headers = marks.get('http11.receive_response_headers.complete',
+                            marks.get('http2.receive_response_headers.complete'))
+        event.ttfb = headers - start if headers is not None else event.total
+        event.download = event.total - event.ttfb
+
+        # resolving the host happens as part of opening the connection
+        connecting = marks.get('connection.connect_tcp.started')
+        connected = marks.get('connection.start_tls.complete', marks.get('connection.connect_tcp.complete'))
+        if connecting is not None and connected is not None:
+            event.connect = connected - connecting
+
+        event.bytes = len(response.content)
+        event.status = response.status_code
+        event.error = classify_response(response)
+        return response
+
+    @staticmethod
+    def _classify_exception(error):
+        """ Classifies an exception raised by the http client for a `RequestEvent`. """
+
+        if isinstance(error, httpx.TimeoutException):
+            return 'timeout'
+        if isinstance(error, (httpx.NetworkError, httpx.RemoteProtocolError)):
+            return 'connection-error'
+        return 'request-error'
+
+    async def http_get(self, url, check_errors=True, **kwargs):
+        """Executes an HTTP GET request to the specified url.
+
+        See `ScraperUtils.http_get` for how the visit is recorded and recovered.
+
+        :param url: the url to send the GET request to
+        :param check_errors: whether or not to check if problems occurred, default True
+        :param kwargs: optional arguments to include with the request
+        """
+
+        await arun_steps(self._http_get_steps(url, check_errors, **kwargs))
+
+    async def http_post(self, url, check_errors=True, **kwargs):
+        """Executes an HTTP POST request to the specified url.
+
+        :param url: the url to send the POST request to
+        :param check_errors: whether or not to check if problems occurred, default True
+        :param kwargs: optional arguments to include with the request
+        """
+
+        await arun_steps(self._load_steps('POST', url, check_errors, **kwargs))
+
+    async def http_async_post(self, url, update_panel, event_target, payload, check_errors=True):
+        """Executes an ASP.NET asynchronous postback that only re-renders a single UpdatePanel.
+
+        See `ScraperUtils.http_async_post` for how the response is applied.
+        """
+
+        await arun_steps(self._async_post_steps(url, update_panel, event_target, payload, check_errors))
+
+    async def postback(self, nav_element=None, event_target=None, partial=None, check_errors=True, fields=None):
+        """Posts the current form back to the server as if the navigation element was clicked.
+
+        See `ScraperUtils.postback` for a description of the parameters.
+        """
+
+        await arun_steps(self._postback_steps(nav_element, event_target, partial, check_errors, fields))
+
+    async def recover(self, path=None):
+        """Logs in again and replays a navigation path to rebuild the server-side state of its page.
+
+        See `ScraperUtils.recover` for a description of the parameters.
+        """
+
+        await arun_steps(self._recover_steps(path))
+
+    async def perform_login(self, username=None, password=None):
+        """Attempts to login to https://my.gcc.edu/ using the provided credentials.
+
+        :param username: the username to be used for login
+        :param password: the password to be used for login
+        :raises LoginError: if the supplied credentials are invalid
+        """
+
+        await arun_steps(self._login_steps(username, password))
+
+    def _cookie_jar(self):
+        """ Returns the `http.cookiejar.CookieJar` of the underlying http client. """
+
+        return self.session.cookies.jar
+
+    async def is_logged_in(self, refresh=False):
+        """Checks whether the current page was served to a logged in user.
+
+        See `ScraperUtils.is_logged_in` for a description of the parameters.
+        """
+
+        if refresh:
+            await self.http_get(self.BASE_URL, check_errors=False)
+        return self._page_is_logged_in()
+
+    async def ensure_screen(self, url):
+        """Navigates to the specified url via GET request if we are not already there.
+
+        :param url: the desired url to navigate to
+        """
+
+        if self.response is None or str(self.response.url) != url:
+            await self.http_get(url)
+
+    def _extract_form_state(self):
+        # waiting for the parse pool here would block the event loop, only `extract` uses it
+        return extract_form_state(self._page_response.text)
+
+    async def extract(self, extractor, *args):
+        """ Runs an extractor over the structure of the current page, see `ScraperUtils.extract`. """
+
+        if not self._can_offload():
+            return extractor(self.html, *args)
+
+        start = time.perf_counter()
+        response = self._page_response
+        form_state, result = await self.parse_pool.aparse(
+            extract_page, response.content, response.encoding, self.parser or self.DEFAULT_PARSER, extractor, args)
+        self._adopt_form_state(form_state, start)
+        return result
+
+    async def aclose(self):
+        """ Closes the underlying http client and its connections. """
+
+        await self.session.aclose()
@@ -0,0 +1,34 @@
+from gccutils.aioscrapers.scrapersession import AioScraperManager, AioScraperSession
+from gccutils.asyncscrapers.adviseescraper import AdviseeScraperLogic
+
+
+__all__ = ('AioAdviseeScraper',)
+
+
+class AioAdviseeScraperSession(AdviseeScraperLogic, AioScraperSession):
+    """The coroutine counterpart of `AsyncAdviseeScraperSession`."""
+
+
+class AioAdviseeScraper(AioScraperManager):
+
+    def __init__(self, username, password, callback=None, checkpoint=None, **kwargs):
+        """Constructor
+
+        :param checkpoint: an optional `CrawlCheckpoint` to resume an interrupted crawl from
+
+        See `AioScraperManager` for a description of the other parameters.
+        """
+
+        self.checkpoint = checkpoint
+        super().__init__(username, password, AioAdviseeScraperSession, callback, **kwargs)
+
+    def session_kwargs(self):
+        """ Shares the checkpoint with every session of a new team. """
+
+        return {'checkpoint': self.checkpoint}
+
+    def completed(self, sessions):
+        """ Lets the next crawl start over once this one has scraped every advisee. """
+
+        if self.checkpoint is not None and not any(session.failed for session in sessions):
+            self.checkpoint.clear(AioAdviseeScraperSession.CHECKPOINT_NAME)
@@ -0,0 +1,59 @@
+from gccutils.asyncscrapers.coursescraper import CourseScraperLogic, CourseCrawlStats, check_fields
+from gccutils.aioscrapers.scrapersession import AioScraperManager, AioScraperSession
+from gccutils.course_cache import RequisiteCache
+from gccutils.work_queue import AioWorkQueue
+
+
+class AioCourseScraperSession(CourseScraperLogic, AioScraperSession):
+    """The coroutine counterpart of `AsyncCourseScraperSession`."""
+
+    work_queue_class = AioWorkQueue
+
+
+class AioCourseScraper(AioScraperManager):
+
+    def __init__(self, username, password, callback=None, course_cache=None, requisite_cache=None, fields=None,
+                 query=None, checkpoint=None, **kwargs):
+        """Constructor
+
+        :param course_cache: an optional `CourseCache` to skip the detail pages of unchanged rows
+        :param requisite_cache: an optional `RequisiteCache` kept across runs, each run uses a new one otherwise
+        :param fields: the `COURSE_FIELDS` needed, the detail pages are skipped unless the requisites are
+        :param query: an optional `CourseQuery` restricting which courses are searched
+        :param checkpoint: an optional `CrawlCheckpoint` to resume an interrupted crawl from
+        :raises ValueError: if an unknown field was given
+
+        See `AioScraperManager` for a description of the other parameters.
+        """
+
+        self.course_cache = course_cache
+        self.requisite_cache = requisite_cache
+        self.fields = check_fields(fields)
+        self.query = query
+        self.checkpoint = checkpoint
+        self.stats = None
+        super().__init__(username, password, AioCourseScraperSession, callback, **kwargs)
+
+    def session_kwargs(self):
+        """Shares the caches, requested fields, query, checkpoint and statistics with every session of a new team.
+
+        The `CourseCrawlStats` of the newest team are kept in `stats`.
+        """
+
+        requisite_cache = self.requisite_cache if self.requisite_cache is not None else RequisiteCache()
+        self.stats = CourseCrawlStats()
+        return {'course_cache': self.course_cache, 'requisite_cache': requisite_cache, 'fields': self.fields,
+                'stats': self.stats, 'query': self.query, 'checkpoint': self.checkpoint}
+
+    def completed(self, sessions):
+        """ Saves the course cache once, and lets the next crawl start over once this one has scraped every page. """
+
+        if self.course_cache is not None:
+            self.course_cache.save()
+        if self.checkpoint is not None and not any(session.failed for session in sessions):
+            self.checkpoint.clear(AioCourseScraperSession.CHECKPOINT_NAME)
+
+    def create_work_queue(self):
+        """ Returns the queue of results pages shared by a new team of sessions. """
+
+        return AioWorkQueue()
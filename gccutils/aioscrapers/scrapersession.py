@@ -0,0 +1,303 @@
+from gccutils.aio_scraper_utils import AioScraperUtils
+from gccutils.instrumentation import RequestStats
+from gccutils.session_steps import arun_steps
+import multiprocessing
+import traceback
+import asyncio
+import inspect
+import time
+
+
+class AioScraperSession:
+    """The base class for implementing a web-scraper that runs as a coroutine.
+
+    The steps of the work are shared with the threaded sessions, see `gccutils.session_steps`.
+    """
+
+    def __init__(self, username, password, callback, session_num, num_sessions, limiter=None, work_queue=None):
+        """Constructor
+
+        Unlike the threaded sessions, logging in is deferred to the `login` coroutine.
+
+        :param username: the username to be used for logging in
+        :param password: the password to be used for logging in
+        :param callback: the callback (function or coroutine function) to send the results to
+        :param session_num: the identifier for this session
+        :param num_sessions: how many sessions there are
+        :param limiter: an optional `asyncio.Semaphore` shared by all sessions of a team
+        :param work_queue: an optional `AioWorkQueue` shared by all sessions of a team
+        """
+
+        self.callback = callback
+        self.session_num = session_num
+        self.num_sessions = num_sessions
+        self.dc = AioScraperUtils(limiter=limiter)
+        self.work_queue = work_queue
+        self.aborted = False
+        self.failed = False  # whether part of the work was lost to an error
+        self.__username = username
+        self.__password = password
+
+    @property
+    def tag(self):
+        """ Identifies the session within its team in log messages. """
+
+        return f'session [{self.session_num}|{self.num_sessions}]'
+
+    @property
+    def position(self):
+        """ Returns the (number, count) of this session within its team. """
+
+        return self.session_num, self.num_sessions
+
+    async def login(self):
+        """ Logs the session into mygcc. """
+
+        await self.dc.perform_login(self.__username, self.__password)
+
+    async def emit(self, value):
+        """Passes a result to the callback, awaiting it if it is a coroutine function.
+
+        :param value: the result to pass along
+        """
+
+        result = self.callback(value)
+        if inspect.isawaitable(result):
+            await result
+
+    def abort(self):
+        """ Asks the session to stop running as soon as it is convenient. """
+
+        self.aborted = True
+        if self.work_queue is not None:
+            self.work_queue.close()  # wakes the sessions waiting for work
+
+    async def close(self):
+        """ Closes the connections of this session. """
+
+        await self.dc.aclose()
+
+    async def run(self):
+        """ The primary coroutine of this session, running the steps of its work. """
+
+        await arun_steps(self.steps())
+
+    def steps(self):
+        """Returns the generator of steps that makes up the work of this session.
+
+        :raises NotImplementedError: if not overridden
+        """
+        raise NotImplementedError
+
+
+class AioScraperManager:
+    """The base class for running a team of `AioScraperSession`'s on a single event loop.
+
+    Results can either be streamed with `async for`, collected with `start_and_wait`
+    or sent to a callback with `start`. Every run logs in a fresh team of sessions
+    concurrently and closes them once the run is over. The requests of the latest
+    run are timed, their `RequestStats` are kept in `request_stats`. Given `ScraperMetrics`,
+    the sessions report to them as well, along with the results and the sessions in use.
+    Given a `ParsePool`, the pages the sessions extract data from are parsed by its processes.
+    """
+
+    def __init__(self, username, password, session, callback=None, num_sessions=None,
+                 max_concurrent_requests=None, queue_size=1024, concurrency=None, metrics=None, parse_pool=None):
+        """Constructor
+
+        :param username: the username to be used for logging into mygcc
+        :param password: the password to be used for logging into mygcc
+        :param session: the `AioScraperSession` class to be used
+        :param callback: an optional callback for the results of `start` to be sent to
+        :param num_sessions: how many sessions to run, defaults to the number of cpu cores
+        :param max_concurrent_requests: an optional limit on the requests in flight across all sessions
+        :param queue_size: how many results may be buffered before the sessions have to wait
+        :param concurrency: an optional `AioConcurrencyController` adapting the requests in flight to the
+            server, the number of sessions defaults to its maximum then
+        :param metrics: optional `ScraperMetrics` to report to, may be shared
+        :param parse_pool: an optional `ParsePool` parsing pages on behalf of the sessions, may be shared
+        """
+
+        self.__username = username
+        self.__password = password
+        self.__session = session
+        self.__callback = callback
+        self.__sessions = []
+        self.controller = concurrency
+        self.metrics = metrics
+        self.parse_pool = parse_pool
+        self.request_stats = None
+        self.failed = False  # whether the latest run lost part of its work to an error or left it unfinished
+        if not num_sessions:
+            num_sessions = concurrency.maximum if concurrency is not None else multiprocessing.cpu_count()
+        self.num_sessions = num_sessions
+        self.max_concurrent_requests = max_concurrent_requests
+        self.queue_size = queue_size
+
+    @property
+    def concurrency(self):
+        """ Returns how many sessions of the team may currently have a request in flight. """
+
+        if self.controller is not None:
+            return self.controller.concurrency
+        return self.num_sessions
+
+    def is_running(self):
+        """ Returns whether or not a team of sessions is currently running. """
+
+        return bool(self.__sessions)
+
+    def stop(self):
+        """ Sends an abort request to each of the running sessions. """
+
+        for session in self.__sessions:
+            session.abort()
+
+    def completed(self, sessions):
+        """Called once a run of `results` has gone through all of its work without being stopped.
+
+        :param sessions: the sessions of the team that has finished
+        """
+
+        pass
+
+    def create_work_queue(self):
+        """Creates the work queue shared by a new team of sessions.
+
+        :return: an `AioWorkQueue`, or None if the sessions divide the work among themselves
+        """
+
+        return None
+
+    def session_kwargs(self):
+        """Returns the extra keyword arguments passed to every session of a new team.
+
+        :return: a dictionary of keyword arguments
+        """
+
+        return {}
+
+    def __aiter__(self):
+        return self.results()
+
+    async def results(self, deadline=None):
+        """Runs a team of sessions and yields their results as they arrive.
+
+        Leaving the loop early aborts and closes every session of the team once the
+        generator is closed, use `contextlib.aclosing(manager.results())` to do so
+        immediately instead of whenever the generator gets garbage collected.
+        Once the deadline passes the loop ends as if every result had been yielded.
+
+        :param deadline: seconds after which the team is stopped, defaults to no deadline
+        :raises RuntimeError: if already running
+        """
+
+        if self.is_running():
+            raise RuntimeError('scrapers are already running')
+
+        queue = asyncio.Queue(self.queue_size)
+        finished = object()  # marks that every session has stopped
+
+        limiter = None
+        if self.max_concurrent_requests:
+            limiter = asyncio.Semaphore(self.max_concurrent_requests)
+
+        metrics = self.metrics
+        put = queue.put
+        if metrics is not None:
+            put = metrics.counting_rows(put, type(self).__name__)
+
+        num_sessions = self.num_sessions
+        work_queue = self.create_work_queue()
+        session_kwargs = self.session_kwargs()
+        self.__sessions = sessions = [
+            self.__session(self.__username, self.__password, put, i, num_sessions, limiter, work_queue,
+                           **session_kwargs)
+            for i in range(num_sessions)]
+
+        self.request_stats = RequestStats()
+        for i, session in enumerate(sessions):
+            session.dc.controller = self.controller
+            session.dc.metrics = metrics
+            session.dc.parse_pool = self.parse_pool
+            session.dc.hooks.append(self.request_stats.hook(i))
+
+        expires = None
+        if deadline is not None:
+            expires = time.monotonic() + deadline
+            for session in sessions:
+                session.dc.deadline = expires
+
+        async def _run(session):
+            try:
+                await session.run()
+            except Exception as e:
+                session.failed = True
+                session.dc.record_error(e)
+                traceback.print_exc()
+
+        async def _run_all():
+            await asyncio.gather(*(_run(session) for session in sessions))
+            await queue.put(finished)
+
+        self.failed = True  # until every session has gone through its work
+        runner = None
+        active = False
+        try:
+            # every session logs in at the same time, the team only counts as active once they have
+            await asyncio.gather(*(session.login() for session in sessions))
+            if metrics is not None:
+                metrics.active_sessions.inc(len(sessions))
+                active = True
+            runner = asyncio.ensure_future(_run_all())
+
+            while True:
+                if expires is None:
+                    value = await queue.get()
+                else:
+                    try:
+                        value = await asyncio.wait_for(queue.get(), max(0, expires - time.monotonic()))
+                    except asyncio.TimeoutError:
+                        return  # the deadline has passed, leaving the work unfinished
+                if value is finished:
+                    break
+                yield value
+
+            if not any(session.aborted for session in sessions):
+                self.failed = any(session.failed for session in sessions)
+                self.completed(sessions)
+
+        finally:
+            self.stop()
+            if runner is not None and not runner.done():
+                runner.cancel()
+                await asyncio.gather(runner, return_exceptions=True)
+            for session in sessions:
+                session.dc.flush_events()
+            await asyncio.gather(*(session.close() for session in sessions), return_exceptions=True)
+            if active:
+                metrics.active_sessions.dec(len(sessions))
+            self.__sessions = []
+
+    async def start(self, deadline=None):
+        """Runs a team of sessions, sending every result to the callback.
+
+        :param deadline: seconds after which the team is stopped, defaults to no deadline
+        :raises RuntimeError: if already running
+        """
+
+        callback = self.__callback
+        async for value in self.results(deadline):
+            result = callback(value)
+            if inspect.isawaitable(result):
+                await result
+
+    async def start_and_wait(self, deadline=None):
+        """Runs a team of sessions and collects their results.
+
+        :param deadline: seconds after which the team is stopped, returning the results so far
+        :return: a list of every result
+        :raises RuntimeError: if already running
+        """
+
+        return [value async for value in self.results(deadline)]
@@ -1,4 +1,5 @@
 from gccutils.asyncscrapers.scrapersession import AsyncScraperManager, AsyncScraperSession
+from gccutils.session_steps import call
 import gccutils.errors as errors
 import traceback
 import uuid
@@ -88,66 +89,103 @@ class AdviseeOverviewParser:
         return name, value
 
 
-class AsyncAdviseeScraperSession(AsyncScraperSession):
-    """Web-scraping thread for obtaining adviser's advisee information."""
+def parse_advisee_overview(html):
+    """Parses the data of an advisee overview page, see `ScraperUtils.extract`.
+
+    :param html: the BeautifulSoup structure of the overview page
+    :return: dictionary containing the data from the page
+    """
+
+    return AdviseeOverviewParser(html).parse()
+
 
+class AdviseeScraperLogic:
+    """The page logic of an advisee scraper session, shared by the threaded and the asyncio sessions.
+
+    Every method that sends a request is a generator of steps, see `gccutils.session_steps`.
+    """
+
+    CHECKPOINT_NAME = 'advisees'
     STUDENT_TO_ROSTER_EVENT_TARGET = 'sb00bc534cd-3ee3-4fc5-be95-b3850319f0b8'
     ADVISING_ROUTE = '/ICS/Advising'
 
-    def __init__(self, *args, **kwargs):
+    def __init__(self, *args, checkpoint=None, shard=None, **kwargs):
         super().__init__(*args, **kwargs)
+        self.checkpoint = checkpoint
+        self.shard = shard  # an (index, count) tuple if only every count-th roster page is scraped
 
-    def run(self):
-        """
-        The primary method of this thread that controls the web-scraping of courses on https://my.gcc.edu/.
-
-        Do not manually call this method. Use ScraperSession#start() instead.
-        """
+    def steps(self):
+        """ The work of this session, controlling the web-scraping of advisees on https://my.gcc.edu/. """
 
         start_time = time.time()
-        callback = self.callback
-        thread_num = self.thread_num
-        num_threads = self.num_threads
+        checkpoint = self.checkpoint
         self.aborted = False
 
-        print(f'advisee scraper thread [{thread_num}|{num_threads}] starting')
+        print(f'advisee scraper {self.tag} starting')
 
         # navigate to the first roster page
-        self.navigate_to_roster()
+        with self.dc.labelled('roster'):
+            yield from self.navigate_to_roster()
         new_page = True
+        page = 0
 
         while new_page and not self.aborted:
             try:
-                student_rows = self.get_all_student_rows()
+                student_rows = self.get_all_student_rows() if self.owns_page(page) else []
                 for student_row in student_rows:
                     if not self.aborted:
-                        student = self.build_student_dict(*student_row)
+                        # skip students emitted before the crawl was restarted
+                        user_id = student_row[2]
+                        if checkpoint is not None and checkpoint.is_emitted(self.CHECKPOINT_NAME, user_id):
+                            continue
+
+                        student = yield from self.build_student_dict(*student_row)
                         if student is not None:
-                            callback(student)
-            except errors.ScraperError:
+                            yield call(self.emit, student)
+                            if checkpoint is not None:
+                                checkpoint.record_emitted(self.CHECKPOINT_NAME, user_id)
+            except errors.DeadlineExceededError as e:
+                self.failed = True
+                self.dc.record_error(e)
+                break  # every request would fail from now on
+            except errors.ScraperError as e:
+                self.failed = True
+                self.dc.record_error(e)
                 traceback.print_exc()
 
             # navigate to the next page
-            if not self.aborted and not self.try_nav_to_next_page():
+            if not self.aborted and not (yield from self.try_nav_to_next_page()):
                 new_page = False
+            page += 1
 
         runtime = int(time.time() - start_time)
-        print(f'advisee scraper thread [{thread_num}|{num_threads}] stopping after {runtime} seconds')
+        print(f'advisee scraper {self.tag} stopping after {runtime} seconds')
+
+    def owns_page(self, page):
+        """Checks whether the students of a roster page are scraped by this session.
+
+        :param page: the index of the roster page, starting at 0
+        :return: True unless the roster is split into shards and the page belongs to another one
+        """
+
+        if self.shard is None:
+            return True
+        index, count = self.shard
+        return page % count == index
 
     def navigate_to_roster(self):
         dc = self.dc
 
         # navigate to advising tab
-        dc.http_get(dc.to_url(self.ADVISING_ROUTE))
-        dc.ensure_screen(dc.to_url(self.ADVISING_ROUTE))
+        yield call(dc.http_get, dc.to_url(self.ADVISING_ROUTE))
+        yield call(dc.ensure_screen, dc.to_url(self.ADVISING_ROUTE))
 
         # create the payload to be sent
         search_btn = dc.html.find('input', id='pg0_V_btnSearch')
-        self.perform_navigation(search_btn)
+        yield from self.perform_navigation(search_btn)
 
     def get_all_student_rows(self):
-        thread_num = self.thread_num
-        num_threads = self.num_threads
+        number, count = self.position
 
         table = self.dc.html.find('tbody', class_='gbody')
         if table is None:
@@ -161,11 +199,12 @@ class AsyncAdviseeScraperSession(AsyncScraperSession):
         results = []
 
         for row in rows:
-            if row_index % num_threads == thread_num:
+            if row_index % count == number:
                 try:
                     email, name, user_id, nav_element = self.parse_table_row(row, row_index)
                     results.append((email, name, user_id, nav_element))
-                except errors.ScraperError:
+                except errors.ScraperError as e:
+                    self.dc.record_error(e)
                     traceback.print_exc()
             row_index += 1
 
@@ -209,32 +248,46 @@ class AsyncAdviseeScraperSession(AsyncScraperSession):
         return email, name, user_id, nav_element
 
     def build_student_dict(self, email, name, user_id, nav_element):
-        # if any navigation fails here, we cannot recover without restarting
-        self.perform_navigation(nav_element)  # navigate to student overview
+        # an expired session is recovered by replaying the path to the roster page,
+        # which leaves out the round trip through the student overview
+        with self.dc.excursion():
+            with self.dc.labelled('advisee'):
+                yield from self.perform_navigation(nav_element)  # navigate to student overview
+
+            # the way back is not taken within a finally block, as a generator being closed cannot yield
+            overview = None
+            try:
 
-        try:
+                overview = yield call(self.dc.extract, parse_advisee_overview)
+                overview['email'] = email
+                overview['name'] = name
+                overview['user_id'] = user_id
 
-            parser = AdviseeOverviewParser(self.dc.html)
-            overview = parser.parse()
-            overview['email'] = email
-            overview['name'] = name
-            overview['user_id'] = user_id
+            except errors.ScraperError as e:
+                overview = None
+                self.dc.record_error(e)
+                traceback.print_exc()
+            except Exception:
+                yield from self.nav_to_roster_from_student()
+                raise
 
-            return overview
+            yield from self.nav_to_roster_from_student()
+        return overview
 
-        except errors.ScraperError:
-            traceback.print_exc()
-        finally:
-            # The __EVENTTARGET postback identifier is hardcoded because MyGCC is a jerk.
-            # We cannot reliably obtain the navigation element to get back to the roster
-            #   since MyGCC will randomly not include it within the breadcrumb trail.
-            self.perform_navigation(None, self.STUDENT_TO_ROSTER_EVENT_TARGET)
+    def nav_to_roster_from_student(self):
+        # The __EVENTTARGET postback identifier is hardcoded because MyGCC is a jerk.
+        # We cannot reliably obtain the navigation element to get back to the roster
+        #   since MyGCC will randomly not include it within the breadcrumb trail.
+        with self.dc.labelled('roster'):
+            yield from self.perform_navigation(None, self.STUDENT_TO_ROSTER_EVENT_TARGET)
 
     def try_nav_to_next_page(self):
         next_page = self.get_next_page_element()
         if next_page is None:
             return False
-        self.perform_navigation(next_page)
+        with self.dc.labelled('roster'):
+            yield from self.perform_navigation(next_page)
+        return True
 
     def get_next_page_element(self):
         # find the navigation container
@@ -251,18 +304,45 @@ class AsyncAdviseeScraperSession(AsyncScraperSession):
                 return nav_links[-1]
 
     def perform_navigation(self, nav_element, event_target=None):
-        dc = self.dc
-        action, payload = dc.prepare_payload(nav_element=nav_element)
+        yield call(self.dc.postback, nav_element, event_target)
 
-        if isinstance(event_target, str):
-            payload['__EVENTTARGET'] = event_target
 
-        dc.http_post(dc.to_url(action), data=payload)
+class AsyncAdviseeScraperSession(AdviseeScraperLogic, AsyncScraperSession):
+    """Web-scraping thread for obtaining adviser's advisee information."""
 
 
 class AsyncAdviseeScraper(AsyncScraperManager):
 
-    def __init__(self, username, password, callback):
-        super().__init__(username, password, AsyncAdviseeScraperSession, callback)
+    def __init__(self, username, password, callback, pool=None, checkpoint=None, concurrency=None, metrics=None,
+                 parse_pool=None, shard=None, team_size=None):
+        """Constructor
+
+        :param username: the username to be used for logging into mygcc
+        :param password: the password to be used for logging into mygcc
+        :param callback: a callback for the scraped advisees to be sent to
+        :param pool: an optional `SessionPool` to borrow logged-in sessions from, may be shared
+        :param checkpoint: an optional `CrawlCheckpoint` to resume an interrupted crawl from
+        :param concurrency: an optional `ConcurrencyController` adapting the requests in flight to the server
+        :param metrics: optional `ScraperMetrics` to report to, may be shared
+        :param parse_pool: an optional `ParsePool` parsing the overview pages on behalf of the threads, may be shared
+        :param shard: an optional (index, count) tuple, only every count-th roster page starting at index is scraped
+        :param team_size: how many threads a team has, see `AsyncScraperManager`
+        """
+
+        self.checkpoint = checkpoint
+        self.shard = shard
+        super().__init__(username, password, AsyncAdviseeScraperSession, callback, pool, concurrency,
+                         metrics, parse_pool, team_size)
         if self._cpu_count != 1:
             print('WARNING: Advisee scraping is currently less stable when run on multiple threads.')
+
+    def session_kwargs(self):
+        """ Shares the checkpoint with every session of a new thread team. """
+
+        return {'checkpoint': self.checkpoint, 'shard': self.shard}
+
+    def completed(self, sessions):
+        """ Lets the next crawl start over once this one has scraped every advisee. """
+
+        if self.checkpoint is not None and not any(session.failed for session in sessions):
+            self.checkpoint.clear(AsyncAdviseeScraperSession.CHECKPOINT_NAME)
@@ -1,91 +1,861 @@
 from gccutils.asyncscrapers.scrapersession import AsyncScraperManager, AsyncScraperSession
+from gccutils.course_cache import RequisiteCache, row_fingerprint
+from gccutils.navigation import postback_fields
+from gccutils.work_queue import WorkQueue
+from gccutils.session_steps import call
 import gccutils.errors as errors
+from collections import Counter, namedtuple
+import threading
+import math
 import time
 import re
 
 
+# a single page of the search results of a term, the unit of work shared by a team
+CoursePage = namedtuple('CoursePage', ('term', 'page'))
+
+# matches the id or name of the select element choosing how many results are shown per page
+PAGE_SIZE_PATTERN = re.compile(r'page_?size|per_?page', re.IGNORECASE)
+
+
+# the fields of a `Course`, every one but the requisites is shown by the results table
+COURSE_FIELDS = ('code', 'section', 'name', 'term', 'credits', 'requisites')
+LIST_FIELDS = frozenset(('code', 'section', 'name', 'term', 'credits'))
+
+
 class Course:
 
-    def __init__(self, code, name, term, hours, requisites):
+    def __init__(self, code, name, term, hours, requisites, section=None):
         self.code = code
         self.name = name
         self.term = term
         self.hours = hours
         self.requisites = requisites
+        self.section = section
 
     def __dict__(self):
         return {
             'code': self.code,
+            'section': self.section,
             'name': self.name,
             'term': self.term,
             'credits': self.hours,
             'requisites': self.requisites}
 
+    def __reduce__(self):
+        # pickle looks for the attributes within `__dict__`, which is taken by the method above
+        return Course, (self.code, self.name, self.term, self.hours, self.requisites, self.section)
+
     def is_same(self, other):
         return self.code == other.code and self.term == other.term
 
 
-class AsyncCourseScraperSession(AsyncScraperSession):
-    COURSEURL = 'https://my.gcc.edu/ICS/Academics/Home.jnz'
+def check_fields(fields):
+    """Validates the course fields a scraper was asked for.
+
+    :param fields: an iterable of `COURSE_FIELDS`, or None for every field
+    :return: a frozenset of the fields, or None for every field
+    :raises ValueError: if an unknown field was given
+    """
+
+    if fields is None:
+        return None
+    fields = frozenset(fields)
+    unknown = fields.difference(COURSE_FIELDS)
+    if unknown:
+        raise ValueError(f'unknown course fields {sorted(unknown)}, expected some of {COURSE_FIELDS}')
+    return fields
+
+
+def split_section(text):
+    """Splits the text of a course link into the course code and the section letters.
+
+    :param text: the link text, e.g. "COMP 141 A"
+    :return: a (course code, section) tuple, the section is None if it is missing
+    """
+
+    words = text.split()
+    return ' '.join(words[:2]), ' '.join(words[2:]) or None
+
+
+def find_terms(html):
+    """Finds every term of the course search, starting with the currently selected one.
+
+    :param html: the BeautifulSoup structure of the course search page
+    :return: a list of the term option values
+    """
+
+    terms = []
+    term_selector_element = html.find('select', {'id': 'pg0_V_ddlTerm'})
+    if term_selector_element is not None:
+        for term_choice in term_selector_element.find_all('option'):
+            if term_choice.get('selected', '') == 'selected':
+                terms.insert(0, term_choice.get('value'))
+            else:
+                terms.append(term_choice.get('value'))
+    return terms
+
+
+def find_next_page_link(html):
+    """ Returns the "Next page -->" navigation element of a results page, or None on the last page. """
+
+    navigator = html.find('div', {'class': 'letterNavigator'})
+    if navigator is not None:
+        for nav_link in navigator.find_all('a')[::-1]:
+            if nav_link.text == 'Next page -->':
+                return nav_link
+    return None
+
+
+def find_first_page_link(html):
+    """ Returns the navigation element of the first results page if another page is currently shown. """
+
+    navigator = html.find('div', {'class': 'letterNavigator'})
+    if navigator is not None:
+        nav_links = navigator.find_all('a')
+        if len(nav_links) > 1 and nav_links[0].text == '<-- Previous page':
+            return nav_links[1]
+    return None
+
+
+def find_page_link(html, page):
+    """Returns the navigation element leading directly to a results page.
+
+    The navigator lists every page in order with the current one not being a link.
+    Numbered entries are checked against the page so that a navigator that only lists
+    some of the pages never leads to the wrong one.
+
+    :param html: the BeautifulSoup structure of the results page
+    :param page: the number of the desired page, starting at 1
+    :return: the navigation element, or None if the page cannot be reached directly
+    """
+
+    navigator = html.find('div', {'class': 'letterNavigator'})
+    if navigator is None:
+        return None
+
+    entries = [entry for entry in navigator.find_all(recursive=False)
+               if entry.text not in ('<-- Previous page', 'Next page -->')]
+    if not 0 < page <= len(entries):
+        return None
+
+    entry = entries[page - 1]
+    text = entry.text.strip()
+    if entry.name != 'a' or (text.isdigit() and int(text) != page):
+        return None
+    return entry
+
+
+def find_page_size_selector(html):
+    """ Returns the select element choosing how many results are shown per page, or None. """
+
+    for selector in html.find_all('select'):
+        if PAGE_SIZE_PATTERN.search(f"{selector.get('id', '')} {selector.get('name', '')}"):
+            return selector
+    return None
+
+
+def find_page_sizes(selector):
+    """Finds the numeric page sizes a page size selector offers.
+
+    :param selector: the select element found by `find_page_size_selector`
+    :return: a (default size, dictionary mapping size -> option value) tuple
+    """
+
+    sizes = {}
+    default = None
+    for option in selector.find_all('option'):
+        value = option.get('value', option.text).strip()
+        text = option.text.strip()
+        size = int(text) if text.isdigit() else int(value) if value.isdigit() else None
+        if size is None:
+            continue  # options such as "All" could make the server time out
+        sizes[size] = value
+        if default is None or option.get('selected', '') == 'selected':
+            default = size
+    return default, sizes
+
+
+def find_course_rows(html):
+    """Finds the rows of a course search results page.
+
+    :param html: the BeautifulSoup structure of the results page
+    :return: a list of the table row elements, one per course section
+    :raises MissingElementError: if the results table could not be found
+    """
+
+    # find the table that contains the rows
+    table = html.find('tbody', {'class': 'gbody'})
+    if table is None:
+        raise errors.MissingElementError('Table element not found.')
+
+    # MyGCC includes hidden rows between each course displayed in the
+    #   table. These rows are irrelevant and need to be skipped.
+    return [table_row for table_row in table.find_all('tr')
+            if 'subItem' not in table_row.get('class', '')]
+
+
+def clean_term_name(text):
+    """Normalizes the displayed name of a term, such as "2024 Fall".
+
+    The detail page of a course labels its term with a trailing comma, the term dropdown of the
+    course search does not; both name the term the same way once cleaned, so a list-only crawl
+    reports the same `Course.term` as a full one.
+
+    :param text: the name as displayed
+    :return: the name without surrounding commas and with single spaces
+    """
+
+    return ' '.join(text.split()).strip(',').strip()
+
+
+def find_term_description(html):
+    """ Returns the displayed name of the term selected in the course search, or None. """
+
+    term_selector_element = html.find('select', {'id': 'pg0_V_ddlTerm'})
+    if term_selector_element is not None:
+        for term_choice in term_selector_element.find_all('option'):
+            if term_choice.get('selected', '') == 'selected':
+                return clean_term_name(term_choice.text)
+    return None
+
+
+def find_course_columns(html):
+    """Finds which columns of the results table hold the course title, credits and open seats.
+
+    :param html: the BeautifulSoup structure of the results page
+    :return: a dictionary mapping 'name', 'credits' and 'seats' to column indices, missing columns are left out
+    """
+
+    columns = {}
+    table = html.find('tbody', {'class': 'gbody'})
+    header = table.find_parent('table').find('thead') if table is not None else None
+    if header is not None:
+        for index, cell in enumerate(header.find_all(['th', 'td'])):
+            text = cell.text.strip().lower()
+            if 'title' in text:
+                columns.setdefault('name', index)
+            elif 'credit' in text or text == 'hours':
+                columns.setdefault('credits', index)
+            elif 'seat' in text or 'open' in text:
+                columns.setdefault('seats', index)
+    return columns
+
+
+def parse_course_row(row, columns, term):
+    """Builds a course from a results row alone, without its requisites.
+
+    :param row: the table row element of the course section
+    :param columns: the column indices found by `find_course_columns`
+    :param term: the name of the term the row belongs to, as selected in the term dropdown
+    :return: the `Course`, or None if the row does not show every field
+    """
+
+    nav_element = row.find('a')
+    cells = row.find_all('td', recursive=False)
+    if nav_element is None or term is None or any(
+            columns.get(field, len(cells)) >= len(cells) for field in ('name', 'credits')):
+        return None
+
+    try:
+        course_credits = float(cells[columns['credits']].text.strip())
+    except ValueError:
+        return None
+
+    course_code, section = split_section(nav_element.text)
+    course_title = cells[columns['name']].text.strip()
+    return Course(course_code, course_title, term, course_credits, None, section)
+
+
+def parse_course_details(html, course_code):
+    """Parses the title, term and credit hours from a course overview page.
+
+    :param html: the BeautifulSoup structure of the course overview page
+    :param course_code: the code of the course, used within error messages
+    :return: a (title, term, credits) tuple
+    :raises MissingElementError: if any of the detail elements could not be found
+    """
+
+    details = html.find('div', {'id': 'pg0_V_divCourseDetails'})
+    if details is None:
+        raise errors.MissingElementError(f'details element could not be found for {course_code}')
+
+    # fetch course title
+    title_elem = details.find('b')
+    if title_elem is None:
+        raise errors.MissingElementError(f'title element missing for {course_code}')
+    course_title = title_elem.text.split('(', 1)[0].strip()
+
+    # fetch course term
+    term_elem = details.find('span', {'id': 'pg0_V_lblTermDescValue'})
+    if term_elem is None:
+        raise errors.MissingElementError(f'term element missing for {course_code}')
+    course_term = clean_term_name(term_elem.text)
+
+    # fetch course hours
+    cred_elem = details.find('span', {'id': 'pg0_V_lblCreditHoursValue'})
+    if cred_elem is None:
+        raise errors.MissingElementError(f'credit element missing for {course_code}')
+    course_credits = float(cred_elem.text.strip())
+
+    return course_title, course_term, course_credits
+
+
+def parse_course_requisites(html):
+    """Parses the requisite groups from a course requisites page.
+
+    :param html: the BeautifulSoup structure of the course requisites page
+    :return: a list of requisite groups, each a list of (requisite type, course code) tuples
+    """
+
+    pattern = re.compile(r'([A-Z]{2,5})([0-9]{2,4}[A-Z]*)')
+
+    def parse_req_type(_req_type: str) -> str:
+        if _req_type.startswith('Prerequisite'):
+            return 'prerequisite'
+        if _req_type.startswith('Corequisite'):
+            return 'corequisite'
+        return 'other'
+
+    def parse_req_name(_req_name: str) -> str:
+        first_word = _req_name.split(' ', 1)[0]
+        match = pattern.match(first_word)
+        if match:
+            first, second = match.groups()
+            return first + ' ' + second
+        return first_word
+
+    requisites = {}
+    table = html.find('tbody', {'class': 'gbody'})
+    if table is not None:
+        for row in table.find_all('tr'):
+            cells = row.find_all('td')
+            if len(cells) != 5:
+                continue
+            _, _, rgroup, rtype, rname = tuple(cells)
+            rgroup_val = rgroup.text.strip()
+            rtype_val = rtype.text.strip()
+            rname_val = rname.text.strip()
+
+            if rgroup_val != '':
+                try:
+                    group_num = int(rgroup_val)
+                    if group_num not in requisites:
+                        requisites[group_num] = []
+                    requisites[group_num].append((parse_req_type(rtype_val), parse_req_name(rname_val)))
+                except ValueError:
+                    print('group number could not be converted to an int')
+    return [v for _, v in requisites.items()]
+
+
+def extract_course_page(html, course_code):
+    """Extracts everything a crawl needs from a course overview page, see `ScraperUtils.extract`.
+
+    :param html: the BeautifulSoup structure of the course overview page
+    :param course_code: the code of the course, used within error messages
+    :return: the (title, term, credits) tuple of the course, the postback fields of its
+        requisites link and those of its link back to the results, None for missing links
+    :raises MissingElementError: if any of the detail elements could not be found
+    """
+
+    details = parse_course_details(html, course_code)
+    requisites_link = html.find('a', {'id': 'pg0_V_lnkbCourseRequisites'})
+    back_link = html.find('a', {'id': 'pg0_V_lnkBack'})
+    return (details,
+            postback_fields(requisites_link) if requisites_link is not None else None,
+            postback_fields(back_link) if back_link is not None else None)
+
+
+def extract_requisites_page(html):
+    """Extracts everything a crawl needs from a course requisites page, see `ScraperUtils.extract`.
+
+    :param html: the BeautifulSoup structure of the course requisites page
+    :return: the requisite groups as returned by `parse_course_requisites` and the postback
+        fields of the breadcrumb back to the results, None if it is missing
+    """
+
+    requisites = parse_course_requisites(html)
+    breadcrumbs = html.find('span', {'id': 'portlet-breadcrumbs'})
+    if breadcrumbs is not None:
+        for bread in breadcrumbs.find_all('a'):
+            if bread.text == 'Results':
+                return requisites, postback_fields(bread)
+    return requisites, None
+
+
+class CourseQuery:
+    """Restricts a course scrape to some terms, a department, a course code prefix or open sections.
+
+    The filters are filled into the Advanced Course Search form, so the server only
+    lists matching courses. The form fields are recognized by their ids and names;
+    the department and code prefix are checked against every listed row as well, as
+    is the open seats filter when the results show the seats.
+    """
+
+    CURRENT = 'current'  # selects the term the search form starts out with
+
+    DEPARTMENT_PATTERN = re.compile(r'dept|department|subject', re.IGNORECASE)
+    CODE_PATTERN = re.compile(r'course_?code|course_?restrictor|course_?num|txt_?course', re.IGNORECASE)
+    OPEN_PATTERN = re.compile(r'open', re.IGNORECASE)
+
+    def __init__(self, terms=None, department=None, code_prefix=None, open_only=False):
+        """Constructor
+
+        :param terms: the terms to search as option values or names, `CourseQuery.CURRENT`, or None for every term
+        :param department: only search the courses of this department, e.g. "COMP"
+        :param code_prefix: only search the courses whose code starts with this, e.g. "COMP 1"
+        :param open_only: only search the sections with open seats
+        """
+
+        if isinstance(terms, str):
+            terms = (terms,)
+        self.terms = tuple(terms) if terms is not None else None
+        self.department = department.strip().upper() if department else None
+        self.code_prefix = ' '.join(code_prefix.split()).upper() if code_prefix else None
+        self.open_only = open_only
+
+    def select_terms(self, html):
+        """Finds the terms of the course search that should be searched.
+
+        :param html: the BeautifulSoup structure of the course search page
+        :return: a list of the term option values
+        """
+
+        terms = find_terms(html)
+        if self.terms is None:
+            return terms
+
+        # the names of the terms, terms without an option (or the whole selector) missing select nothing
+        names = {}
+        selector = html.find('select', {'id': 'pg0_V_ddlTerm'})
+        if selector is not None:
+            for option in selector.find_all('option'):
+                if option.get('value') is not None:
+                    names[option['value']] = option.text.strip().lower()
+
+        wanted = {term.strip().lower() for term in self.terms}
+        selected = []
+        for term in terms:
+            if term not in names:
+                continue
+            if {term.lower(), names[term]} & wanted or (self.CURRENT in wanted and term == terms[0]):
+                selected.append(term)
+        return selected
+
+    @staticmethod
+    def _find_field(html, name, pattern):
+        """ Returns the form element of the given tag whose id or name matches the pattern, or None. """
+
+        for element in html.find_all(name):
+            if element.get('name') and pattern.search(f"{element.get('id', '')} {element['name']}"):
+                return element
+        return None
+
+    def apply(self, html, payload):
+        """Fills the filters into the payload of a search.
+
+        :param html: the BeautifulSoup structure of the page holding the search form
+        :param payload: the payload of the search to modify
+        """
+
+        if self.department is not None:
+            selector = self._find_field(html, 'select', self.DEPARTMENT_PATTERN)
+            if selector is not None:
+                for option in selector.find_all('option'):
+                    value = option.get('value', '').strip()
+                    text = option.text.strip().upper()
+                    if value.upper() == self.department or text == self.department \
+                            or text.startswith((self.department + ' ', self.department + '-')):
+                        payload[selector['name']] = value
+                        break
+
+        if self.code_prefix is not None:
+            text_input = self._find_field(html, 'input', self.CODE_PATTERN)
+            if text_input is not None and text_input.get('type', 'text') == 'text':
+                payload[text_input['name']] = self.code_prefix
+
+        if self.open_only:
+            checkbox = self._find_field(html, 'input', self.OPEN_PATTERN)
+            if checkbox is not None and checkbox.get('type') == 'checkbox':
+                payload[checkbox['name']] = checkbox.get('value', 'on')
+
+    def matches_row(self, row, columns):
+        """Checks whether a results row passes the filters.
+
+        :param row: the table row element of the course section
+        :param columns: the column indices found by `find_course_columns`
+        :return: False if the row does not pass the filters
+        """
+
+        nav_element = row.find('a')
+        if nav_element is None:
+            return True  # such rows are reported by the scraper itself
+        code = ''.join(nav_element.text.split()).upper()
+
+        if self.department is not None:
+            if nav_element.text.split()[0].upper() != self.department:
+                return False
+        if self.code_prefix is not None and not code.startswith(self.code_prefix.replace(' ', '')):
+            return False
+
+        cells = row.find_all('td', recursive=False)
+        if self.open_only and columns.get('seats', len(cells)) < len(cells):
+            seats = cells[columns['seats']].text.strip().lower()
+            match = re.match(r'\d+', seats)
+            if seats.startswith('closed') or (match is not None and int(match.group()) == 0):
+                return False
+        return True
+
+
+class CourseCrawlStats:
+    """Thread-safe statistics of a course crawl shared by a team of sessions."""
+
+    def __init__(self):
+        """ Constructor """
+
+        self.default_page_size = None
+        self.page_size = None
+        self.page_size_rejected = False
+        self._pages = Counter()     # term -> how many times its results pages were loaded
+        self._page_rows = {}        # (term, page) -> how many courses the page listed
+        self._last_pages = {}       # term -> the number of its last results page, once that was loaded
+        self._lock = threading.Lock()
+
+    def use_page_size(self, default, size):
+        """Records that a search asks for a page size other than the default one.
+
+        :param default: the page size the search form selects by default
+        :param size: the page size asked for
+        :return: False if the server rejected larger page sizes before, leaving the default one
+        """
+
+        with self._lock:
+            if self.page_size_rejected:
+                return False
+            if self.default_page_size is None:
+                self.default_page_size = default
+            self.page_size = size
+            return True
+
+    def reject_page_size(self):
+        """ Records that the server rejected a search asking for a larger page size. """
+
+        with self._lock:
+            self.page_size_rejected = True
+            self.page_size = None
+
+    def record_page(self, term, page, rows, last):
+        """Records that a results page has been loaded.
+
+        :param term: the term the results page belongs to
+        :param page: the number of the results page
+        :param rows: how many courses the page listed
+        :param last: whether it is the last results page of the term
+        """
+
+        with self._lock:
+            self._pages[term] += 1
+            self._page_rows[(term, page)] = rows
+            if last:
+                self._last_pages[term] = page
+
+    def merge(self, other):
+        """Adds the statistics of another crawl, such as that of another process.
+
+        :param other: the `CourseCrawlStats` to add
+        """
+
+        with other._lock:
+            pages, page_rows, last_pages = Counter(other._pages), dict(other._page_rows), dict(other._last_pages)
+        with self._lock:
+            self._pages.update(pages)
+            self._page_rows.update(page_rows)
+            self._last_pages.update(last_pages)
+            if self.default_page_size is None:
+                self.default_page_size = other.default_page_size
+            if self.page_size is None:
+                self.page_size = other.page_size
+            self.page_size_rejected = self.page_size_rejected or other.page_size_rejected
+
+    def __getstate__(self):
+        with self._lock:
+            state = dict(self.__dict__)
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    @property
+    def pages(self):
+        """ Returns how many results pages have been loaded. """
+
+        return sum(self._pages.values())
+
+    @property
+    def rows(self):
+        """ Returns how many courses the loaded results pages listed. """
+
+        with self._lock:
+            return sum(self._page_rows.values())
+
+    @property
+    def pages_saved(self):
+        """Returns how many more results pages the default page size would have taken.
+
+        Only the terms whose every results page was loaded during this run are counted,
+        those replayed from a checkpoint or cut short by a stop are left out.
+        """
+
+        if not self.default_page_size or self.page_size is None:
+            return 0
+        with self._lock:
+            saved = 0
+            for term, last_page in self._last_pages.items():
+                pages = range(1, last_page + 1)
+                if all((term, page) in self._page_rows for page in pages):
+                    rows = sum(self._page_rows[(term, page)] for page in pages)
+                    saved += max(0, math.ceil(rows / self.default_page_size) - last_page)
+            return saved
+
+    def __str__(self):
+        summary = f'{self.pages} results pages listing {self.rows} courses'
+        if self.page_size is not None:
+            summary += f', {self.pages_saved} pages saved by showing {self.page_size} instead of ' \
+                       f'{self.default_page_size} per page'
+        elif self.page_size_rejected:
+            summary += ', the server rejected larger page sizes'
+        return summary
+
+
+class CourseScraperLogic:
+    """The page logic of a course scraper session, shared by the threaded and the asyncio sessions.
+
+    Scrapes the courses of the pages it takes from the `WorkQueue` shared by its team.
+    Every results page is only loaded by the session that took it, the team grows the
+    queue by adding the next page of a term as soon as it is discovered.
+
+    Every method that sends a request is a generator of steps, see `gccutils.session_steps`.
+    """
+
+    CHECKPOINT_NAME = 'courses'
+    COURSE_ROUTE = '/ICS/Academics/Home.jnz'
     QUERYPARAMS = {
         'portlet': 'AddDrop_Courses',
         'screen': 'Advanced Course Search',
         'screenType': 'next'}
 
-    def __init__(self, *args, **kwargs):
+    # the queue a session running on its own creates for itself
+    work_queue_class = WorkQueue
+    # how often a results page that could not be reached is handed back to the team
+    PAGE_RETRIES = 2
+
+    def __init__(self, *args, course_cache=None, requisite_cache=None, fields=None, stats=None, query=None,
+                 checkpoint=None, shard=None, **kwargs):
         super().__init__(*args, **kwargs)
-        self.remaining_terms = []
+        self.query = query
+        self.shard = shard  # an (index, count) tuple if only every count-th term is scraped
+        self.checkpoint = checkpoint
+        self.stats = stats if stats is not None else CourseCrawlStats()
+        self.fields = check_fields(fields)
+        self.list_only = self.fields is not None and self.fields <= LIST_FIELDS
+        self.course_cache = course_cache
+        self.requisite_cache = requisite_cache if requisite_cache is not None else RequisiteCache()
+        if self.work_queue is None:  # running on its own
+            self.work_queue = self.work_queue_class()
+        self.current_term = None
+        self.current_page = None
+
+    def steps(self):
+        """ The work of this session, controlling the web-scraping of courses on https://my.gcc.edu/. """
+
+        start_time = time.time()
+        work_queue = self.work_queue
+        self.aborted = False
+
+        print(f'scraper {self.tag} starting')
+
+        # perform initial setup, the first page of every term is where the work starts
+        yield from self.nav_to_search()
+        work_queue.put(*(CoursePage(term, 1) for term in self.select_terms()))
+
+        while not self.aborted:
+            course_page = yield call(work_queue.get, prefer=self.distance_to)
+            if course_page is None:
+                break  # stop once there are no pages left
+
+            try:
+                yield from self.scrape_page(course_page)
+            except errors.DeadlineExceededError as e:
+                self.failed = True
+                self.dc.record_error(e)
+                break  # every request would fail from now on
+            except Exception as e:
+                # handle errors that occur during navigation
+                self.failed = True
+                print(f'scraper {self.tag} exception: {e}')
+                self.dc.record_error(e)
+            finally:
+                work_queue.done(course_page)
+
+        runtime = int(time.time() - start_time)
+        print(f'scraper {self.tag} stopping after {runtime} seconds')
 
-    def run(self):
+    def scrape_page(self, course_page):
+        """Scrapes every course of a results page.
+
+        :param course_page: the `CoursePage` to scrape
         """
-        The primary method of this thread that controls the web-scraping of courses on https://my.gcc.edu/.
 
-        Do not manually call this method. Use ScraperSession#start() instead.
+        checkpoint = self.checkpoint
+        rows_done = self.resume_page(course_page)
+        if rows_done is None:
+            return  # the page was finished before the crawl was restarted
+
+        with self.dc.labelled('results'):
+            if not (yield from self.try_nav_to_page(course_page)):
+                return  # left to be retried
+
+        # the next page is handed to the team before working through this one
+        has_next = find_next_page_link(self.dc.html) is not None
+        if has_next:
+            self.work_queue.put(CoursePage(course_page.term, course_page.page + 1))
+        if checkpoint is not None:
+            checkpoint.start_page(self.CHECKPOINT_NAME, course_page, has_next)
+
+        # the results table shows every field but the requisites
+        columns = find_course_columns(self.dc.html)
+        term = find_term_description(self.dc.html) if self.list_only else None
+
+        table_rows = find_course_rows(self.dc.html)
+        self.stats.record_page(course_page.term, course_page.page, len(table_rows), not has_next)
+
+        # the rows done have to follow one another, those emitted after a failed row are recorded by key instead
+        row_failed = False
+        for index, table_row in enumerate(table_rows):
+            if self.aborted: break
+            if index < rows_done:
+                continue  # emitted before the crawl was restarted
+            if self.query is not None and not self.query.matches_row(table_row, columns):
+                continue
+            row_key = None
+            if checkpoint is not None:
+                row_key = self.row_key(course_page, table_row)
+                if checkpoint.is_emitted(self.CHECKPOINT_NAME, row_key):
+                    continue  # emitted after a failed row before the crawl was restarted
+
+            try:
+                # build a course object from the row data, visiting its pages only if needed
+                course = None
+                if self.list_only:
+                    course = parse_course_row(table_row, columns, term)
+                if course is None:
+                    course = yield from self.course_row_to_course(table_row)
+
+                # pass the course to the callback function
+                if course is not None:
+                    yield call(self.emit, course)
+
+            except errors.DeadlineExceededError:
+                raise  # the row is left to be emitted by the next crawl
+            except Exception as e:
+                # handle errors that occur during course creation or the callback, the row is left to the next crawl
+                self.failed = row_failed = True
+                print(f'scraper {self.tag} exception: {e}')
+                self.dc.record_error(e)
+                continue
+
+            if checkpoint is not None:
+                if row_failed:
+                    checkpoint.record_emitted(self.CHECKPOINT_NAME, row_key)
+                else:
+                    checkpoint.record_rows(self.CHECKPOINT_NAME, course_page, index + 1)
+
+        if checkpoint is not None and not self.aborted and not row_failed:
+            checkpoint.finish_page(self.CHECKPOINT_NAME, course_page)
+
+    @staticmethod
+    def row_key(course_page, row):
+        """Identifies a results row for the checkpoint, such as "2024;10 COMP 141 A".
+
+        :param course_page: the `CoursePage` listing the row
+        :param row: the table row element of the course section
+        :return: the term and the course code including the section letters, the row text if it has no link
         """
 
-        start_time = time.time()
-        callback = self.callback
-        thread_num = self.thread_num
-        num_threads = self.num_threads
-        self.aborted = False
+        nav_element = row.find('a')
+        text = nav_element.text if nav_element is not None else row.get_text(' ')
+        return f'{course_page.term} {" ".join(text.split())}'
 
-        print(f'scraper thread [{thread_num}|{num_threads}] starting')
+    def try_nav_to_page(self, course_page):
+        """Navigates to a results page, handing it back to the team should that fail.
 
-        # perform initial setup
-        self.nav_to_search()
-        self.init_term_data()
-        self.nav_to_first_term()
+        The next page of a term is only discovered on the page before it, so a page that
+        could not be reached is retried rather than dropping the rest of its term.
 
-        while not self.aborted:
-            while not self.aborted:
+        :param course_page: the `CoursePage` to navigate to
+        :return: True if the page was reached, False if it was handed back to be retried
+        :raises Exception: whatever navigating raised once the page has been retried `PAGE_RETRIES` times
+        """
 
-                table_rows = self.find_rows_to_parse()
+        try:
+            yield from self.nav_to_page(course_page)
+            return True
+        except errors.DeadlineExceededError:
+            raise
+        except Exception as e:
+            if not self.work_queue.retry(course_page, self.PAGE_RETRIES):
+                raise
+            print(f'scraper {self.tag} exception: {e}, retrying page {course_page.page} of term {course_page.term}')
+            self.dc.record_error(e)
+
+        # where the navigation ended up is unknown, so the next page starts from the search page
+        yield from self.nav_to_search()
+        return False
 
-                for table_row in table_rows:
-                    if self.aborted: continue
+    def resume_page(self, course_page):
+        """Looks up how far a results page got before the crawl was restarted.
 
-                    try:
-                        # build a course object from the row data
-                        course = self.course_row_to_course(table_row)
+        A page that was finished is skipped without loading it, its next page is
+        handed to the team straight away.
 
-                        # pass the course to the callback function
-                        if course is not None:
-                            callback(course)
+        :param course_page: the `CoursePage` about to be scraped
+        :return: how many rows of the page are done, or None if the page is done
+        """
 
-                    except Exception as e:
-                        # handle errors that occur during course creation or the callback
-                        print(f'scraper thread [{thread_num}|{num_threads}] exception: {e}')
+        if self.checkpoint is None:
+            return 0
 
-                # navigate to next page
-                if not self.try_nav_next_page():
-                    break  # stop if this was the last page
+        progress = self.checkpoint.page(self.CHECKPOINT_NAME, course_page)
+        if progress is None:
+            return 0
 
-            # navigate to next term
-            if not self.try_nav_next_term():
-                break  # stop if this was the last term
+        rows_done, has_next, done = progress
+        if not done:
+            return rows_done
+        if has_next:
+            self.work_queue.put(CoursePage(course_page.term, course_page.page + 1))
+        return None
 
-        runtime = int(time.time() - start_time)
-        print(f'scraper thread [{thread_num}|{num_threads}] stopping after {runtime} seconds')
+    def select_terms(self):
+        """ Returns the terms to scrape from the course search page. """
+
+        if self.query is not None:
+            terms = self.query.select_terms(self.dc.html)
+        else:
+            terms = find_terms(self.dc.html)
+        if self.shard is not None:
+            index, count = self.shard
+            terms = terms[index::count]
+        return terms
+
+    def distance_to(self, course_page):
+        """ Returns how costly navigating to a results page is, used to prefer nearby pages. """
+
+        if course_page.term == self.current_term:
+            return 0, abs(course_page.page - self.current_page)
+        return 1, course_page.page
 
     def nav_to_search(self):
         """
@@ -93,96 +863,96 @@ class AsyncCourseScraperSession(AsyncScraperSession):
 
         This is a necessary first step prior to accessing any course.
         """
-        self.dc.http_get(self.COURSEURL, params=self.QUERYPARAMS)
+        with self.dc.labelled('search'):
+            yield call(self.dc.http_get, self.dc.to_url(self.COURSE_ROUTE), params=self.QUERYPARAMS)
+        self.current_term = self.current_page = None
 
-    def init_term_data(self):
-        """
-        Determines the course terms available for searching as well as which to start with.
+    def choose_page_size(self, payload):
+        """Asks for the largest page size the search form offers, so every term takes fewer pages.
+
+        :param payload: the payload of the search to modify
+        :return: True if the page size was changed
         """
 
-        html = self.dc.html
-        if html is not None:
-            term_selector_element = html.find('select', {'id': 'pg0_V_ddlTerm'})
-            if term_selector_element is not None:
-                for term_choice in term_selector_element.find_all('option'):
-                    choice_value = term_choice.get('value')
-                    selected = term_choice.get('selected', '') == 'selected'
-                    if not selected:
-                        self.remaining_terms.append(choice_value)
-
-    def nav_to_first_term(self):
-        search_btn = self.dc.html.find('input', {'id': 'pg0_V_btnSearch'})
-        action, payload = self.dc.prepare_payload(nav_element=search_btn)
-        post_url = self.dc.BASE_URL + action
-        self.dc.http_post(post_url, data=payload)
+        stats = self.stats
+        selector = find_page_size_selector(self.dc.html)
+        if selector is None or not selector.get('name'):
+            return False
 
-    def find_rows_to_parse(self):
-        """ Returns a list of HTML elements of rows this thread is responsible for. """
+        default, sizes = find_page_sizes(selector)
+        if not sizes:
+            return False
+        size = max(sizes)
+        if not stats.use_page_size(default, size):
+            return False
+        payload[selector['name']] = sizes[size]
+        return True
 
-        row_index = 0
-        thread_num = self.thread_num
-        num_threads = self.num_threads
-        return_value = []
+    def search_rejected(self):
+        """ Returns whether the search was answered with an error page instead of its results. """
 
-        # find the table that contains the rows
-        table = self.dc.html.find('tbody', {'class': 'gbody'})
-        if table is None:
-            raise errors.MissingElementError('Table element not found.')
+        response = self.dc.response
+        return response.status_code >= 400 or self.dc.html.find('select', {'id': 'pg0_V_ddlTerm'}) is None
 
-        # find rows of the table
-        table_rows = table.find_all('tr')
+    def nav_to_term(self, term):
+        """ Searches the courses of a term and navigates to the first page of its results. """
 
-        # determine which rows we are responsible for
-        for table_row in table_rows:
+        search_btn = self.dc.html.find('input', {'id': 'pg0_V_btnSearch'})
+        fields = {'pg0$V$ddlTerm': term}
+        if self.query is not None:
+            self.query.apply(self.dc.html, fields)
+
+        # a new search replaces the previous one, so only the visit to the search page stays on the path
+        del self.dc.navigation[1:]
+
+        if self.choose_page_size(fields):
+            try:
+                yield call(self.dc.postback, search_btn, fields=fields)
+                rejected = self.search_rejected()
+            except errors.PageError:
+                rejected = True
+
+            if rejected:
+                # the server does not accept the page size, searching again with its default one
+                self.stats.reject_page_size()
+                yield from self.nav_to_search()
+                return (yield from self.nav_to_term(term))
+        else:
+            yield call(self.dc.postback, search_btn, fields=fields)
 
-            # MyGCC includes hidden rows between each course displayed in the
-            #   table. These rows are irrelevant and need to be skipped. This
-            #   also checks whether or not the task has been manually aborted.
-            if 'subItem' in table_row.get('class', ''):
-                continue
+        # the results stay on the page of the previous search, a fresh login starts on the first page
+        # of the new search though, so replaying the click while recovering would fail for want of the link
+        nav_element = find_first_page_link(self.dc.html)
+        if nav_element is not None:
+            with self.dc.excursion():
+                yield call(self.dc.postback, nav_element)
 
-            # determines if this thread is responsible for this row index
-            should_handle = row_index % num_threads == thread_num
-            if should_handle:
-                return_value.append(table_row)
-            row_index += 1
-
-        return return_value
-
-    def try_nav_next_page(self):
-        navigator = self.dc.html.find('div', {'class': 'letterNavigator'})
-        if navigator is not None:
-            for nav_link in navigator.find_all('a')[::-1]:
-                if nav_link.text == 'Next page -->':
-                    action, payload = self.dc.prepare_payload(nav_element=nav_link)
-                    post_url = self.dc.BASE_URL + action
-                    self.dc.http_post(post_url, data=payload)
-                    return True
-        return False
+        self.current_term = term
+        self.current_page = 1
 
-    def try_nav_next_term(self):
-        if self.remaining_terms:
-
-            # navigate to next term
-            next_term = self.remaining_terms.pop(0)
-            search_btn = self.dc.html.find('input', {'id': 'pg0_V_btnSearch'})
-            action, payload = self.dc.prepare_payload(nav_element=search_btn)
-            payload['pg0$V$ddlTerm'] = next_term
-            post_url = self.dc.BASE_URL + action
-            self.dc.http_post(post_url, data=payload)
-
-            # navigate to first page
-            navigator = self.dc.html.find('div', {'class': 'letterNavigator'})
-            if navigator is not None:
-                nav_links = navigator.find_all('a')
-                if len(nav_links) > 1 and nav_links[0].text == '<-- Previous page':
-                    nav_element = nav_links[1]
-                    action, payload = self.dc.prepare_payload(nav_element=nav_element)
-                    post_url = self.dc.BASE_URL + action
-                    self.dc.http_post(post_url, data=payload)
+    def nav_to_page(self, course_page):
+        """Navigates to a results page, jumping directly to it whenever possible.
 
-            return True
-        return False
+        :param course_page: the `CoursePage` to navigate to
+        :raises MissingElementError: if the page could not be reached
+        """
+
+        if course_page.term != self.current_term:
+            yield from self.nav_to_term(course_page.term)
+
+        while self.current_page != course_page.page:
+            nav_link = find_page_link(self.dc.html, course_page.page)
+            if nav_link is not None:
+                page = course_page.page
+            elif course_page.page > self.current_page:
+                nav_link, page = find_next_page_link(self.dc.html), self.current_page + 1
+            else:
+                nav_link, page = find_first_page_link(self.dc.html), 1
+
+            if nav_link is None:
+                raise errors.MissingElementError(f'page {course_page.page} of term {course_page.term} not found')
+            yield call(self.dc.postback, nav_link)
+            self.current_page = page
 
     def course_row_to_course(self, row):
 
@@ -191,124 +961,153 @@ class AsyncCourseScraperSession(AsyncScraperSession):
         if nav_element is None:
             raise errors.MissingElementError('Course row navigation element missing.')
 
-        # navigate to the course overview page
-        action, payload = self.dc.prepare_payload(nav_element=nav_element)
-        post_url = self.dc.BASE_URL + action
-        self.dc.http_post(post_url, data=payload)
+        # unchanged rows are taken from the cache, skipping their detail pages
+        course_cache = self.course_cache
+        if course_cache is not None:
+            cache_key = ' '.join(nav_element.text.split())
+            fingerprint = row_fingerprint(row)
+            course = course_cache.get(self.current_term, cache_key, fingerprint)
+            if course is not None:
+                return course
 
         # course code with section letters removed
-        course_code = ' '.join(nav_element.text.strip().split(' ')[:2])
-
-        # fetch data from this page
-        details = self.dc.html.find('div', {'id': 'pg0_V_divCourseDetails'})
-
-        if details is None:  # abort course parsing if the details element is missing
-            self.nav_to_courses_from_course()  # ensure we return to the courses list
-            raise errors.MissingElementError(f'details element could not be found for {course_code}')
-
-        # fetch course title
-        title_elem = details.find('b')
-        if title_elem is None:  # abort course parsing if the title element is missing
-            self.nav_to_courses_from_course()   # ensure we return to the courses list
-            raise errors.MissingElementError(f'title element missing for {course_code}')
-        course_title = title_elem.text.split('(', 1)[0].strip()
-
-        # fetch course term
-        term_elem = details.find('span', {'id': 'pg0_V_lblTermDescValue'})
-        if term_elem is None:  # abort course parsing if the term element is missing
-            self.nav_to_courses_from_course()   # ensure we return to the courses list
-            raise errors.MissingElementError(f'term element missing for {course_code}')
-        course_term = term_elem.text.strip().strip(',')
-
-        # fetch course hours
-        cred_elem = details.find('span', {'id': 'pg0_V_lblCreditHoursValue'})
-        if cred_elem is None:  # abort course parsing if the credit element is missing
-            self.nav_to_courses_from_course()   # ensure we return to the courses list
-            raise errors.MissingElementError(f'credit element missing for {course_code}')
-        course_credits = float(cred_elem.text.strip())
-
-        # fetch course requisites
-        course_requisites = []
-        prereqlink = self.dc.html.find('a', {'id': 'pg0_V_lnkbCourseRequisites'})
-        if prereqlink is not None:
-
-            # navigate to the course requisites page
-            action, payload = self.dc.prepare_payload(nav_element=prereqlink)
-            post_url = self.dc.BASE_URL + action
-            self.dc.http_post(post_url, data=payload)
-            course_requisites = self.parse_course_requisites()
-
-            self.nav_to_courses_from_requisites()
-        else:
-            self.nav_to_courses_from_course()
+        course_code, section = split_section(nav_element.text)
+
+        # the round trip through the course pages is left out of the navigation path
+        with self.dc.excursion():
+
+            # navigate to the course overview page
+            with self.dc.labelled('course'):
+                yield call(self.dc.postback, nav_element)
+
+            # fetch data from this page
+            try:
+                details, requisites_fields, back_fields = yield call(self.dc.extract, extract_course_page, course_code)
+            except errors.MissingElementError:
+                yield from self.nav_to_courses_from_course()  # ensure we return to the courses list
+                raise
+            course_title, course_term, course_credits = details
+
+            # fetch course requisites, other sections of the course may have resolved them already
+            course_requisites = self.requisite_cache.get(self.current_term, course_code)
+            if course_requisites is None and requisites_fields is not None:
+
+                # navigate to the course requisites page
+                with self.dc.labelled('requisites'):
+                    yield call(self.dc.postback, fields=requisites_fields)
+                course_requisites, results_fields = yield call(self.dc.extract, extract_requisites_page)
+                self.requisite_cache.put(self.current_term, course_code, course_requisites)
+
+                yield from self.nav_to_courses_from_requisites(results_fields)
+            else:
+                yield from self.nav_to_courses_from_course(back_fields)
+
+        if course_requisites is None:
+            course_requisites = []
 
         # construct course class from data
-        course = Course(course_code, course_title, course_term, course_credits, course_requisites)
+        course = Course(course_code, course_title, course_term, course_credits, course_requisites, section)
+        if course_cache is not None:
+            course_cache.put(self.current_term, cache_key, fingerprint, course)
         return course
 
     def parse_course_requisites(self):
-        pattern = re.compile(r'([A-Z]{2,5})([0-9]{2,4}[A-Z]*)')
-
-        def parse_req_type(_req_type: str) -> str:
-            if _req_type.startswith('Prerequisite'):
-                return 'prerequisite'
-            if _req_type.startswith('Corequisite'):
-                return 'corequisite'
-            return 'other'
-
-        def parse_req_name(_req_name: str) -> str:
-            first_word = _req_name.split(' ', 1)[0]
-            match = pattern.match(first_word)
-            if match:
-                first, second = match.groups()
-                return first + ' ' + second
-            return first_word
-
-        requisites = {}
-        table = self.dc.html.find('tbody', {'class': 'gbody'})
-        if table is not None:
-            for row in table.find_all('tr'):
-                cells = row.find_all('td')
-                if len(cells) != 5:
-                    continue
-                _, _, rgroup, rtype, rname = tuple(cells)
-                rgroup_val = rgroup.text.strip()
-                rtype_val = rtype.text.strip()
-                rname_val = rname.text.strip()
-
-                if rgroup_val != '':
-                    try:
-                        group_num = int(rgroup_val)
-                        if group_num not in requisites:
-                            requisites[group_num] = []
-                        requisites[group_num].append((parse_req_type(rtype_val), parse_req_name(rname_val)))
-                    except ValueError:
-                        print('group number could not be converted to an int')
-        return [v for _, v in requisites.items()]
-
-    def nav_to_courses_from_course(self):
-        """ Navigates back to the course list from a course overview page. """
+        return parse_course_requisites(self.dc.html)
+
+    def nav_to_courses_from_course(self, fields=None):
+        """Navigates back to the course list from a course overview page.
+
+        :param fields: the postback fields of the back link if they were extracted already
+        """
+
+        if fields is not None:
+            with self.dc.labelled('results'):
+                yield call(self.dc.postback, fields=fields)
+            return
 
         back_btn = self.dc.html.find('a', {'id': 'pg0_V_lnkBack'})
-        action, payload = self.dc.prepare_payload(nav_element=back_btn)
-        post_url = self.dc.BASE_URL + action
-        self.dc.http_post(post_url, data=payload)
+        with self.dc.labelled('results'):
+            yield call(self.dc.postback, back_btn)
+
+    def nav_to_courses_from_requisites(self, fields=None):
+        """Navigates back to the course list from a course requisite page.
 
-    def nav_to_courses_from_requisites(self):
-        """ Navigates back to the course list from a course requisite page. """
+        :param fields: the postback fields of the breadcrumb if they were extracted already
+        """
+
+        if fields is not None:
+            with self.dc.labelled('results'):
+                yield call(self.dc.postback, fields=fields)
+            return
 
         breadcrumbs = self.dc.html.find('span', {'id': 'portlet-breadcrumbs'})
         if breadcrumbs is None:
             raise Exception('failed to navigate to courses from requisite page')
         for bread in breadcrumbs.find_all('a'):
             if bread.text == 'Results':
-                action, payload = self.dc.prepare_payload(nav_element=bread)
-                post_url = self.dc.BASE_URL + action
-                self.dc.http_post(post_url, data=payload)
+                with self.dc.labelled('results'):
+                    yield call(self.dc.postback, bread)
                 break
 
 
+class AsyncCourseScraperSession(CourseScraperLogic, AsyncScraperSession):
+    """ Web-scraping thread for obtaining the courses of the pages it takes from its team's `WorkQueue`. """
+
+
 class AsyncCourseScraper(AsyncScraperManager):
 
-    def __init__(self, username, password, callback):
-        super().__init__(username, password, AsyncCourseScraperSession, callback)
+    def __init__(self, username, password, callback, pool=None, course_cache=None, requisite_cache=None,
+                 fields=None, query=None, checkpoint=None, concurrency=None, metrics=None,
+                 parse_pool=None, shard=None, team_size=None):
+        """Constructor
+
+        :param username: the username to be used for logging into mygcc
+        :param password: the password to be used for logging into mygcc
+        :param callback: a callback for the scraped courses to be sent to
+        :param pool: an optional `SessionPool` to borrow logged-in sessions from, may be shared
+        :param course_cache: an optional `CourseCache` to skip the detail pages of unchanged rows
+        :param requisite_cache: an optional `RequisiteCache` kept across runs, each run uses a new one otherwise
+        :param fields: the `COURSE_FIELDS` needed, the detail pages are skipped unless the requisites are
+        :param query: an optional `CourseQuery` restricting which courses are searched
+        :param checkpoint: an optional `CrawlCheckpoint` to resume an interrupted crawl from
+        :param concurrency: an optional `ConcurrencyController` adapting the requests in flight to the server
+        :param metrics: optional `ScraperMetrics` to report to, may be shared
+        :param parse_pool: an optional `ParsePool` parsing the course pages on behalf of the threads, may be shared
+        :param shard: an optional (index, count) tuple, only every count-th term starting at index is scraped
+        :param team_size: how many threads a team has, see `AsyncScraperManager`
+        :raises ValueError: if an unknown field was given
+        """
+
+        self.course_cache = course_cache
+        self.requisite_cache = requisite_cache
+        self.fields = check_fields(fields)
+        self.query = query
+        self.checkpoint = checkpoint
+        self.shard = shard
+        self.stats = None
+        super().__init__(username, password, AsyncCourseScraperSession, callback, pool, concurrency,
+                         metrics, parse_pool, team_size)
+
+    def session_kwargs(self):
+        """Shares the caches, requested fields, query, checkpoint and statistics with every session of a new thread team.
+
+        The `CourseCrawlStats` of the newest team are kept in `stats`.
+        """
+
+        requisite_cache = self.requisite_cache if self.requisite_cache is not None else RequisiteCache()
+        self.stats = CourseCrawlStats()
+        return {'course_cache': self.course_cache, 'requisite_cache': requisite_cache, 'fields': self.fields,
+                'stats': self.stats, 'query': self.query, 'checkpoint': self.checkpoint, 'shard': self.shard}
+
+    def completed(self, sessions):
+        """ Saves the course cache once, and lets the next crawl start over once this one has scraped every page. """
+
+        if self.course_cache is not None:
+            self.course_cache.save()
+        if self.checkpoint is not None and not any(session.failed for session in sessions):
+            self.checkpoint.clear(AsyncCourseScraperSession.CHECKPOINT_NAME)
+
+    def create_work_queue(self):
+        """ Returns the queue of results pages shared by a new thread team. """
+
+        return WorkQueue()
@@ -0,0 +1,228 @@
+from gccutils.asyncscrapers.adviseescraper import AsyncAdviseeScraper
+from gccutils.asyncscrapers.coursescraper import AsyncCourseScraper
+from gccutils.session_pool import SessionPool
+import threading
+import socket
+import time
+import os
+
+
+__all__ = ('LedgerScraperManager', 'LedgerCourseScraper', 'LedgerAdviseeScraper', 'course_key', 'advisee_key')
+
+
+def course_key(course):
+    """ Returns the key a `Course` is committed under, unique within a crawl. """
+
+    return f'{course.term}|{course.code}|{course.section}'
+
+
+def advisee_key(student):
+    """ Returns the key an advisee is committed under, unique within a crawl. """
+
+    return student['user_id']
+
+
+class LedgerScraperManager:
+    """Takes part in a crawl split across several machines that share a `WorkLedger`.
+
+    The crawl is divided into units, each of which is a shard of an `AsyncScraperManager`
+    subclass taking a `shard`, such as every n-th term of the course catalog. Every node
+    runs a manager with its own login and the same crawl name; the managers lease units
+    from the ledger and scrape each one with a thread team, sending heartbeats to keep
+    the lease while they do. Once a unit is done without an error its results are
+    committed, and only then passed to the callback of the node that committed them.
+
+    A node keeps asking for work until the whole crawl is finished, so the units of a
+    node that died are scraped by another once their leases run out. Units that fail
+    `max_attempts` times are given up on, which is reported by `failed`.
+    """
+
+    # seconds between asking for work while the remaining units are leased to other nodes
+    POLL_INTERVAL = 5.0
+
+    def __init__(self, username, password, scraper, ledger, crawl, key, callback=None, units=16, lease=120.0,
+                 max_attempts=3, owner=None, pool=None, **scraper_kwargs):
+        """Constructor
+
+        :param username: the username to be used for logging into mygcc
+        :param password: the password to be used for logging into mygcc
+        :param scraper: the `AsyncScraperManager` subclass scraping a unit, it has to take a `shard`
+        :param ledger: the `WorkLedger` shared by the nodes
+        :param crawl: the name of the crawl, the same on every node
+        :param key: a function returning the unique key of a result
+        :param callback: an optional callback for the results committed by this node to be sent to
+        :param units: how many units to divide the crawl into, unless another node already has
+        :param lease: seconds a unit stays leased without a heartbeat
+        :param max_attempts: how often a unit is leased before it is given up on, None to never give up
+        :param owner: identifies this node, defaults to its host name and process id
+        :param pool: an optional `SessionPool` to borrow logged-in sessions from, the units share one otherwise
+        :param scraper_kwargs: further arguments of the scraper
+        :raises ValueError: if a checkpoint was given, the ledger keeps the progress of the crawl instead
+        """
+
+        if scraper_kwargs.get('checkpoint') is not None:
+            raise ValueError('the ledger scrapers do not support checkpoints')
+        self.__username = username
+        self.__password = password
+        self.__callback = callback
+        self.scraper = scraper
+        self.ledger = ledger
+        self.crawl = crawl
+        self.key = key
+        self.units = units
+        self.lease = lease
+        self.max_attempts = max_attempts
+        self.owner = owner or f'{socket.gethostname()}:{os.getpid()}'
+        self.pool = pool if pool is not None else SessionPool(username, password)
+        self.scraper_kwargs = scraper_kwargs
+        self.committed = 0  # how many units this node committed during the latest run
+        self.failed = False  # whether the crawl was left unfinished or units were given up on during the latest run
+        self.__stopping = threading.Event()
+        self.__runner = None  # the thread of `start`
+
+    def is_running(self):
+        """ Returns whether or not the manager is currently running in the background. """
+
+        return self.__runner is not None and self.__runner.is_alive()
+
+    def stop(self):
+        """ Stops scraping, handing the current unit back to the ledger for another node to lease. """
+
+        self.__stopping.set()
+
+    def start(self):
+        """Takes part in the crawl in the background, sending every committed result to the callback.
+
+        :raises RuntimeError: if already running
+        """
+
+        if self.is_running():
+            raise RuntimeError('scrapers are already running')
+
+        self.__runner = threading.Thread(target=self.run, daemon=True)
+        self.__runner.start()
+
+    def start_and_wait(self, deadline=None):
+        """Takes part in the crawl until it is finished and collects the results of every node.
+
+        The results are only complete if the crawl finished without giving up on any unit,
+        check `failed` or the `WorkLedger.progress` of the crawl.
+
+        :param deadline: seconds after which this node stops, returning the results committed so far
+        :return: a list of every result committed to the ledger
+        """
+
+        self.run(deadline=deadline)
+        return self.ledger.results(self.crawl)
+
+    def run(self, deadline=None):
+        """Leases and scrapes units until every unit of the crawl is committed or given up on.
+
+        :param deadline: seconds after which this node stops, defaults to no deadline
+        :return: whether the crawl is finished, which includes units that were given up on
+        """
+
+        expires = None if deadline is None else time.monotonic() + deadline
+        self.__stopping.clear()
+        self.committed = 0
+        self.failed = True  # until the crawl is finished
+        units = self.ledger.create(self.crawl, self.units)
+
+        while not self.__stopping.is_set():
+            remaining = None if expires is None else expires - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                break
+
+            unit = self.ledger.lease(self.crawl, self.owner, self.lease, self.max_attempts)
+            if unit is None:
+                if self.ledger.is_finished(self.crawl):
+                    break
+                # the remaining units are leased to other nodes, which may still die
+                self.__stopping.wait(self.POLL_INTERVAL if remaining is None else min(self.POLL_INTERVAL, remaining))
+                continue
+
+            self.scrape_unit(unit, units, remaining)
+
+        progress = self.ledger.progress(self.crawl)
+        finished = not progress['pending'] and not progress['leased']
+        self.failed = not finished or progress['failed'] > 0
+        if progress['failed']:
+            print(f'ledger scraper {self.owner} gave up on {progress["failed"]} of {units} units of {self.crawl}')
+        return finished
+
+    def scrape_unit(self, unit, units, deadline=None):
+        """Scrapes a leased unit and commits its results, or hands it back if that fails.
+
+        :param unit: the leased unit
+        :param units: how many units the crawl is divided into
+        :param deadline: seconds after which the unit is given up on, defaults to no deadline
+        :return: whether the results of the unit were committed
+        """
+
+        manager = self.scraper(self.__username, self.__password, None, pool=self.pool, shard=(unit, units),
+                               **self.scraper_kwargs)
+        finished = threading.Event()
+        lost = threading.Event()
+
+        def _heartbeat():
+            last_beat = time.monotonic()
+            while not finished.wait(0.5):
+                if self.__stopping.is_set():
+                    manager.stop()  # repeated as the team may still be starting when asked to stop
+                if time.monotonic() - last_beat >= self.lease / 3:
+                    last_beat = time.monotonic()
+                    if not self.ledger.heartbeat(self.crawl, unit, self.owner, self.lease):
+                        lost.set()
+                        manager.stop()  # the node now holding the lease scrapes the unit instead
+
+        heart = threading.Thread(target=_heartbeat, daemon=True)
+        heart.start()
+        values = None
+        try:
+            values = manager.start_and_wait(deadline=deadline)
+        finally:
+            finished.set()
+            heart.join()
+            if values is None or manager.failed or self.__stopping.is_set():
+                if not lost.is_set():
+                    self.ledger.release(self.crawl, unit, self.owner)
+
+        if manager.failed or lost.is_set() or self.__stopping.is_set():
+            return False
+        if not self.ledger.commit(self.crawl, unit, self.owner, [(self.key(value), value) for value in values]):
+            return False
+
+        self.committed += 1
+        if self.__callback is not None:
+            for value in values:
+                self.__callback(value)
+        return True
+
+
+class LedgerCourseScraper(LedgerScraperManager):
+    """Takes part in scraping the course catalog across machines, every unit being a share of the terms."""
+
+    def __init__(self, username, password, ledger, crawl='courses', callback=None, **kwargs):
+        """Constructor
+
+        :param kwargs: further arguments of `LedgerScraperManager` and `AsyncCourseScraper`
+
+        See `LedgerScraperManager` for a description of the other parameters.
+        """
+
+        super().__init__(username, password, AsyncCourseScraper, ledger, crawl, course_key, callback, **kwargs)
+
+
+class LedgerAdviseeScraper(LedgerScraperManager):
+    """Takes part in scraping the advisees across machines, every unit being a share of the roster pages."""
+
+    def __init__(self, username, password, ledger, crawl='advisees', callback=None, **kwargs):
+        """Constructor
+
+        :param kwargs: further arguments of `LedgerScraperManager` and `AsyncAdviseeScraper`
+
+        See `LedgerScraperManager` for a description of the other parameters.
+        """
+
+        kwargs.setdefault('team_size', 1)
+        super().__init__(username, password, AsyncAdviseeScraper, ledger, crawl, advisee_key, callback, **kwargs)
@@ -0,0 +1,317 @@
+from gccutils.asyncscrapers.adviseescraper import AsyncAdviseeScraper
+from gccutils.asyncscrapers.coursescraper import AsyncCourseScraper, CourseScraperLogic, find_terms
+from gccutils.instrumentation import RequestStats
+from gccutils.parse_pool import process_context
+from gccutils.scraper_utils import ScraperUtils
+from gccutils.session_pool import SessionPool
+import multiprocessing
+import contextlib
+import traceback
+import threading
+import queue
+import time
+
+
+__all__ = ('ProcessScraperManager', 'ProcessCourseScraper', 'ProcessAdviseeScraper')
+
+
+def _run_worker(scraper, username, password, shard, team_size, scraper_kwargs, results, stop, deadline, base_url):
+    """The main function of a worker process, running a thread team on its shard of the work.
+
+    Every message put into the results queue is a (kind, shard index, payload) tuple:
+    a "result" for every result, the "stats" of the team once it has stopped, an
+    "error" with the formatted traceback if the team failed, and lastly "done".
+    """
+
+    ScraperUtils.BASE_URL = base_url  # the parent may point its scrapers elsewhere, such as at a `FakePortal`
+    index = shard[0]
+    finished = threading.Event()
+    watcher = None
+    try:
+        manager = scraper(username, password, None, shard=shard, team_size=team_size, **scraper_kwargs)
+
+        def _watch():
+            # the stop event is polled rather than waited for, a process exiting while waiting
+            # for a multiprocessing event leaves it unable to be set by any other process
+            while not finished.wait(0.5):
+                if stop.is_set():
+                    manager.stop()  # repeated as the team may still be starting when asked to stop
+
+        watcher = threading.Thread(target=_watch, daemon=True)
+        watcher.start()
+
+        try:
+            with contextlib.closing(manager.results(deadline=deadline)) as team_results:
+                for value in team_results:
+                    if stop.is_set():
+                        break
+                    results.put(('result', index, value))
+        finally:
+            results.put(('stats', index, (manager.request_stats, getattr(manager, 'stats', None))))
+
+    except Exception:
+        results.put(('error', index, traceback.format_exc()))
+    finally:
+        finished.set()
+        if watcher is not None:
+            watcher.join()
+        results.put(('done', index, None))
+
+
+class ProcessScraperManager:
+    """Runs a thread team in each of several worker processes, every team scraping a shard of the work.
+
+    A single interpreter runs one thread at a time, so the threads of one team cannot
+    keep more than about one core busy. Every worker process runs its own logged-in
+    team of an `AsyncScraperManager` subclass that takes a `shard`, and streams its
+    results back to this process over a queue.
+
+    Every worker logs in a team of its own, so a run logs in `processes * team_size`
+    sessions. The teams are kept small by default and subclasses that can tell how
+    many shards the work splits into never start more workers than that, see `count_shards`.
+    They look at the work with a session borrowed from `pool`, which stays logged in for the next run.
+
+    The arguments of the scraper are pickled into every worker, so each process gets
+    its own copy: pools, caches, checkpoints and metrics are not shared between them.
+    Once a run is over, the `RequestStats` of every team are merged into `request_stats`,
+    with the sessions numbered (shard index, session), and the crawl statistics of the
+    teams into `stats` if the scraper keeps any.
+
+    Like the thread teams, results are either passed to the callback by `start`,
+    collected by `start_and_wait` or streamed by iterating over the manager.
+    """
+
+    # seconds the workers are given to stop once asked to, before they are terminated
+    STOP_TIMEOUT = 30.0
+    # how many threads each worker runs by default, the processes are what spreads the load
+    TEAM_SIZE = 2
+
+    def __init__(self, username, password, scraper, callback=None, processes=None, team_size=None, queue_size=1024,
+                 pool=None, **scraper_kwargs):
+        """Constructor
+
+        :param username: the username to be used for logging into mygcc
+        :param password: the password to be used for logging into mygcc
+        :param scraper: the `AsyncScraperManager` subclass each worker runs, it has to take a `shard`
+        :param callback: an optional callback for the results of `start` to be sent to
+        :param processes: how many worker processes to run at most, defaults to the number of cpu cores
+        :param team_size: how many threads each worker runs, defaults to `TEAM_SIZE`
+        :param queue_size: how many results may be buffered before the workers have to wait
+        :param pool: an optional `SessionPool` lending the session of `count_shards`, may be shared,
+            the workers log in on their own
+        :param scraper_kwargs: further picklable arguments of the scraper
+        :raises ValueError: if a checkpoint was given, the first shard to finish would clear the progress of the others
+        """
+
+        if scraper_kwargs.get('checkpoint') is not None:
+            raise ValueError('the process scrapers do not support checkpoints')
+        self.__username = username
+        self.__password = password
+        self.__callback = callback
+        self.scraper = scraper
+        self.processes = processes or multiprocessing.cpu_count()
+        self.team_size = team_size or self.TEAM_SIZE
+        self.queue_size = queue_size
+        self.pool = pool if pool is not None else SessionPool(username, password)
+        self.scraper_kwargs = scraper_kwargs
+        self.request_stats = None
+        self.stats = None
+        self.failed = False  # whether a worker failed or had to be terminated during the latest run
+        self.shard_count = None  # how many shards the latest run was split into
+        self.__workers = []
+        self.__stop = None
+        self.__runner = None  # the thread of `start`
+
+    def is_running(self):
+        """ Returns whether or not any worker process is currently running. """
+
+        if self.__runner is not None and self.__runner.is_alive():
+            return True
+        return any(worker.is_alive() for worker in self.__workers)
+
+    def stop(self):
+        """Asks every worker process to abort its team.
+
+        The workers stop as soon as their threads have, which takes up to the duration
+        of the requests they are waiting for; `results` returns once they have.
+        """
+
+        if self.__stop is not None:
+            self.__stop.set()
+
+    def start(self):
+        """Runs the worker processes in the background, sending every result to the callback.
+
+        :raises RuntimeError: if already running
+        """
+
+        if self.is_running():
+            raise RuntimeError('scrapers are already running')
+
+        iterator = self.results()
+        callback = self.__callback
+
+        def _run():
+            for value in iterator:
+                callback(value)
+
+        self.__runner = threading.Thread(target=_run, daemon=True)
+        self.__runner.start()
+
+    def start_and_wait(self, deadline=None):
+        """Runs the worker processes and collects their results.
+
+        :param deadline: seconds after which the workers are stopped, returning the results so far
+        :return: a list of every result
+        :raises RuntimeError: if already running
+        """
+
+        return list(self.results(deadline=deadline))
+
+    def __iter__(self):
+        return self.results()
+
+    def results(self, deadline=None):
+        """Runs the worker processes and yields their results as they arrive.
+
+        Leaving the loop early or passing the deadline stops every worker, waiting for
+        them to send the statistics of their teams. Workers that do not stop within
+        `STOP_TIMEOUT` seconds are terminated.
+
+        :param deadline: seconds after which the workers are stopped, defaults to no deadline
+        :raises RuntimeError: if already running
+        """
+
+        if any(worker.is_alive() for worker in self.__workers):
+            raise RuntimeError('scrapers are already running')
+
+        context = process_context()
+        results = context.Queue(self.queue_size)
+        stop = self.__stop = context.Event()
+        expires = None if deadline is None else time.monotonic() + deadline
+        self.request_stats = RequestStats()
+        self.stats = None
+        self.failed = False
+
+        # every shard has work to do, a worker without any would still log in a whole team
+        count = self.processes
+        shards = self.count_shards()
+        if shards is not None:
+            count = min(count, shards)
+        self.shard_count = count
+        self.__workers = workers = [
+            context.Process(target=_run_worker, daemon=True, args=(
+                self.scraper, self.__username, self.__password, (i, count), self.team_size, self.scraper_kwargs,
+                results, stop, deadline, ScraperUtils.BASE_URL))
+            for i in range(count)]
+        for worker in workers:
+            worker.start()
+
+        done = set()
+        try:
+            while len(done) < count:
+                timeout = 0.5 if expires is None else max(0, min(0.5, expires - time.monotonic()))
+                try:
+                    kind, index, payload = results.get(timeout=timeout)
+                except queue.Empty:
+                    if expires is not None and time.monotonic() >= expires:
+                        return  # the deadline has passed, leaving the work unfinished
+                    # a worker that exited with an error code was killed before it could report
+                    for i, worker in enumerate(workers):
+                        if i not in done and worker.exitcode:
+                            print(f'scraper process [{i}|{count}] exited with code {worker.exitcode}')
+                            self.failed = True
+                            done.add(i)
+                    continue
+
+                if kind == 'result':
+                    yield payload
+                elif kind == 'done':
+                    done.add(index)
+                else:
+                    self._receive(kind, index, payload)
+
+        finally:
+            stop.set()
+            # workers waiting for room in the queue are let through until every one has stopped
+            grace = time.monotonic() + self.STOP_TIMEOUT
+            while any(worker.is_alive() for worker in workers) and time.monotonic() < grace:
+                try:
+                    kind, index, payload = results.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+                if kind not in ('result', 'done'):
+                    self._receive(kind, index, payload)
+
+            for worker in workers:
+                if worker.is_alive():
+                    self.failed = True
+                    worker.terminate()
+                worker.join()
+            results.close()
+
+    def count_shards(self):
+        """Counts the units of work the shards are made of, such as the terms of the catalog.
+
+        Sessions to look at the work with are borrowed from `pool` and have to be returned to it.
+
+        :return: the most shards the work can be split into, or None if that is unknown
+        """
+
+        return None
+
+    def _receive(self, kind, index, payload):
+        """ Handles a message of a worker other than its results. """
+
+        if kind == 'stats':
+            request_stats, stats = payload
+            if request_stats is not None:
+                self.request_stats.merge(request_stats, prefix=index)
+            if stats is not None:
+                if self.stats is None:
+                    self.stats = stats
+                else:
+                    self.stats.merge(stats)
+        elif kind == 'error':
+            self.failed = True
+            print(f'scraper process [{index}|{self.shard_count}] failed:\n{payload}')
+
+
+class ProcessCourseScraper(ProcessScraperManager):
+    """Scrapes the course catalog with a thread team per process, splitting the terms between the processes."""
+
+    def __init__(self, username, password, callback=None, processes=None, team_size=None, **kwargs):
+        """Constructor
+
+        :param kwargs: further picklable arguments of `AsyncCourseScraper`, such as `fields` or `query`
+
+        See `ProcessScraperManager` for a description of the other parameters.
+        """
+
+        super().__init__(username, password, AsyncCourseScraper, callback, processes, team_size, **kwargs)
+
+    def count_shards(self):
+        """ Counts the terms to scrape, loading the course search with a session of the pool. """
+
+        dc = self.pool.acquire()
+        try:
+            dc.http_get(dc.to_url(CourseScraperLogic.COURSE_ROUTE), params=CourseScraperLogic.QUERYPARAMS)
+            query = self.scraper_kwargs.get('query')
+            return len(query.select_terms(dc.html) if query is not None else find_terms(dc.html))
+        finally:
+            self.pool.release(dc)
+
+
+class ProcessAdviseeScraper(ProcessScraperManager):
+    """Scrapes the advisees with a session per process, splitting the roster pages between the processes."""
+
+    def __init__(self, username, password, callback=None, processes=None, team_size=1, **kwargs):
+        """Constructor
+
+        :param team_size: how many threads each worker runs, one as advisee scraping is less stable with more
+        :param kwargs: further picklable arguments of `AsyncAdviseeScraper`
+
+        See `ProcessScraperManager` for a description of the other parameters.
+        """
+
+        super().__init__(username, password, AsyncAdviseeScraper, callback, processes, team_size, **kwargs)
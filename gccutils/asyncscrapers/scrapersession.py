@@ -1,12 +1,23 @@
+from gccutils.instrumentation import RequestStats
 from gccutils.scraper_utils import ScraperUtils
+from gccutils.session_pool import SessionPool
+from gccutils.session_steps import run_steps
 import multiprocessing
+import functools
 import threading
+import asyncio
+import queue
+import time
 
 
 class AsyncScraperSession(threading.Thread):
-    """ The base class for implementing a threaded web-scraper. """
+    """The base class for implementing a threaded web-scraper.
 
-    def __init__(self, username, password, callback, thread_num, num_threads):
+    The work of a session is written as a generator of steps, see `gccutils.session_steps`,
+    so that the asyncio sessions can share it.
+    """
+
+    def __init__(self, username, password, callback, thread_num, num_threads, dc=None, work_queue=None):
         """Constructor
 
         :param username: the username to be used for logging in
@@ -14,15 +25,22 @@ class AsyncScraperSession(threading.Thread):
         :param callback: the callback to send the results to
         :param thread_num: the identifier for this thread
         :param num_threads: how many threads there are
+        :param dc: an already logged-in `ScraperUtils` to use instead of logging in
+        :param work_queue: an optional `WorkQueue` shared by the thread team
         """
 
         threading.Thread.__init__(self)
         self.callback = callback
         self.thread_num = thread_num
         self.num_threads = num_threads
-        self.dc = ScraperUtils()
-        self.dc.perform_login(username, password)
+        if dc is None:
+            dc = ScraperUtils()
+            dc.perform_login(username, password)
+        self.dc = dc
+        self.work_queue = work_queue
         self.aborted = False
+        self.failed = False  # whether part of the work was lost to an error
+        self.request_hook = None  # the hook recording the requests of this thread in the team's `RequestStats`
 
     def abort(self):
         """Asks the thread to stop running as soon as it is convenient.
@@ -30,11 +48,42 @@ class AsyncScraperSession(threading.Thread):
         This does not guarantee that the thread will stop!
         """
         self.aborted = True
+        if self.work_queue is not None:
+            self.work_queue.close()  # wakes the threads waiting for work
+        self.dc.aborted = True
+        if self.dc.controller is not None:
+            self.dc.controller.wake()  # wakes the threads waiting to send a request
+
+    @property
+    def tag(self):
+        """ Identifies the thread within its team in log messages. """
+
+        return f'thread [{self.thread_num}|{self.num_threads}]'
+
+    @property
+    def position(self):
+        """ Returns the (number, count) of this thread within its team. """
+
+        return self.thread_num, self.num_threads
+
+    def emit(self, value):
+        """Passes a result to the callback.
+
+        :param value: the result to pass along
+        """
+
+        self.callback(value)
 
     def run(self):
-        """The primary method of this thread.
+        """The primary method of this thread, running the steps of its work.
 
         Do not manually call this method. Use `AsyncScraperSession#start()` instead.
+        """
+
+        run_steps(self.steps())
+
+    def steps(self):
+        """Returns the generator of steps that makes up the work of this session.
 
         :raises NotImplementedError: if not overridden
         """
@@ -45,15 +94,35 @@ class AsyncScraperManager:
     """The base class for managing threaded `AsyncScraperSession`'s.
 
     When run, spawns a thread team equal to the number of cpu cores available.
+    The logged-in sessions of the team are borrowed from a `SessionPool` and
+    returned to it once the team is done, so rerunning skips logging in.
+
+    The requests of every team are timed, their `RequestStats` are kept in `request_stats`.
+    Given `ScraperMetrics`, the sessions of every team report to them as well, along
+    with the results passed to the callback and the sessions in use.
+
+    Given a `ParsePool`, the threads hand the pages they extract data from to its
+    processes instead of parsing them themselves, see `ScraperUtils.extract`.
+
+    With a `ConcurrencyController` the team instead grows to the most requests the
+    controller allows in flight, while the controller decides how many of the
+    threads may actually have a request in flight at any time.
     """
 
-    def __init__(self, username, password, session, callback):
+    def __init__(self, username, password, session, callback, pool=None, concurrency=None, metrics=None,
+                 parse_pool=None, team_size=None):
         """Constructor
 
         :param username: the username to be used for logging into mygcc
         :param password: the password to be used for logging into mygcc
         :param session:  the `AsyncScraperSession` class to be used
         :param callback: a callback for the result of the scraper to be sent to
+        :param pool: an optional `SessionPool` to borrow logged-in sessions from, may be shared
+        :param concurrency: an optional `ConcurrencyController` adapting the requests in flight to the server
+        :param metrics: optional `ScraperMetrics` to report to, may be shared
+        :param parse_pool: an optional `ParsePool` parsing pages on behalf of the threads, may be shared
+        :param team_size: how many threads a team has, defaults to the maximum of the controller if
+            there is one and to the number of cpu cores otherwise
         """
 
         self.__username = username
@@ -61,16 +130,39 @@ class AsyncScraperManager:
         self.__callback = callback
         self.__sessions = []
         self.__session = session
-        self._cpu_count = multiprocessing.cpu_count()
+        self.controller = concurrency
+        self.metrics = metrics
+        self.parse_pool = parse_pool
+        self.request_stats = None
+        self.failed = False  # whether the latest run lost part of its work to an error or left it unfinished
+        self._watcher = None  # the thread waiting for the team started by `start` to stop
+        # the size of the thread team
+        if not team_size:
+            team_size = concurrency.maximum if concurrency is not None else multiprocessing.cpu_count()
+        self._cpu_count = team_size
+        if pool is None:
+            # the sessions of the pool report their logins from the start
+            factory = ScraperUtils if metrics is None else functools.partial(ScraperUtils, metrics=metrics)
+            pool = SessionPool(username, password, factory=factory)
+        self.pool = pool
         self.reset()  # creates the initial thread team
 
+    @property
+    def concurrency(self):
+        """ Returns how many threads of the team may currently have a request in flight. """
+
+        if self.controller is not None:
+            return self.controller.concurrency
+        return self._cpu_count
+
     def is_running(self):
         """ Returns whether or not the thread team is currently running. """
 
         for session in self.__sessions:
             if session.is_alive():
                 return True
-        return False
+        # the team has stopped once `completed` has been called as well
+        return self._watcher is not None and self._watcher.is_alive()
 
     def start(self):
         """Starts the thread team.
@@ -82,30 +174,158 @@ class AsyncScraperManager:
         if self.is_running():
             raise RuntimeError('scrapers are already running')
 
-        for session in self.__sessions:
-            session.start()
+        # the previous team has already been returned to the pool
+        if not self.__sessions:
+            self.reset()
+        sessions = self.__sessions
 
-    def start_and_wait(self):
-        # make sure the threads are not already running
-        if self.is_running():
-            raise RuntimeError('scrapers are already running')
+        self.failed = True  # until every thread has gone through its work
+        self._start_sessions(sessions)
+        self._watcher = threading.Thread(target=self._watch, args=(sessions,))
+        self._watcher.start()
 
-        values = []
+    def _start_sessions(self, sessions):
+        """ Starts the threads of a team, counting their sessions as active until they are released. """
 
-        def _internal_callback(value):
-            nonlocal values
-            values.append(value)
+        if self.metrics is not None:
+            self.metrics.active_sessions.inc(len(sessions))
+        for session in sessions:
+            session.start()
 
-        self.__callback = _internal_callback
-        self.reset()
+    def _watch(self, sessions):
+        """ Waits for the threads started by `start` to stop, records how the run went and releases them. """
 
-        for session in self.__sessions:
-            session.start()
-        for session in self.__sessions:
+        for session in sessions:
             session.join()
+        self._finish(sessions)
+        self.release()
 
-        return values
+    def _finish(self, sessions):
+        """Records how a run went once every thread of its team has stopped.
+
+        `completed` is only called if no thread was stopped before going through its work.
+
+        :param sessions: the sessions of the team that has stopped
+        """
+
+        if any(session.aborted for session in sessions):
+            return  # the work was left unfinished
+        self.failed = any(session.failed for session in sessions)
+        self.completed(sessions)
+
+    def start_and_wait(self, deadline=None):
+        """Runs the thread team and collects their results.
+
+        :param deadline: seconds after which the team is stopped, returning the results so far
+        :return: a list of every result
+        :raises RuntimeError: if already running
+        """
 
+        return list(self.results(deadline=deadline))
+
+    def __iter__(self):
+        return self.results()
+
+    def __aiter__(self):
+        return self.aresults()
+
+    def results(self, queue_size=1024, deadline=None):
+        """Runs a new thread team and yields their results as they arrive.
+
+        The results pass through a bounded queue, so the threads wait whenever the
+        consumer falls behind and memory use stays constant. Leaving the loop early
+        aborts the team and waits for every thread to stop.
+
+        Once the deadline passes the loop ends as if every result had been yielded.
+        The requests of the team are cut short by it as well, so the threads stop
+        within moments instead of finishing the request they are waiting on.
+
+        :param queue_size: how many results may be buffered before the threads have to wait
+        :param deadline: seconds after which the team is stopped, defaults to no deadline
+        :raises RuntimeError: if already running
+        """
+
+        # make sure the threads are not already running
+        if self.is_running():
+            raise RuntimeError('scrapers are already running')
+
+        results = queue.Queue(queue_size)
+        finished = object()  # marks that every thread has stopped
+
+        callback = self.__callback
+        self.__callback = results.put
+        try:
+            self.reset()
+        finally:
+            self.__callback = callback
+        sessions = self.__sessions
+
+        expires = None
+        if deadline is not None:
+            expires = time.monotonic() + deadline
+            for session in sessions:
+                session.dc.deadline = expires
+
+        def _watch():
+            for session in sessions:
+                session.join()
+            results.put(finished)
+
+        self._start_sessions(sessions)
+        watcher = threading.Thread(target=_watch, daemon=True)
+        watcher.start()
+
+        self.failed = True  # until every thread has gone through its work
+        try:
+            while True:
+                try:
+                    value = results.get(timeout=None if expires is None else max(0, expires - time.monotonic()))
+                except queue.Empty:
+                    return  # the deadline has passed, leaving the work unfinished
+                if value is finished:
+                    break
+                yield value
+
+            self._finish(sessions)
+
+        finally:
+            self.stop()
+            # threads waiting for room in the queue are let through until every one has stopped
+            while watcher.is_alive():
+                try:
+                    results.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+            self.release()
+
+    async def aresults(self, queue_size=1024, deadline=None):
+        """Runs a new thread team and yields their results to a coroutine as they arrive.
+
+        See `results` for a description of the parameters, the event loop is never
+        blocked while waiting for the threads. Leaving the loop early aborts the team
+        once the generator is closed, use `contextlib.aclosing(manager.aresults())`
+        to do so immediately instead of whenever it gets garbage collected.
+        """
+
+        loop = asyncio.get_running_loop()
+        iterator = self.results(queue_size, deadline)
+        finished = object()
+        pending = None  # the call of `next` running in the executor
+
+        try:
+            while True:
+                pending = loop.run_in_executor(None, next, iterator, finished)
+                value = await asyncio.shield(pending)  # cancelling the wait leaves the call running
+                if value is finished:
+                    break
+                yield value
+        finally:
+            # a generator cannot be closed while `next` is still running it, which it is
+            # when cancelled while waiting, so the team is stopped to let that call return
+            if pending is not None and not pending.done():
+                self.stop()
+                await asyncio.gather(pending, return_exceptions=True)
+            await loop.run_in_executor(None, iterator.close)
 
     def stop(self):
         """ Sends an abort request to each of the threads. """
@@ -113,12 +333,60 @@ class AsyncScraperManager:
         for session in self.__sessions:
             session.abort()
 
+    def completed(self, sessions):
+        """Called once a run of `start` or `results` has gone through all of its work without being stopped.
+
+        :param sessions: the sessions of the team that has finished
+        """
+
+        pass
+
+    def create_work_queue(self):
+        """Creates the work queue shared by a new thread team.
+
+        :return: a `WorkQueue`, or None if the sessions divide the work among themselves
+        """
+
+        return None
+
+    def session_kwargs(self):
+        """Returns the extra keyword arguments passed to every session of a new thread team.
+
+        :return: a dictionary of keyword arguments
+        """
+
+        return {}
+
+    def release(self):
+        """Returns the logged-in sessions of finished threads to the pool.
+
+        Threads that are still running keep their sessions.
+        """
+
+        sessions = self.__sessions
+        self.__sessions = [session for session in sessions if session.is_alive()]
+        for session in sessions:
+            if not session.is_alive():
+                dc = session.dc
+                dc.flush_events()
+                if session.request_hook in dc.hooks:
+                    dc.hooks.remove(session.request_hook)
+                dc.deadline = None
+                dc.aborted = False
+                dc.controller = None
+                dc.parse_pool = None
+                dc.metrics = None
+                if self.metrics is not None and session.ident is not None:
+                    self.metrics.active_sessions.dec()  # only the sessions of started threads were counted
+                self.pool.release(dc)
+
     def reset(self):
         """ Aborts any running threads and resets the thread team to be rerun. """
 
         # abort any currently running threads
         # this has no effect if the threads are hanging
         self.stop()
+        self.release()
 
         # localizing the variables for quicker lookup
         cpu_count = self._cpu_count
@@ -127,6 +395,28 @@ class AsyncScraperManager:
         callback = self.__callback
         session = self.__session
 
+        # borrows logged-in sessions, any missing ones log in concurrently
+        dcs = self.pool.acquire_many(cpu_count)
+        work_queue = self.create_work_queue()
+        session_kwargs = self.session_kwargs()
+
+        # every borrowed session reports its requests to the controller and metrics
+        metrics = self.metrics
+        for dc in dcs:
+            dc.controller = self.controller
+            dc.parse_pool = self.parse_pool
+            if metrics is not None:
+                dc.metrics = metrics
+        if metrics is not None and callback is not None:
+            callback = metrics.counting_rows(callback, type(self).__name__)
+
         # creating the thread team
-        self.__sessions = [session(username, password, callback, i, cpu_count)
-                           for i in range(cpu_count)]
+        self.__sessions = [session(username, password, callback, i, cpu_count,
+                                   dc=dc, work_queue=work_queue, **session_kwargs)
+                           for i, dc in enumerate(dcs)]
+
+        # the requests of each thread are timed until its session is returned to the pool
+        self.request_stats = RequestStats()
+        for i, thread in enumerate(self.__sessions):
+            thread.request_hook = self.request_stats.hook(i)
+            thread.dc.hooks.append(thread.request_hook)
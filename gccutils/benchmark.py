@@ -0,0 +1,268 @@
+from gccutils.asyncscrapers.coursescraper import AsyncCourseScraper, LIST_FIELDS
+from gccutils.parsers import available_parsers, parse_html
+from gccutils.form_state import extract_form_state
+from gccutils.parse_pool import ParsePool, extract_page
+from gccutils.scraper_utils import ScraperUtils
+from gccutils.session_pool import SessionPool
+import multiprocessing
+import threading
+import argparse
+import getpass
+import timeit
+import time
+import os
+
+
+def load_pages(paths):
+    """Reads saved html pages from disk.
+
+    Directories are searched (non-recursively) for files ending in `.html` or `.htm`.
+
+    :param paths: an iterable of file and directory paths
+    :return: a list of (filename, raw html text) tuples
+    """
+
+    pages = []
+    for path in paths:
+        if os.path.isdir(path):
+            filenames = sorted(os.path.join(path, name) for name in os.listdir(path)
+                               if name.endswith(('.html', '.htm')))
+        else:
+            filenames = [path]
+        for filename in filenames:
+            with open(filename, encoding='utf-8', errors='replace') as file:
+                pages.append((filename, file.read()))
+    return pages
+
+
+def benchmark_parsers(pages, parsers=None, repeat=5, number=10):
+    """Times how long each parser backend takes to process the given pages.
+
+    Every timing covers building the tree and running the per-request consumers
+    of `ScraperUtils` (`prepare_payload` and `check_for_error_message`) over it.
+
+    :param pages: a list of (name, raw html text) tuples
+    :param parsers: the parser backends to compare, defaults to all installed backends
+    :param repeat: how many timing rounds to perform per page
+    :param number: how many parses to perform per timing round
+    :return: dictionary mapping parser -> page name -> best seconds per parse
+    """
+
+    dc = ScraperUtils()
+    results = {}
+
+    for parser in parsers or available_parsers():
+        results[parser] = {}
+        for name, text in pages:
+
+            def _parse():
+                html = parse_html(text, parser)
+                dc.prepare_payload(html=html)
+                try:
+                    dc.check_for_error_message(html=html)
+                except Exception:
+                    pass  # error pages are still valid benchmark input
+
+            best = min(timeit.repeat(_parse, repeat=repeat, number=number))
+            results[parser][name] = best / number
+
+    return results
+
+
+def benchmark_form_state(pages, repeat=5, number=10):
+    """Times building a payload with the streaming extractor against walking a parsed tree.
+
+    :param pages: a list of (name, raw html text) tuples
+    :param repeat: how many timing rounds to perform per page
+    :param number: how many extractions to perform per timing round
+    :return: dictionary mapping page name -> (tree seconds, streaming seconds)
+    """
+
+    results = {}
+    for name, text in pages:
+        tree = min(timeit.repeat(lambda: ScraperUtils.prepare_payload_from_html(parse_html(text)),
+                                 repeat=repeat, number=number))
+        stream = min(timeit.repeat(lambda: extract_form_state(text).payload(),
+                                   repeat=repeat, number=number))
+        results[name] = (tree / number, stream / number)
+    return results
+
+
+def verify_form_state(pages):
+    """Checks that the streaming extractor builds the same payloads as walking the parsed tree.
+
+    :param pages: a list of (name, raw html text) tuples
+    :return: a list of the names of pages whose payloads differ
+    """
+
+    mismatches = []
+    for name, text in pages:
+        action, payload = ScraperUtils.prepare_payload_from_html(parse_html(text))
+        form_state = extract_form_state(text)
+        # the field order is compared as well since it determines the posted body
+        if action != form_state.action or list(payload.items()) != list(form_state.fields.items()):
+            mismatches.append(name)
+    return mismatches
+
+
+def _count_elements(html):
+    """ Stands in for the page-specific extractors, walking the whole tree once. """
+
+    return len(html.find_all(True))
+
+
+def _timed_extract(*args):
+    """ Runs `extract_page` within a process of the pool, returning the cpu time it took there. """
+
+    start = time.process_time()
+    extract_page(*args)
+    return time.process_time() - start
+
+
+def benchmark_parse_pool(pages, threads=(1, 2, 4, 8), parser=None, number=10):
+    """Compares parsing pages on the threads of a team against handing them to a `ParsePool`.
+
+    Every configuration has its threads parse each page `number` times between them,
+    just as the sessions of a team extract data from the pages they fetch. The cpu
+    time includes the time the processes of the pool spent parsing, so the cores in
+    use show how far parsing scales.
+
+    :param pages: a list of (name, raw html text) tuples
+    :param threads: the team sizes to compare
+    :param parser: the parser backend to use, defaults to `ScraperUtils.DEFAULT_PARSER`
+    :param number: how many times each page is parsed per configuration
+    :return: dictionary mapping (mode, threads) -> (pages per second, cores in use), mode being 'threads' or 'pool'
+    """
+
+    parser = parser or ScraperUtils.DEFAULT_PARSER
+    jobs = [(text.encode('utf-8'), 'utf-8', parser, _count_elements) for _, text in pages] * number
+
+    results = {}
+    for mode in ('threads', 'pool'):
+        for thread_count in threads:
+            parse_pool = ParsePool() if mode == 'pool' else None
+            if parse_pool is not None:
+                # the processes are started before the timing begins, they only start once they are all busy
+                starters = [threading.Thread(target=parse_pool.parse, args=(time.sleep, 0.2))
+                            for _ in range(parse_pool.processes)]
+                for starter in starters:
+                    starter.start()
+                for starter in starters:
+                    starter.join()
+
+            pool_cpu = []
+
+            def _work(share):
+                for job in share:
+                    if parse_pool is None:
+                        extract_page(*job)
+                    else:
+                        pool_cpu.append(parse_pool.parse(_timed_extract, *job))
+
+            team = [threading.Thread(target=_work, args=(jobs[i::thread_count],)) for i in range(thread_count)]
+            cpu, start = time.process_time(), time.perf_counter()
+            for thread in team:
+                thread.start()
+            for thread in team:
+                thread.join()
+            seconds = time.perf_counter() - start
+            cpu = time.process_time() - cpu + sum(pool_cpu)
+            if parse_pool is not None:
+                parse_pool.close()
+
+            results[(mode, thread_count)] = (len(jobs) / seconds, cpu / seconds)
+    return results
+
+
+def benchmark_course_scraper(username, password, fields=LIST_FIELDS):
+    """Crawls the course catalog with every field and again with only the given fields.
+
+    Both crawls share logged-in sessions, so logging in is not part of either timing.
+
+    :param username: the username to be used for logging into mygcc
+    :param password: the password to be used for logging into mygcc
+    :param fields: the `COURSE_FIELDS` of the second crawl
+    :return: dictionary mapping 'full' and 'fields' -> (seconds, requests sent, courses scraped)
+    """
+
+    lock = threading.Lock()
+    sent = 0
+
+    def _count(response, *args, **kwargs):
+        nonlocal sent
+        with lock:
+            sent += 1
+
+    def _factory():
+        dc = ScraperUtils()
+        dc.session.hooks['response'].append(_count)
+        return dc
+
+    pool = SessionPool(username, password, factory=_factory)
+    pool.fill(multiprocessing.cpu_count())
+
+    results = {}
+    for name, crawl_fields in (('full', None), ('fields', fields)):
+        scraper = AsyncCourseScraper(username, password, None, pool=pool, fields=crawl_fields)
+        sent = 0
+        start = time.perf_counter()
+        courses = scraper.start_and_wait()
+        results[name] = (time.perf_counter() - start, sent, len(courses))
+    return results
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(
+        prog='python -m gccutils.benchmark',
+        description='Compares parse times of the html parser backends over saved MyGCC pages.')
+    arg_parser.add_argument('pages', nargs='*', help='saved html files or directories containing them')
+    arg_parser.add_argument('--parser', action='append', dest='parsers', help='parser backend to include')
+    arg_parser.add_argument('--repeat', type=int, default=5, help='timing rounds per page')
+    arg_parser.add_argument('--number', type=int, default=10, help='parses per timing round')
+    arg_parser.add_argument('--form-state', action='store_true',
+                            help='verify and time the streaming form-state extractor instead')
+    arg_parser.add_argument('--parse-pool', action='store_true',
+                            help='compare parsing on threads against a process pool instead')
+    arg_parser.add_argument('--threads', type=int, action='append',
+                            help='thread team size to compare with --parse-pool, defaults to 1, 2, 4 and 8')
+    arg_parser.add_argument('--course-crawl', metavar='USERNAME',
+                            help='compare a full course crawl against a list-only one instead, logging in as USERNAME')
+    args = arg_parser.parse_args(argv)
+
+    if args.course_crawl:
+        results = benchmark_course_scraper(args.course_crawl, getpass.getpass())
+        for name, (seconds, sent, courses) in results.items():
+            print(f'{name:<8} {seconds:10.2f} s  {sent:8} requests  {courses:8} courses')
+        return 0
+
+    if not args.pages:
+        arg_parser.error('the following arguments are required: pages')
+    pages = load_pages(args.pages)
+
+    if args.form_state:
+        mismatches = verify_form_state(pages)
+        for name in mismatches:
+            print(f'payload mismatch: {name}')
+        for name, (tree, stream) in benchmark_form_state(pages, args.repeat, args.number).items():
+            print(f'{tree * 1000:10.2f} ms tree  {stream * 1000:10.2f} ms streaming  {os.path.basename(name)}')
+        return 1 if mismatches else 0
+
+    if args.parse_pool:
+        parser = args.parsers[0] if args.parsers else None
+        results = benchmark_parse_pool(pages, args.threads or (1, 2, 4, 8), parser, args.number)
+        print(f'{"mode":<8} {"threads":>7} {"pages/s":>10} {"cores":>6}   ({multiprocessing.cpu_count()} available)')
+        for (mode, thread_count), (rate, cores) in results.items():
+            print(f'{mode:<8} {thread_count:7} {rate:10.1f} {cores:6.2f}')
+        return 0
+
+    results = benchmark_parsers(pages, args.parsers, args.repeat, args.number)
+
+    for parser, timings in results.items():
+        total = sum(timings.values())
+        print(f'{parser:<12} {total * 1000:10.2f} ms total')
+        for name, seconds in timings.items():
+            print(f'    {seconds * 1000:10.2f} ms  {os.path.basename(name)}')
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
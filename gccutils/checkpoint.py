@@ -0,0 +1,135 @@
+import threading
+import sqlite3
+import json
+import os
+
+
+__all__ = ('CrawlCheckpoint',)
+
+
+class CrawlCheckpoint:
+    """The progress of long-running crawls kept in a SQLite database.
+
+    Crawls record which units of work (such as results pages) they have started and
+    finished, how many rows of each they have emitted, and which results they have
+    emitted by key. A restarted crawl consults the checkpoint to carry on where the
+    previous one stopped without emitting anything twice. Several crawls can share
+    one database as every record is scoped by the name of its crawl.
+
+    A row counts as emitted once it has been handed to the callback, so results
+    still buffered by `results` when the process dies are not emitted again.
+    """
+
+    def __init__(self, path=None):
+        """Constructor
+
+        :param path: the SQLite database to keep the progress in, defaults to ~/.cache/gccutils/checkpoint.db
+        """
+
+        if path is None:
+            path = os.path.join(os.path.expanduser('~'), '.cache', 'gccutils', 'checkpoint.db')
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._connection:
+            self._connection.execute(
+                'CREATE TABLE IF NOT EXISTS pages (crawl TEXT, unit TEXT, rows_done INTEGER, has_next INTEGER, '
+                'done INTEGER, PRIMARY KEY (crawl, unit))')
+            self._connection.execute(
+                'CREATE TABLE IF NOT EXISTS emitted (crawl TEXT, key TEXT, PRIMARY KEY (crawl, key))')
+
+    @staticmethod
+    def _unit(unit):
+        """ Serializes a unit of work, such as a `CoursePage`. """
+
+        return json.dumps(list(unit) if isinstance(unit, tuple) else unit)
+
+    def _execute(self, sql, parameters=()):
+        """ Runs a statement within its own transaction, returning every resulting row. """
+
+        with self._lock, self._connection:
+            return self._connection.execute(sql, parameters).fetchall()
+
+    def page(self, crawl, unit):
+        """Looks up the progress of a unit of work.
+
+        :param crawl: the name of the crawl
+        :param unit: the unit of work
+        :return: a (rows done, has next, done) tuple, or None if the unit was never started
+        """
+
+        rows = self._execute('SELECT rows_done, has_next, done FROM pages WHERE crawl = ? AND unit = ?',
+                             (crawl, self._unit(unit)))
+        if not rows:
+            return None
+        rows_done, has_next, done = rows[0]
+        return rows_done, bool(has_next), bool(done)
+
+    def start_page(self, crawl, unit, has_next):
+        """Records that a unit of work has been started, keeping the rows it already emitted.
+
+        :param crawl: the name of the crawl
+        :param unit: the unit of work
+        :param has_next: whether another unit follows this one
+        """
+
+        self._execute('INSERT INTO pages VALUES (?, ?, 0, ?, 0) '
+                      'ON CONFLICT (crawl, unit) DO UPDATE SET has_next = excluded.has_next',
+                      (crawl, self._unit(unit), int(has_next)))
+
+    def record_rows(self, crawl, unit, rows_done):
+        """Records how many rows of a unit of work have been emitted.
+
+        :param crawl: the name of the crawl
+        :param unit: the unit of work
+        :param rows_done: how many rows from the start of the unit are done
+        """
+
+        self._execute('UPDATE pages SET rows_done = MAX(rows_done, ?) WHERE crawl = ? AND unit = ?',
+                      (rows_done, crawl, self._unit(unit)))
+
+    def finish_page(self, crawl, unit):
+        """Records that every row of a unit of work has been emitted.
+
+        :param crawl: the name of the crawl
+        :param unit: the unit of work
+        """
+
+        self._execute('UPDATE pages SET done = 1 WHERE crawl = ? AND unit = ?', (crawl, self._unit(unit)))
+
+    def is_emitted(self, crawl, key):
+        """Checks whether a result has been emitted already.
+
+        :param crawl: the name of the crawl
+        :param key: the unique key of the result, such as a student id
+        :return: True if the result was emitted
+        """
+
+        return bool(self._execute('SELECT 1 FROM emitted WHERE crawl = ? AND key = ?', (crawl, str(key))))
+
+    def record_emitted(self, crawl, key):
+        """Records that a result has been emitted.
+
+        :param crawl: the name of the crawl
+        :param key: the unique key of the result, such as a student id
+        """
+
+        self._execute('INSERT OR IGNORE INTO emitted VALUES (?, ?)', (crawl, str(key)))
+
+    def clear(self, crawl):
+        """Forgets the progress of a crawl, so that it starts over.
+
+        :param crawl: the name of the crawl
+        """
+
+        self._execute('DELETE FROM pages WHERE crawl = ?', (crawl,))
+        self._execute('DELETE FROM emitted WHERE crawl = ?', (crawl,))
+
+    def close(self):
+        """ Closes the database connection. """
+
+        self._connection.close()
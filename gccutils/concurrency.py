@@ -0,0 +1,235 @@
+import gccutils.errors as errors
+import threading
+import asyncio
+import time
+
+
+__all__ = ('ConcurrencyController', 'AioConcurrencyController')
+
+
+class ConcurrencyController:
+    """Limits how many requests a team of sessions has in flight, adapting the limit to the server.
+
+    The limit follows the additive increase, multiplicative decrease scheme of TCP
+    congestion control. After every window of completed requests it is cut by the
+    decrease factor if too many of them failed or were throttled, or if their mean
+    latency rose above the target latency. Otherwise it grows by one, as long as
+    requests had to wait for the limit during the window.
+
+    Without a target latency, the lowest mean latency of any window so far serves as
+    the baseline that the mean latency may exceed by the latency tolerance. An
+    optional requests-per-second cap spaces out the start of requests regardless of
+    the limit.
+    """
+
+    def __init__(self, initial=4, minimum=1, maximum=16, max_rps=None, target_latency=None,
+                 latency_tolerance=2.0, error_threshold=0.05, decrease=0.5, window=20):
+        """Constructor
+
+        :param initial: how many requests may be in flight at first
+        :param minimum: the lowest the limit may fall to
+        :param maximum: the highest the limit may rise to, which is also the size of a team using it
+        :param max_rps: an optional cap on how many requests start per second
+        :param target_latency: the mean latency in seconds above which the limit is cut
+        :param latency_tolerance: how far the mean latency may rise above the baseline without a target
+        :param error_threshold: the share of failed or throttled requests above which the limit is cut
+        :param decrease: the factor the limit is multiplied with when cut
+        :param window: how many completed requests each adjustment is based on
+        :raises ValueError: if the bounds or factors are out of range
+        """
+
+        if not 1 <= minimum <= initial <= maximum:
+            raise ValueError('the limits must satisfy 1 <= minimum <= initial <= maximum')
+        if max_rps is not None and max_rps <= 0:
+            raise ValueError('the requests-per-second cap must be positive')
+        if not 0 < decrease < 1:
+            raise ValueError('the decrease factor must be between 0 and 1')
+        if window < 1:
+            raise ValueError('the window must hold at least one request')
+
+        self.minimum = minimum
+        self.maximum = maximum
+        self.max_rps = max_rps
+        self.target_latency = target_latency
+        self.latency_tolerance = latency_tolerance
+        self.error_threshold = error_threshold
+        self.decrease = decrease
+        self.window = window
+
+        self.in_flight = 0
+        self.baseline = None      # the lowest mean latency of any window
+        self._limit = float(initial)
+        self._next_start = 0.0    # the earliest time the next request may start at
+        self._latencies = []
+        self._failures = 0
+        self._saturated = False   # whether a request had to wait for the limit during the window
+        self._lock = threading.Condition()
+
+    @property
+    def concurrency(self):
+        """ Returns how many requests may currently be in flight. """
+
+        return int(self._limit)
+
+    def _try_acquire(self):
+        """Takes a slot if the limit allows, the threaded controller holds its lock while calling this.
+
+        :return: the seconds to wait before starting the request, or None if no slot is free
+        """
+
+        if self.in_flight >= self.concurrency:
+            self._saturated = True
+            return None
+        self.in_flight += 1
+
+        if self.max_rps is None:
+            return 0.0
+        now = time.monotonic()
+        start = max(now, self._next_start)
+        self._next_start = start + 1 / self.max_rps
+        return start - now
+
+    def acquire(self, timeout=None, aborted=None):
+        """Waits until a request may be sent, blocking while the limit is reached.
+
+        :param timeout: the most seconds to wait, such as the time left before a deadline, defaults to no limit
+        :param aborted: an optional callable telling whether the scraper waiting was stopped,
+            it is checked whenever `wake` is called
+        :raises DeadlineExceededError: if the request may not be sent within the timeout
+        :raises AbortedError: if the scraper was stopped while waiting
+        """
+
+        expires = None if timeout is None else time.monotonic() + timeout
+        with self._lock:
+            delay = self._try_acquire()
+            while delay is None:
+                self._wait(expires, expires, aborted)
+                delay = self._try_acquire()
+
+            # the slot is taken, the request waits for its turn under the requests-per-second cap
+            start = time.monotonic() + delay
+            try:
+                while time.monotonic() < start:
+                    self._wait(start if expires is None else min(start, expires), expires, aborted)
+            except errors.ScraperError:
+                self.in_flight -= 1  # the slot was taken for a request that is never sent
+                self._lock.notify_all()
+                raise
+
+    def _wait(self, until, expires, aborted):
+        """Waits for the lock to be notified or for a time to come, holding the lock.
+
+        :param until: the `time.monotonic` time to wait until at most, None to wait for a notification
+        :param expires: the `time.monotonic` time the timeout of `acquire` runs out at, if any
+        :param aborted: the callable of `acquire` telling whether the scraper waiting was stopped
+        :raises DeadlineExceededError: if the timeout has run out
+        :raises AbortedError: if the scraper was stopped
+        """
+
+        if aborted is not None and aborted():
+            raise errors.AbortedError('The scraper was stopped while waiting to send a request.')
+        now = time.monotonic()
+        if expires is not None and now >= expires:
+            raise errors.DeadlineExceededError('The scrape ran past its deadline.')
+        self._lock.wait(None if until is None else until - now)
+
+    def wake(self):
+        """ Wakes the threads waiting in `acquire`, so that those whose scraper was stopped give up. """
+
+        with self._lock:
+            self._lock.notify_all()
+
+    def release(self, latency, failed=False):
+        """Frees the slot of a completed request and records how it went.
+
+        :param latency: the seconds the request took
+        :param failed: whether the request failed or the server throttled it
+        """
+
+        with self._lock:
+            self.in_flight -= 1
+            self._record(latency, failed)
+            self._lock.notify_all()
+
+    def _record(self, latency, failed):
+        """ Records a completed request, adjusting the limit once the window is full. """
+
+        self._latencies.append(latency)
+        self._failures += bool(failed)
+        if len(self._latencies) < self.window:
+            return
+
+        mean = sum(self._latencies) / len(self._latencies)
+        if self.baseline is None or mean < self.baseline:
+            self.baseline = mean
+        target = self.target_latency
+        if target is None:
+            target = self.baseline * self.latency_tolerance
+
+        if self._failures / len(self._latencies) > self.error_threshold or mean > target:
+            self._limit = max(self.minimum, self._limit * self.decrease)
+        elif self._saturated:
+            self._limit = min(self.maximum, self._limit + 1)
+
+        self._latencies = []
+        self._failures = 0
+        self._saturated = False
+
+
+class AioConcurrencyController(ConcurrencyController):
+    """The asyncio counterpart of `ConcurrencyController` for sessions sharing an event loop.
+
+    `acquire` is a coroutine, every other method is the same as for `ConcurrencyController`.
+    """
+
+    def __init__(self, *args, **kwargs):
+        """ Constructor, see `ConcurrencyController` for a description of the parameters. """
+
+        super().__init__(*args, **kwargs)
+        self._wakeup = None  # created lazily as it has to belong to the running loop
+
+    async def acquire(self, timeout=None):
+        """Waits until a request may be sent, see `ConcurrencyController.acquire`.
+
+        Stopped scrapers cancel their coroutines, which gives up waiting as well.
+
+        :param timeout: the most seconds to wait, such as the time left before a deadline, defaults to no limit
+        :raises DeadlineExceededError: if the request may not be sent within the timeout
+        """
+
+        if timeout is None:
+            return await self._acquire()
+        try:
+            await asyncio.wait_for(self._acquire(), timeout)
+        except asyncio.TimeoutError:
+            raise errors.DeadlineExceededError('The scrape ran past its deadline.') from None
+
+    async def _acquire(self):
+        """ Waits until a request may be sent without a timeout. """
+
+        delay = self._try_acquire()
+        while delay is None:
+            if self._wakeup is None:
+                self._wakeup = asyncio.Event()
+            self._wakeup.clear()
+            await self._wakeup.wait()
+            delay = self._try_acquire()
+        if delay > 0:
+            try:
+                await asyncio.sleep(delay)
+            except asyncio.CancelledError:
+                self._free_slot()  # the slot was taken for a request that is never sent
+                raise
+
+    def release(self, latency, failed=False):
+        """ Frees the slot of a completed request, see `ConcurrencyController.release`. """
+
+        self._free_slot()
+        self._record(latency, failed)
+
+    def _free_slot(self):
+        """ Frees a slot without recording a request, waking the coroutines waiting for one. """
+
+        self.in_flight -= 1
+        if self._wakeup is not None:
+            self._wakeup.set()
@@ -0,0 +1,189 @@
+import hashlib
+import threading
+import json
+import time
+import os
+
+
+__all__ = ('CourseCache', 'RequisiteCache', 'row_fingerprint')
+
+
+def row_fingerprint(row):
+    """Fingerprints the content of a course search results row.
+
+    The row lists the title, schedule and open seats of a section, so a changed
+    fingerprint means the course has to be scraped again.
+
+    :param row: the table row element of the course section
+    :return: the hex digest of the whitespace-normalized row text
+    """
+
+    text = ' '.join(row.get_text(' ').split())
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+class CourseCache:
+    """A persistent cache of scraped courses keyed by (term, course code, section).
+
+    Every entry remembers the fingerprint of the results row the course was scraped
+    from, letting the course scrapers skip the detail and requisite pages of every
+    row that has not changed since the previous run. The cache is shared by a whole
+    team of sessions and is written to disk as json with `save`.
+    """
+
+    def __init__(self, path=None):
+        """Constructor
+
+        :param path: the json file to keep the cache in, defaults to ~/.cache/gccutils/courses.json
+        """
+
+        if path is None:
+            path = os.path.join(os.path.expanduser('~'), '.cache', 'gccutils', 'courses.json')
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.load()
+
+    def __len__(self):
+        """ Returns how many courses are cached. """
+
+        return len(self._entries)
+
+    @staticmethod
+    def _key(term, section):
+        """ Returns the key of an entry, json objects only support string keys. """
+
+        return f'{term}\0{section}'
+
+    def get(self, term, section, fingerprint):
+        """Looks up a cached course, only returning it if its results row is unchanged.
+
+        :param term: the term the course was searched within
+        :param section: the course code including the section letters, e.g. "COMP 141 A"
+        :param fingerprint: the `row_fingerprint` of the current results row
+        :return: the cached `Course`, or None if it has to be scraped
+        """
+
+        with self._lock:
+            entry = self._entries.get(self._key(term, section))
+            if entry is None or entry['fingerprint'] != fingerprint:
+                self.misses += 1
+                return None
+            self.hits += 1
+
+        from gccutils.asyncscrapers.coursescraper import Course  # avoids a circular import
+        values = entry['course']
+        requisites = [[tuple(requisite) for requisite in group] for group in values['requisites']]
+        return Course(values['code'], values['name'], values['term'], values['credits'], requisites,
+                      values.get('section'))
+
+    def put(self, term, section, fingerprint, course):
+        """Caches a freshly scraped course.
+
+        :param term: the term the course was searched within
+        :param section: the course code including the section letters, e.g. "COMP 141 A"
+        :param fingerprint: the `row_fingerprint` of the results row
+        :param course: the scraped `Course`
+        """
+
+        entry = {'fingerprint': fingerprint, 'course': course.__dict__(), 'scraped': time.time()}
+        with self._lock:
+            self._entries[self._key(term, section)] = entry
+
+    def load(self):
+        """ Reads the cache from disk, starting out empty if there is none yet. """
+
+        try:
+            with open(self.path) as file:
+                entries = json.load(file)
+        except (OSError, ValueError):
+            entries = {}
+        with self._lock:
+            self._entries = entries
+
+    def save(self):
+        """ Writes the cache to disk. """
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        with self._lock:
+            data = json.dumps(self._entries)
+
+        # written to a temporary file first so a crash never leaves a partial cache
+        temp_path = f'{self.path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(temp_path, 'w') as file:
+            file.write(data)
+        os.replace(temp_path, self.path)
+
+    def clear(self):
+        """ Forgets every cached course. """
+
+        with self._lock:
+            self._entries = {}
+
+
+class RequisiteCache:
+    """A thread-safe cache of course requisites keyed by course code.
+
+    Requisites belong to a course rather than to one of its sections, so a team of
+    course scraper sessions only has to visit the requisite page of a course once.
+    """
+
+    def __init__(self, per_term=False):
+        """Constructor
+
+        :param per_term: whether requisites are resolved once per term instead of once overall
+        """
+
+        self.per_term = per_term
+        self._requisites = {}  # key -> (term, requisites)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        """ Returns how many courses have their requisites cached. """
+
+        return len(self._requisites)
+
+    def _key(self, term, course_code):
+        """ Returns the key of a course, which includes the term if requisites are cached per term. """
+
+        return (term, course_code) if self.per_term else course_code
+
+    def get(self, term, course_code):
+        """Looks up the requisites of a course.
+
+        :param term: the term the course was searched within
+        :param course_code: the course code without the section letters, e.g. "COMP 141"
+        :return: the list of requisite groups, or None if they have not been resolved yet
+        """
+
+        with self._lock:
+            entry = self._requisites.get(self._key(term, course_code))
+        return None if entry is None else entry[1]
+
+    def put(self, term, course_code, requisites):
+        """Caches the resolved requisites of a course.
+
+        :param term: the term the course was searched within
+        :param course_code: the course code without the section letters, e.g. "COMP 141"
+        :param requisites: the list of requisite groups
+        """
+
+        with self._lock:
+            self._requisites[self._key(term, course_code)] = (term, requisites)
+
+    def invalidate(self, term=None):
+        """Forgets cached requisites so that they are resolved again.
+
+        :param term: only forget the requisites resolved within this term, defaults to every term
+        """
+
+        with self._lock:
+            if term is None:
+                self._requisites = {}
+            else:
+                self._requisites = {key: entry for key, entry in self._requisites.items() if entry[0] != term}
@@ -29,3 +29,15 @@ class UnauthorizedError(PageError):
 
 class NotLoggedInError(UnauthorizedError):
     """ Caused when navigating to a restricted page without being logged in. """
+
+
+class PartialPostbackError(PageError):
+    """ Caused when an asynchronous postback fails or its response cannot be applied. """
+
+
+class DeadlineExceededError(ScraperError):
+    """ Caused when a request would run past the deadline of the scrape it belongs to. """
+
+
+class AbortedError(ScraperError):
+    """ Caused when a request is given up on because the scraper sending it was stopped. """
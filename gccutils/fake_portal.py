@@ -0,0 +1,672 @@
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer, make_server
+from urllib.parse import parse_qs, parse_qsl
+from collections import namedtuple
+from socketserver import ThreadingMixIn
+from http.cookies import SimpleCookie
+from html import escape
+import threading
+import argparse
+import secrets
+import random
+import string
+import time
+
+
+__all__ = ('FakePortal', 'FakeCourse', 'FakeAdvisee', 'serve')
+
+
+# a section of the course catalog, the requisites are groups of (type, course code) tuples
+FakeCourse = namedtuple('FakeCourse', ('department', 'number', 'section', 'title', 'faculty', 'seats', 'capacity',
+                                       'credits', 'requisites'))
+
+# a student on the advisee roster, the summary is a tuple of (label, value) tuples
+FakeAdvisee = namedtuple('FakeAdvisee', ('user_id', 'first_name', 'last_name', 'email', 'classification', 'major',
+                                         'summary'))
+
+
+DEPARTMENTS = (
+    ('ACCT', 'Accounting'), ('BIOL', 'Biology'), ('CHEM', 'Chemistry'), ('COMP', 'Computer Science'),
+    ('ECON', 'Economics'), ('ENGL', 'English'), ('HIST', 'History'), ('MATH', 'Mathematics'),
+    ('PHYS', 'Physics'), ('PSYC', 'Psychology'))
+SEASONS = (('10', 'Fall'), ('20', 'Spring'), ('30', 'Summer'))
+FIRST_NAMES = ('Abigail', 'Benjamin', 'Caleb', 'David', 'Emma', 'Grace', 'Hannah', 'Isaac', 'Josiah', 'Leah',
+               'Micah', 'Naomi', 'Olivia', 'Samuel', 'Sarah', 'Zachary')
+LAST_NAMES = ('Anderson', 'Baker', 'Campbell', 'Davis', 'Evans', 'Fisher', 'Graham', 'Harris', 'Jackson', 'Miller',
+              'Nelson', 'Parker', 'Reed', 'Stewart', 'Turner', 'Wright')
+CLASSIFICATIONS = ('Freshman', 'Sophomore', 'Junior', 'Senior')
+
+# the banners of the portal, the scrapers recognize the pages they are shown on by them
+REDIRECT_BANNER = ('You have been redirected to this page because you attempted to navigate to a page '
+                   'that is no longer valid.')
+LOGIN_REQUIRED_BANNER = 'Access to this page or some of its features require you to be logged in.'
+LOGIN_ERROR = 'Either the username or the password you entered is incorrect.'
+
+# the postback leading from an advisee back to the roster, which the portal never links to reliably
+STUDENT_TO_ROSTER_TARGET = 'sb00bc534cd-3ee3-4fc5-be95-b3850319f0b8'
+LOGOUT_TARGET = 'siteNavBar$lnkLogout'
+
+COURSE_SEARCH_PATH = '/ICS/Academics/Home.jnz'
+ADVISING_PATH = '/ICS/Advising'
+
+SELECTED = ' selected="selected"'
+
+
+def _postback(target):
+    """ Returns the href of a link posting the form back with the given event target. """
+
+    return f"javascript:__doPostBack('{target}','')"
+
+
+def _pages(rows, page_size):
+    """ Returns how many pages the rows take, an empty list still being shown on a page. """
+
+    return max(1, -(-rows // page_size))
+
+
+def _navigator(page, pages, prefix):
+    """ Renders the pager of a grid, the current page is the only one that is not a link. """
+
+    links = []
+    if page > 1:
+        links.append(f'<a href="{_postback(prefix + "lnkPrev")}">&lt;-- Previous page</a>')
+    for number in range(1, pages + 1):
+        if number == page:
+            links.append(f'<span>{number}</span>')
+        else:
+            links.append(f'<a href="{_postback(f"{prefix}lnkPage{number}")}">{number}</a>')
+    if page < pages:
+        links.append(f'<a href="{_postback(prefix + "lnkNext")}">Next page --&gt;</a>')
+    return f'<div class="letterNavigator">{"".join(links)}</div>'
+
+
+def _row_target(grid, index, control):
+    """ Returns the event target of a control within a grid row, named the way ASP.NET numbers them. """
+
+    return f'pg0$V${grid}$ctl{index + 2:02d}${control}'
+
+
+def _parse_pager(target, prefix, page, pages):
+    """Resolves the event target of a pager link.
+
+    :return: the page the link leads to, or None if the target is not a valid link of the pager
+    """
+
+    if target == prefix + 'lnkNext' and page < pages:
+        return page + 1
+    if target == prefix + 'lnkPrev' and page > 1:
+        return page - 1
+    if target.startswith(prefix + 'lnkPage'):
+        number = target[len(prefix + 'lnkPage'):]
+        if number.isdigit() and 1 <= int(number) <= pages and int(number) != page:
+            return int(number)
+    return None
+
+
+def _parse_row(target, grid, control, rows):
+    """Resolves the event target of a link within a grid row.
+
+    :return: the index of the row on the page, or None if the target is not a link of the grid
+    """
+
+    prefix = f'pg0$V${grid}$ctl'
+    suffix = f'${control}'
+    if not target.startswith(prefix) or not target.endswith(suffix):
+        return None
+    number = target[len(prefix):-len(suffix)]
+    if not number.isdigit() or not 0 <= int(number) - 2 < rows:
+        return None
+    return int(number) - 2
+
+
+class _Session:
+    """ The state the portal keeps for a session cookie. """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.user = None          # the username of the login, None while logged out
+        self.requests = 0         # requests sent since logging in
+        self.screen = 'home'
+        self.viewstate = None     # the view-state token of the page served last
+        self.term = None
+        self.page = 1             # kept across searches, as mygcc does
+        self.page_size = None
+        self.results = []         # the sections matching the latest search
+        self.course = None
+        self.roster_page = 1
+        self.advisee = None
+
+
+class FakePortal:
+    """A WSGI application standing in for MyGCC, so the scrapers can run without the live portal.
+
+    It serves the login form, the Advanced Course Search with its term dropdown, filters,
+    paginated results, course detail and requisite pages, and the advising roster with
+    the overview of every advisee, all through `MAINFORM` postbacks carrying a view-state.
+    The catalog and roster are generated from a seed, so every run serves the same data.
+
+    Every session cookie has its own navigation state like on the real portal: a postback
+    that does not belong to the page served last is answered with the redirect banner,
+    as is one carrying a stale view-state. Faults are injected on request: random redirects,
+    sessions that expire after a number of requests, and latency added to every response.
+
+    Point the scrapers at a running instance by setting `ScraperUtils.BASE_URL` to its url, see `serve`.
+    """
+
+    def __init__(self, terms=3, courses=120, advisees=40, page_size=20, page_sizes=None, roster_page_size=25,
+                 credentials=None, advisor=True, latency=0.0, error_rate=0.0, session_lifetime=None,
+                 viewstate_size=2048, seed=0):
+        """Constructor
+
+        :param terms: how many terms the course search offers
+        :param courses: how many course sections every term lists
+        :param advisees: how many students are on the advisee roster
+        :param page_size: how many sections a results page lists by default
+        :param page_sizes: the page sizes the search form offers, defaults to no page size selector
+        :param roster_page_size: how many students a roster page lists
+        :param credentials: dictionary mapping username -> password of the accepted logins,
+            defaults to the username "student" with the password "password"
+        :param advisor: whether the users may open the advising roster
+        :param latency: seconds added to every response
+        :param error_rate: the fraction of postbacks answered with the redirect banner
+        :param session_lifetime: how many requests a login lasts, defaults to forever
+        :param viewstate_size: the size of the padding of the view-state, mygcc sends tens of kilobytes
+        :param seed: the seed the catalog and roster are generated from
+        :raises ValueError: if a size is not positive
+        """
+
+        if min(terms, page_size, roster_page_size) < 1 or min(courses, advisees) < 0:
+            raise ValueError('the catalog and roster sizes have to be positive')
+
+        self.page_size = page_size
+        self.page_sizes = tuple(page_sizes) if page_sizes else ()
+        self.roster_page_size = roster_page_size
+        self.credentials = credentials if credentials is not None else {'student': 'password'}
+        self.advisor = advisor
+        self.latency = latency
+        self.error_rate = error_rate
+        self.session_lifetime = session_lifetime
+        self.requests = 0  # requests served altogether
+
+        generator = random.Random(seed)
+        self.terms = self._generate_terms(terms)
+        self.catalog = {value: self._generate_sections(generator, courses) for value, _ in self.terms}
+        self.roster = self._generate_roster(generator, advisees)
+        self._padding = ''.join(generator.choice(string.ascii_letters + string.digits + '+/')
+                                for _ in range(viewstate_size))
+
+        self._random = random.Random(seed)  # decides which postbacks fail
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _generate_terms(count):
+        """ Returns the (option value, name) tuples of the terms, the newest first. """
+
+        terms = []
+        year, season = 2024, 0
+        for _ in range(count):
+            code, name = SEASONS[season]
+            terms.append((f'{year};{code}', f'{year} {name}'))
+            season -= 1
+            if season < 0:
+                season, year = len(SEASONS) - 1, year - 1
+        return terms
+
+    @staticmethod
+    def _generate_sections(generator, count):
+        """ Generates the sections of a term, ordered by course code and section like the portal lists them. """
+
+        sections = []
+        offered = {}  # department -> course numbers offered so far, the requisites are taken from them
+        while len(sections) < count:
+            department, name = generator.choice(DEPARTMENTS)
+            number = generator.randrange(101, 500)
+            if number in offered.setdefault(department, []):
+                continue
+
+            requisites = []
+            earlier = [other for other in offered[department] if other < number]
+            if earlier and generator.random() < 0.5:
+                for _ in range(generator.randint(1, 2)):
+                    kind = 'Prerequisite' if generator.random() < 0.8 else 'Corequisite'
+                    requisites.append([(kind, f'{department} {generator.choice(earlier)}')])
+            offered[department].append(number)
+
+            title = f'{name} {generator.choice(("Foundations", "Methods", "Seminar", "Topics", "Principles"))}'
+            credits = generator.choice((1.0, 3.0, 3.0, 3.0, 4.0))
+            for section in 'ABC'[:min(generator.randint(1, 3), count - len(sections))]:
+                capacity = generator.choice((20, 25, 30, 40))
+                faculty = f'{generator.choice(LAST_NAMES)}, {generator.choice(FIRST_NAMES)[0]}.'
+                sections.append(FakeCourse(department, number, section, title, faculty,
+                                           generator.randint(0, capacity), capacity, credits, requisites))
+
+        sections.sort(key=lambda course: (course.department, course.number, course.section))
+        return sections
+
+    @staticmethod
+    def _generate_roster(generator, count):
+        """ Generates the advisees, ordered by name like the portal lists them. """
+
+        roster = []
+        user_ids = generator.sample(range(1000000, 10000000), count)
+        for user_id in user_ids:
+            first_name, last_name = generator.choice(FIRST_NAMES), generator.choice(LAST_NAMES)
+            classification = generator.choice(CLASSIFICATIONS)
+            major = generator.choice(DEPARTMENTS)[1]
+            earned = generator.randint(0, 130)
+            summary = (
+                ('Major', major), ('Minor', generator.choice(DEPARTMENTS)[1]),
+                ('Classification', classification), ('Advisor', 'Faculty, Fake'),
+                ('GPA', f'{generator.uniform(2.0, 4.0):.3f}'), ('Credits Earned', f'{earned:.2f}'),
+                ('Credits In Progress', f'{generator.choice((12, 15, 16, 17)):.2f}'),
+                ('Expected Graduation', f'{2025 + (130 - earned) // 32} Spring'))
+            email = f'{last_name.lower()}{first_name[0].lower()}{user_id % 100:02d}@gcc.edu'
+            roster.append(FakeAdvisee(str(user_id), first_name, last_name, email, classification, major, summary))
+
+        roster.sort(key=lambda advisee: (advisee.last_name, advisee.first_name, advisee.user_id))
+        return roster
+
+    def __call__(self, environ, start_response):
+        with self._lock:
+            self.requests += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+        cookie = SimpleCookie(environ.get('HTTP_COOKIE', ''))
+        session_id = cookie['ASP.NET_SessionId'].value if 'ASP.NET_SessionId' in cookie else None
+        headers = [('Content-Type', 'text/html; charset=utf-8')]
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                session_id = secrets.token_hex(12)
+                session = self._sessions[session_id] = _Session()
+                headers.append(('Set-Cookie', f'ASP.NET_SessionId={session_id}; path=/; HttpOnly'))
+
+        with session.lock:
+            if session.user is not None:
+                session.requests += 1
+                if self.session_lifetime is not None and session.requests > self.session_lifetime:
+                    session.user = None  # the login expired on the server
+
+            if environ['REQUEST_METHOD'] == 'POST':
+                length = int(environ.get('CONTENT_LENGTH') or 0)
+                data = dict(parse_qsl(environ['wsgi.input'].read(length).decode('utf-8'), keep_blank_values=True))
+                status, body = self._post(session, data)
+            else:
+                query = {key: values[0] for key, values in parse_qs(environ.get('QUERY_STRING', '')).items()}
+                status, body = self._get(session, environ.get('PATH_INFO', '/'), query)
+
+        body = body.encode('utf-8')
+        headers.append(('Content-Length', str(len(body))))
+        start_response(status, headers)
+        return [body]
+
+    def _chance(self, rate):
+        """ Returns True with the given probability. """
+
+        with self._lock:
+            return self._random.random() < rate
+
+    # requests #
+
+    def _get(self, session, path, query):
+        """ Serves a page requested by url, which starts a new navigation path. """
+
+        path = path.rstrip('/') or '/'
+        if path in ('/', '/ICS'):
+            session.screen = 'home'
+            return '200 OK', self._home(session)
+
+        if path == COURSE_SEARCH_PATH:
+            if session.user is None:
+                return '200 OK', self._login_required(session)
+            if query.get('portlet') == 'AddDrop_Courses' and query.get('screen') == 'Advanced Course Search':
+                session.screen = 'search'
+                return '200 OK', self._search(session)
+            session.screen = 'home'
+            return '200 OK', self._render(session, 'Academics', '<h2>Academics</h2>', COURSE_SEARCH_PATH)
+
+        if path == ADVISING_PATH:
+            if session.user is None or not self.advisor:
+                return '200 OK', self._login_required(session)
+            session.screen = 'advising'
+            return '200 OK', self._advising(session)
+
+        return '404 Not Found', '<html><body><h1>The resource cannot be found.</h1></body></html>'
+
+    def _post(self, session, data):
+        """ Serves a postback of the page served last. """
+
+        if 'siteNavBar$btnLogin' in data:
+            return '200 OK', self._login(session, data)
+        if session.user is None:
+            return '200 OK', self._login_required(session)
+
+        token = data.get('__VIEWSTATE', '').split('.', 1)[0]
+        if token != session.viewstate or (self.error_rate and self._chance(self.error_rate)):
+            return '200 OK', self._redirected(session)
+
+        target = data.get('__EVENTTARGET', '')
+        if target == LOGOUT_TARGET:
+            session.user = None
+            session.screen = 'home'
+            return '200 OK', self._home(session)
+
+        handler = getattr(self, f'_post_{session.screen}', None)
+        result = handler(session, data, target) if handler is not None else None
+        if result is None:
+            return '200 OK', self._redirected(session)
+        return result
+
+    def _login(self, session, data):
+        """ Logs a session in, or shows the login form with an error if the credentials are wrong. """
+
+        username = data.get('userName', '')
+        if not username or self.credentials.get(username) != data.get('password'):
+            session.user = None
+            session.screen = 'home'
+            return self._home(session, f'<span id="CP_V_lblLoginError" class="error">{LOGIN_ERROR}</span>')
+
+        session.user = username
+        session.requests = 0
+        session.screen = 'home'
+        return self._home(session)
+
+    def _post_search(self, session, data, target):
+        if 'pg0$V$btnSearch' not in data:
+            return None
+
+        terms = dict(self.terms)
+        term = data.get('pg0$V$ddlTerm')
+        if term not in terms:
+            return None
+
+        page_size = session.page_size or self.page_size
+        if self.page_sizes and 'pg0$V$ddlPageSize' in data:
+            requested = data['pg0$V$ddlPageSize']
+            if not requested.isdigit() or int(requested) not in self.page_sizes:
+                return '500 Internal Server Error', '<html><body><h1>Server Error</h1></body></html>'
+            page_size = int(requested)
+
+        department = data.get('pg0$V$ddlDept', '')
+        code = ''.join(data.get('pg0$V$txtCourseCode', '').split()).upper()
+        open_only = 'pg0$V$chkOpenOnly' in data
+        session.results = [
+            course for course in self.catalog[term]
+            if (not department or course.department == department)
+            and f'{course.department}{course.number}'.startswith(code)
+            and (not open_only or course.seats > 0)]
+
+        session.term = term
+        session.page_size = page_size
+        # the results stay on the page of the previous search
+        session.page = min(session.page, _pages(len(session.results), page_size))
+        session.screen = 'results'
+        return '200 OK', self._results(session)
+
+    def _post_results(self, session, data, target):
+        if 'pg0$V$btnSearch' in data:
+            return self._post_search(session, data, target)
+
+        pages = _pages(len(session.results), session.page_size)
+        page = _parse_pager(target, 'pg0$V$', session.page, pages)
+        if page is not None:
+            session.page = page
+            return '200 OK', self._results(session)
+
+        start = (session.page - 1) * session.page_size
+        shown = session.results[start:start + session.page_size]
+        index = _parse_row(target, 'dgCourses', 'lnkCourse', len(shown))
+        if index is None:
+            return None
+        session.course = shown[index]
+        session.screen = 'course'
+        return '200 OK', self._course(session)
+
+    def _post_course(self, session, data, target):
+        if target == 'pg0$V$lnkBack':
+            session.screen = 'results'
+            return '200 OK', self._results(session)
+        if target == 'pg0$V$lnkbCourseRequisites' and session.course.requisites:
+            session.screen = 'requisites'
+            return '200 OK', self._requisites(session)
+        return None
+
+    def _post_requisites(self, session, data, target):
+        if target != 'pg0$V$lnkResults':
+            return None
+        session.screen = 'results'
+        return '200 OK', self._results(session)
+
+    def _post_advising(self, session, data, target):
+        if 'pg0$V$btnSearch' not in data:
+            return None
+        session.roster_page = 1
+        session.screen = 'roster'
+        return '200 OK', self._roster(session)
+
+    def _post_roster(self, session, data, target):
+        pages = _pages(len(self.roster), self.roster_page_size)
+        page = _parse_pager(target, 'pg0$V$', session.roster_page, pages)
+        if page is not None:
+            session.roster_page = page
+            return '200 OK', self._roster(session)
+
+        start = (session.roster_page - 1) * self.roster_page_size
+        shown = self.roster[start:start + self.roster_page_size]
+        index = _parse_row(target, 'dgAdvisees', 'lnkStudent', len(shown))
+        if index is None:
+            return None
+        session.advisee = shown[index]
+        session.screen = 'advisee'
+        return '200 OK', self._advisee(session)
+
+    def _post_advisee(self, session, data, target):
+        if target != STUDENT_TO_ROSTER_TARGET:
+            return None
+        session.screen = 'roster'
+        return '200 OK', self._roster(session)
+
+    # pages #
+
+    def _render(self, session, title, body, action):
+        """ Renders a page of the portal around the `MAINFORM` holding the body. """
+
+        session.viewstate = secrets.token_hex(8)
+        if session.user is not None:
+            user = (f'<span id="siteNavBar_welcomeBackBarLoggedIn">Welcome back, {escape(session.user)}</span>'
+                    f'<a id="logout" href="{_postback(LOGOUT_TARGET)}">Log Out</a>')
+        else:
+            user = ('<input name="userName" type="text" id="userName" />'
+                    '<input name="password" type="password" id="password" />'
+                    '<input type="submit" name="siteNavBar$btnLogin" value="Login" id="siteNavBar_btnLogin" />')
+        return (
+            f'<!DOCTYPE html><html><head><title>{title} | myGCC</title></head><body>'
+            f'<form name="MAINFORM" method="post" action="{action}" id="MAINFORM">'
+            '<input type="hidden" name="__EVENTTARGET" id="__EVENTTARGET" value="" />'
+            '<input type="hidden" name="__EVENTARGUMENT" id="__EVENTARGUMENT" value="" />'
+            f'<input type="hidden" name="__VIEWSTATE" id="__VIEWSTATE" value="{session.viewstate}.{self._padding}" />'
+            '<input type="hidden" name="__VIEWSTATEGENERATOR" id="__VIEWSTATEGENERATOR" value="2F6D2FC1" />'
+            f'<div id="siteNavBar">{user}</div><div id="mainContent">{body}</div>'
+            '</form></body></html>')
+
+    def _home(self, session, message=''):
+        body = f'{message}<h2>Welcome to myGCC</h2>'
+        return self._render(session, 'Home', body, '/ICS/')
+
+    def _login_required(self, session):
+        session.screen = 'home'
+        body = f'<div class="notification error">{LOGIN_REQUIRED_BANNER}</div>'
+        return self._render(session, 'Access Denied', body, '/ICS/')
+
+    def _redirected(self, session):
+        session.screen = 'home'
+        body = f'<div class="notification warning">{REDIRECT_BANNER}</div><h2>Welcome to myGCC</h2>'
+        return self._render(session, 'Home', body, '/ICS/')
+
+    def _search_form(self, session):
+        """ Renders the Advanced Course Search form, keeping the choices of the latest search. """
+
+        options = []
+        for value, name in self.terms:
+            selected = SELECTED if value == (session.term or self.terms[0][0]) else ''
+            options.append(f'<option{selected} value="{value}">{name}</option>')
+        departments = ''.join(f'<option value="{code}">{code} - {name}</option>' for code, name in DEPARTMENTS)
+        form = (
+            '<div id="pg0_V_divSearch"><label for="pg0_V_ddlTerm">Term</label>'
+            f'<select name="pg0$V$ddlTerm" id="pg0_V_ddlTerm">{"".join(options)}</select>'
+            '<label for="pg0_V_ddlDept">Department</label>'
+            f'<select name="pg0$V$ddlDept" id="pg0_V_ddlDept"><option value="">All</option>{departments}</select>'
+            '<label for="pg0_V_txtCourseCode">Course Code</label>'
+            '<input name="pg0$V$txtCourseCode" type="text" id="pg0_V_txtCourseCode" />'
+            '<input name="pg0$V$chkOpenOnly" type="checkbox" id="pg0_V_chkOpenOnly" />'
+            '<label for="pg0_V_chkOpenOnly">Show only courses with open seats</label>')
+        if self.page_sizes:
+            page_size = session.page_size or self.page_size
+            sizes = ''.join(f'<option{SELECTED if size == page_size else ""} value="{size}">{size}</option>'
+                            for size in self.page_sizes)
+            form += f'<select name="pg0$V$ddlPageSize" id="pg0_V_ddlPageSize">{sizes}</select>'
+        return form + '<input type="submit" name="pg0$V$btnSearch" value="Search" id="pg0_V_btnSearch" /></div>'
+
+    def _search(self, session):
+        return self._render(session, 'Advanced Course Search', self._search_form(session), COURSE_SEARCH_PATH)
+
+    def _results(self, session):
+        page_size = session.page_size
+        pages = _pages(len(session.results), page_size)
+        start = (session.page - 1) * page_size
+        rows = []
+        for index, course in enumerate(session.results[start:start + page_size]):
+            target = _row_target('dgCourses', index, 'lnkCourse')
+            rows.append(
+                f'<tr><td><a href="{_postback(target)}">{course.department} {course.number} {course.section}</a></td>'
+                f'<td>{escape(course.title)}</td><td>{escape(course.faculty)}</td>'
+                f'<td>{course.seats}/{course.capacity}</td><td>{course.credits:.2f}</td></tr>'
+                '<tr class="subItem"><td colspan="5">Lecture</td></tr>')
+        body = (
+            f'{self._search_form(session)}{_navigator(session.page, pages, "pg0$V$")}'
+            '<table class="groupedGrid" id="pg0_V_dgCourses"><thead><tr><th>Course Code</th><th>Course Title</th>'
+            f'<th>Faculty</th><th>Seats Open</th><th>Credits</th></tr></thead><tbody class="gbody">{"".join(rows)}'
+            '</tbody></table>')
+        return self._render(session, 'Advanced Course Search', body, COURSE_SEARCH_PATH)
+
+    def _course(self, session):
+        course = session.course
+        term = dict(self.terms)[session.term]
+        requisites = ''
+        if course.requisites:
+            requisites = (f'<a id="pg0_V_lnkbCourseRequisites" href="{_postback("pg0$V$lnkbCourseRequisites")}">'
+                          'Course Requisites</a>')
+        body = (
+            f'<a id="pg0_V_lnkBack" href="{_postback("pg0$V$lnkBack")}">Back</a>'
+            f'<div id="pg0_V_divCourseDetails"><b>{escape(course.title)} ({course.department} {course.number} '
+            f'{course.section})</b><span id="pg0_V_lblTermDescValue">{term},</span>'
+            f'<span id="pg0_V_lblCreditHoursValue">{course.credits:.2f}</span></div>{requisites}')
+        return self._render(session, 'Course Details', body, COURSE_SEARCH_PATH)
+
+    def _requisites(self, session):
+        rows = []
+        for group, requisites in enumerate(session.course.requisites, 1):
+            for kind, code in requisites:
+                rows.append(f'<tr><td></td><td></td><td>{group}</td><td>{kind}</td>'
+                            f'<td>{code.replace(" ", "")} - {code} course</td></tr>')
+        body = (
+            f'<span id="portlet-breadcrumbs"><a href="{_postback("pg0$V$lnkResults")}">Results</a> &gt; '
+            'Requisites</span><table class="groupedGrid"><thead><tr><th></th><th></th><th>Group</th><th>Type</th>'
+            f'<th>Course</th></tr></thead><tbody class="gbody">{"".join(rows)}</tbody></table>')
+        return self._render(session, 'Course Requisites', body, COURSE_SEARCH_PATH)
+
+    def _advising(self, session):
+        body = ('<h2>My Advisees</h2>'
+                '<input type="submit" name="pg0$V$btnSearch" value="Search" id="pg0_V_btnSearch" />')
+        return self._render(session, 'Advising', body, ADVISING_PATH)
+
+    def _roster(self, session):
+        pages = _pages(len(self.roster), self.roster_page_size)
+        start = (session.roster_page - 1) * self.roster_page_size
+        rows = []
+        for index, advisee in enumerate(self.roster[start:start + self.roster_page_size]):
+            rows.append(
+                f'<tr><td><input type="checkbox" name="{_row_target("dgAdvisees", index, "chkSelect")}" /></td>'
+                f'<td><input type="image" name="{_row_target("dgAdvisees", index, "btnEmail")}" src="/email.gif" '
+                f'title="{advisee.email}" /></td>'
+                f'<td><a href="{_postback(_row_target("dgAdvisees", index, "lnkStudent"))}">'
+                f'{escape(advisee.last_name)}, {escape(advisee.first_name)}</a></td>'
+                f'<td>{advisee.user_id}</td><td>{advisee.classification}</td><td>{escape(advisee.major)}</td></tr>')
+        body = (
+            f'{_navigator(session.roster_page, pages, "pg0$V$")}<table class="groupedGrid" id="pg0_V_dgAdvisees">'
+            '<thead><tr><th></th><th>Email</th><th>Name</th><th>ID</th><th>Class</th><th>Major</th></tr></thead>'
+            f'<tbody class="gbody">{"".join(rows)}</tbody></table>')
+        return self._render(session, 'My Advisees', body, ADVISING_PATH)
+
+    def _advisee(self, session):
+        summary = session.advisee.summary
+        half = len(summary) // 2
+
+        def _table(table_id, items):
+            rows = ''.join(f'<tr><th>{label}:</th><td>{escape(value)}</td></tr>' for label, value in items)
+            return f'<table id="{table_id}">{rows}</table>'
+
+        body = (f'<h2>{escape(session.advisee.first_name)} {escape(session.advisee.last_name)}</h2>'
+                f'{_table("pg0_V_tblSummaryLeft", summary[:half])}{_table("pg0_V_tblSummaryRight", summary[half:])}')
+        return self._render(session, 'Advisee Overview', body, ADVISING_PATH)
+
+
+class _ThreadingWSGIServer(ThreadingMixIn, WSGIServer):
+    daemon_threads = True
+
+
+class _QuietHandler(WSGIRequestHandler):
+
+    def log_message(self, format, *args):
+        pass  # the scrapers send far too many requests to be worth logging
+
+
+def serve(portal=None, port=0, host='127.0.0.1'):
+    """Serves a `FakePortal` over http from a background thread.
+
+    :param portal: the `FakePortal` to serve, defaults to one with the default catalog and roster
+    :param port: the port to listen on, 0 picks a free one
+    :param host: the interface to listen on
+    :return: the `wsgiref.simple_server.WSGIServer`, its `url` attribute is the base url of the portal
+        and its `shutdown` method stops serving
+    """
+
+    server = make_server(host, port, portal or FakePortal(), server_class=_ThreadingWSGIServer,
+                         handler_class=_QuietHandler)
+    server.url = f'http://{host}:{server.server_port}'
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(
+        prog='python -m gccutils.fake_portal',
+        description='Serves a stand-in for MyGCC to run the scrapers against without the live portal.')
+    arg_parser.add_argument('--host', default='127.0.0.1', help='interface to listen on')
+    arg_parser.add_argument('--port', type=int, default=8000, help='port to listen on')
+    arg_parser.add_argument('--terms', type=int, default=3, help='terms the course search offers')
+    arg_parser.add_argument('--courses', type=int, default=120, help='course sections every term lists')
+    arg_parser.add_argument('--advisees', type=int, default=40, help='students on the advisee roster')
+    arg_parser.add_argument('--page-size', type=int, default=20, help='sections a results page lists')
+    arg_parser.add_argument('--page-sizes', type=int, nargs='+', help='page sizes the search form offers')
+    arg_parser.add_argument('--latency', type=float, default=0.0, help='seconds added to every response')
+    arg_parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of postbacks redirected')
+    arg_parser.add_argument('--session-lifetime', type=int, help='requests a login lasts')
+    arg_parser.add_argument('--seed', type=int, default=0, help='seed the catalog and roster are generated from')
+    args = arg_parser.parse_args(argv)
+
+    portal = FakePortal(args.terms, args.courses, args.advisees, args.page_size, args.page_sizes,
+                        latency=args.latency, error_rate=args.error_rate, session_lifetime=args.session_lifetime,
+                        seed=args.seed)
+    server = serve(portal, args.port, args.host)
+    print(f'serving a stand-in for mygcc at {server.url}, log in as student / password')
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
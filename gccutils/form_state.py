@@ -0,0 +1,282 @@
+from collections import namedtuple
+from html.parser import HTMLParser
+
+
+__all__ = ('FormState', 'PostBackLink', 'extract_form_state', 'extract_fragment_state', 'extract_element_state',
+           'parse_postback')
+
+
+# an anchor that triggers `__doPostBack(event_target, event_argument)` when clicked
+PostBackLink = namedtuple('PostBackLink', ('element_id', 'text', 'event_target', 'event_argument'))
+
+
+def parse_postback(href):
+    """Extracts the event target and argument from a `__doPostBack` href.
+
+    :param href: the href of a navigation element, such as
+        "javascript:__doPostBack('eventTargetValue','eventArgumentValue')"
+    :return: an (event target, event argument) tuple, or None if the href is not a postback
+    """
+
+    if href is None or '__doPostBack' not in href:
+        return None
+
+    href = href.replace('javascript:__doPostBack(', '')
+    href = href.replace(')', '')
+    href = href.replace("'", '')
+    href_elements = href.split(',', 1)
+    if len(href_elements) == 2:
+        return href_elements[0], href_elements[1]
+    return None
+
+
+class FormState:
+    """The state MyGCC keeps within the hidden fields and controls of its `MAINFORM`."""
+
+    def __init__(self, action='', fields=None, submits=None, postbacks=None):
+        """Constructor
+
+        :param action: the url path the form posts to
+        :param fields: the field names and values a browser would submit by default
+        :param submits: the names and values of the submit buttons within the form
+        :param postbacks: a list of `PostBackLink`'s found within the form
+        """
+
+        self.action = action
+        self.fields = fields if fields is not None else {}
+        self.submits = submits if submits is not None else {}
+        self.postbacks = postbacks if postbacks is not None else []
+        self.panels = {}  # client id -> `FormState` of every UpdatePanel re-rendered since the page was loaded
+
+    def payload(self):
+        """ Returns a copy of the default payload to be modified and posted. """
+
+        return dict(self.fields)
+
+    def find_postback(self, text=None, element_id=None):
+        """Finds the first postback link matching the given text and/or element id.
+
+        :param text: the exact text of the link
+        :param element_id: the id attribute of the link
+        :return: the matching `PostBackLink` or None if not found
+        """
+
+        for postback in self.postbacks:
+            if text is not None and postback.text != text:
+                continue
+            if element_id is not None and postback.element_id != element_id:
+                continue
+            return postback
+        return None
+
+    def merge(self, other, replaced=None):
+        """Updates this state with the controls of a re-rendered part of the form.
+
+        The controls of the part as it was before are dropped first, so that those removed
+        from it are no longer posted, while its postback links take precedence over any
+        older links with the same text.
+
+        :param other: the `FormState` of the re-rendered part
+        :param replaced: the `FormState` of the part before it was re-rendered, if known
+        """
+
+        if replaced is not None:
+            for name in replaced.fields:
+                self.fields.pop(name, None)
+            for name in replaced.submits:
+                self.submits.pop(name, None)
+            self.postbacks = [postback for postback in self.postbacks if postback not in replaced.postbacks]
+
+        self.fields.update(other.fields)
+        self.submits.update(other.submits)
+        self.postbacks = other.postbacks + [
+            postback for postback in self.postbacks if postback not in other.postbacks]
+
+
+class _FormStateParser(HTMLParser):
+    """Collects the `MAINFORM` state while streaming through a page, without building a tree.
+
+    Uses the same tokenizer as BeautifulSoup's `html.parser` backend, so it sees
+    exactly the tags that `ScraperUtils.prepare_payload` walks over.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.action = None
+        self.form_depth = 0    # nesting depth of <form> tags within MAINFORM
+        self.finished = False  # only the first MAINFORM is considered
+        self.selects = []      # [name, first option value, selected option value]
+        self.select = None
+        self.inputs = []       # (name, value) pairs to include in the payload
+        self.submits = {}
+        self.postbacks = []
+        self.anchor = None     # [element id, text chunks, target, argument]
+
+    def handle_starttag(self, tag, attrs):
+        # BeautifulSoup represents valueless attributes as empty strings
+        attrs = {key: '' if value is None else value for key, value in attrs}
+
+        if self.form_depth == 0:
+            if tag == 'form' and not self.finished and attrs.get('name') == 'MAINFORM':
+                self.action = attrs.get('action', '')
+                self.form_depth = 1
+            return
+
+        if tag == 'form':
+            self.form_depth += 1
+
+        elif tag == 'select':
+            self.select = [attrs.get('name'), None, None]
+            self.selects.append(self.select)
+
+        elif tag == 'option':
+            select = self.select
+            if select is not None:
+                value = attrs.get('value', '')
+                if select[1] is None:
+                    select[1] = value
+                if select[2] is None and attrs.get('selected') == 'selected':
+                    select[2] = value
+
+        elif tag == 'input':
+            self.handle_input(attrs)
+
+        elif tag == 'a':
+            postback = parse_postback(attrs.get('href'))
+            if postback is not None:
+                self.anchor = [attrs.get('id'), [], *postback]
+
+    def handle_endtag(self, tag):
+        if self.form_depth == 0:
+            return
+
+        if tag == 'form':
+            self.form_depth -= 1
+            if self.form_depth == 0:
+                self.finished = True
+                self.select = None
+                self.close_anchor()
+
+        elif tag == 'select':
+            self.select = None
+
+        elif tag == 'a':
+            self.close_anchor()
+
+    def handle_data(self, data):
+        if self.anchor is not None:
+            self.anchor[1].append(data)
+
+    def handle_input(self, attrs):
+        input_name = attrs['name']
+        input_value = attrs.get('value', '')
+        input_type = attrs.get('type', 'text')
+
+        # checkboxes and radios only are included when selected
+        if input_type in ('checkbox', 'radio'):
+            if attrs.get('checked'):
+                self.inputs.append((input_name, input_value))
+
+        # submit buttons are only included when used for navigation
+        elif input_type == 'submit':
+            self.submits[input_name] = input_value
+
+        elif input_type != 'image':
+            self.inputs.append((input_name, input_value))
+
+    def close_anchor(self):
+        anchor = self.anchor
+        if anchor is not None:
+            element_id, text, target, argument = anchor
+            self.postbacks.append(PostBackLink(element_id, ''.join(text), target, argument))
+            self.anchor = None
+
+    def to_form_state(self):
+        if self.action is None:
+            return FormState()
+
+        fields = {}
+        for name, first_value, selected_value in self.selects:
+            value = first_value if selected_value is None else selected_value
+            if name is not None and value is not None:
+                fields[name] = value
+        for name, value in self.inputs:
+            fields[name] = value
+
+        return FormState(self.action, fields, self.submits, self.postbacks)
+
+
+class _ElementStateParser(_FormStateParser):
+    """ Collects the controls within a single element of a page, such as an UpdatePanel. """
+
+    def __init__(self, element_id):
+        super().__init__()
+        self.element_id = element_id
+        self.element = None  # [tag, depth of the nested tags of the same name] while within the element
+
+    def handle_starttag(self, tag, attrs):
+        element = self.element
+        if element is None:
+            if not self.finished and dict(attrs).get('id') == self.element_id:
+                # the element is read like a form of its own
+                self.element = [tag, 0]
+                self.action = ''
+                self.form_depth = 1
+            return
+
+        if tag == element[0]:
+            element[1] += 1
+        super().handle_starttag(tag, attrs)
+
+    def handle_endtag(self, tag):
+        element = self.element
+        if element is None:
+            return
+
+        if tag == element[0]:
+            if not element[1]:
+                self.element = None
+                self.form_depth = 1
+                super().handle_endtag('form')  # closes the element like a form
+                return
+            element[1] -= 1
+        super().handle_endtag(tag)
+
+
+def extract_form_state(markup):
+    """Extracts the `MAINFORM` state of a page in a single pass over its raw html.
+
+    :param markup: the raw html text of the page
+    :return: the `FormState` of the page, empty if the page has no `MAINFORM`
+    """
+
+    parser = _FormStateParser()
+    parser.feed(markup)
+    parser.close()
+    parser.close_anchor()
+    return parser.to_form_state()
+
+
+def extract_fragment_state(markup):
+    """Extracts the form controls of an html fragment that lives within the `MAINFORM`.
+
+    :param markup: the raw html text of the fragment, such as the content of an UpdatePanel
+    :return: the `FormState` of the fragment, its action is always empty
+    """
+
+    return extract_form_state(f'<form name="MAINFORM">{markup}</form>')
+
+
+def extract_element_state(markup, element_id):
+    """Extracts the form controls within a single element of a page, such as an UpdatePanel.
+
+    :param markup: the raw html text of the page
+    :param element_id: the id attribute of the element
+    :return: the `FormState` of the element, empty if the page has no such element
+    """
+
+    parser = _ElementStateParser(element_id)
+    parser.feed(markup)
+    parser.close()
+    parser.close_anchor()
+    return parser.to_form_state()
@@ -0,0 +1,300 @@
+from gccutils.page_status import PageStatus, classify_page
+from urllib.parse import urlsplit
+import functools
+import threading
+import random
+import math
+
+
+__all__ = ('RequestEvent', 'RequestStats', 'classify_response', 'default_page_type', 'percentile')
+
+
+class RequestEvent:
+    """The timing breakdown of a single request and of working with the page it returned.
+
+    Network timings are only known where the http client reports them: connecting
+    (which includes resolving the host and the TLS handshake) is reported by the
+    asyncio scrapers, while `requests` folds it into the time to the first byte.
+    The parse time covers building the structures of the returned page, the payload
+    time covers building the payload that was posted with the request.
+    """
+
+    __slots__ = ('method', 'url', 'page_type', 'status', 'bytes', 'connect', 'ttfb', 'download', 'total',
+                 'parse', 'payload', 'error')
+
+    def __init__(self, method, url, page_type, payload=0.0):
+        """Constructor
+
+        :param method: the http method of the request
+        :param url: the url the request was sent to
+        :param page_type: the logical type of the requested page, such as "results"
+        :param payload: the seconds spent building the payload of the request
+        """
+
+        self.method = method
+        self.url = url
+        self.page_type = page_type
+        self.status = None      # the status code of the response, None if there was none
+        self.bytes = 0          # the size of the response body
+        self.connect = None     # seconds spent connecting, None if unknown or an existing connection was used
+        self.ttfb = None        # seconds until the response headers arrived
+        self.download = None    # seconds spent receiving the response body
+        self.total = None       # seconds the request took altogether
+        self.parse = 0.0
+        self.payload = payload
+        self.error = None       # the classification of a failed request, None if it succeeded
+
+    def __repr__(self):
+        return f'RequestEvent({self.method} {self.page_type} {self.status} {self.total}s error={self.error})'
+
+
+def default_page_type(url):
+    """Names the page type of a request that was not labelled, see `ScraperUtils.labelled`.
+
+    :param url: the url of the request
+    :return: the path of the url
+    """
+
+    return urlsplit(url).path or '/'
+
+
+def classify_response(response):
+    """Classifies a response that reports a problem.
+
+    :param response: the response of the request
+    :return: "throttled", "server-error", "client-error", a `PageStatus` value or None if it succeeded
+    """
+
+    status = response.status_code
+    if status == 429:
+        return 'throttled'
+    if status >= 500:
+        return 'server-error'
+    if status >= 400:
+        return 'client-error'
+
+    page_status = classify_page(response.content)
+    return None if page_status is PageStatus.OK else page_status.value
+
+
+def percentile(values, fraction):
+    """Returns the nearest-rank percentile of a list of values.
+
+    :param values: the sorted values
+    :param fraction: the percentile as a fraction, such as 0.95
+    :return: the percentile, or None if there are no values
+    """
+
+    if not values:
+        return None
+    rank = max(1, math.ceil(fraction * len(values)))
+    return values[rank - 1]
+
+
+class _Reservoir:
+    """A uniform sample of at most `size` values out of all the values added to it.
+
+    Percentiles taken over the sample are exact until more values than `size` were added.
+    """
+
+    __slots__ = ('size', 'seen', 'values')
+
+    def __init__(self, size):
+        """Constructor
+
+        :param size: the most values to keep
+        """
+
+        self.size = size
+        self.seen = 0       # how many values were added altogether
+        self.values = []
+
+    def add(self, value, generator):
+        """Adds a value, replacing a random kept one once the reservoir is full.
+
+        :param value: the value to add
+        :param generator: the `random.Random` deciding which value to replace
+        """
+
+        self.seen += 1
+        if len(self.values) < self.size:
+            self.values.append(value)
+        else:
+            index = generator.randrange(self.seen)
+            if index < self.size:
+                self.values[index] = value
+
+    def merge(self, other, generator):
+        """Adds the sample of another reservoir, weighting both by how many values they saw.
+
+        :param other: the `_Reservoir` to add
+        :param generator: the `random.Random` drawing the merged sample
+        """
+
+        if len(self.values) + len(other.values) <= self.size:
+            self.values.extend(other.values)
+        else:
+            seen = self.seen + other.seen
+            mine = round(self.size * self.seen / seen) if seen else 0
+            mine = min(mine, len(self.values))
+            theirs = min(self.size - mine, len(other.values))
+            self.values = generator.sample(self.values, mine) + generator.sample(other.values, theirs)
+        self.seen += other.seen
+
+
+class _PageTypeSamples:
+    """ The counts and the sampled timings of the requests of one session for one page type. """
+
+    __slots__ = ('count', 'errors', 'bytes', 'timings')
+
+    def __init__(self, size):
+        self.count = 0
+        self.errors = 0
+        self.bytes = 0
+        self.timings = {metric: _Reservoir(size) for metric in RequestStats.METRICS}
+
+
+class RequestStats:
+    """Aggregates the `RequestEvent`s of a team of sessions per session and page type.
+
+    Only counts and a sample of at most `sample_size` timings per session, page type and
+    metric are kept, so the memory taken (and the data a process sends back when merging
+    into another process) does not grow with the crawl. Percentiles are exact as long as
+    no more requests than the sample size were recorded for a page type.
+
+    Use `hook` to get the callable that records the events of one session.
+    """
+
+    METRICS = ('total', 'connect', 'ttfb', 'download', 'parse', 'payload')
+
+    # how many timings to keep per session, page type and metric
+    SAMPLE_SIZE = 1024
+
+    def __init__(self, sample_size=SAMPLE_SIZE):
+        """Constructor
+
+        :param sample_size: how many timings to keep per session, page type and metric
+        """
+
+        self.sample_size = sample_size
+        self._samples = {}  # (session, page type) -> _PageTypeSamples
+        self._random = random.Random()
+        self._lock = threading.Lock()
+
+    def _get(self, key):
+        """ Returns the samples of a (session, page type), creating them if there are none yet. """
+
+        samples = self._samples.get(key)
+        if samples is None:
+            samples = self._samples[key] = _PageTypeSamples(self.sample_size)
+        return samples
+
+    def hook(self, session):
+        """Returns a hook that records events as belonging to a session.
+
+        :param session: identifies the session, such as its number within the team
+        :return: a callable taking a `RequestEvent`
+        """
+
+        return functools.partial(self.record, session)
+
+    def record(self, session, event):
+        """Records the event of a request.
+
+        :param session: identifies the session the request was sent by
+        :param event: the `RequestEvent` of the request
+        """
+
+        with self._lock:
+            samples = self._get((session, event.page_type))
+            samples.count += 1
+            samples.errors += event.error is not None
+            samples.bytes += event.bytes
+            for metric, reservoir in samples.timings.items():
+                value = getattr(event, metric)
+                if value is not None:
+                    reservoir.add(value, self._random)
+
+    def merge(self, other, prefix=None):
+        """Adds the requests recorded by another aggregator, such as that of another process.
+
+        :param other: the `RequestStats` to add
+        :param prefix: an optional prefix telling the sessions of the other aggregator apart,
+            their requests are recorded as belonging to the session (prefix, session) then
+        """
+
+        with other._lock:
+            items = list(other._samples.items())
+        with self._lock:
+            for (session, page_type), theirs in items:
+                if prefix is not None:
+                    session = prefix, session
+                samples = self._get((session, page_type))
+                samples.count += theirs.count
+                samples.errors += theirs.errors
+                samples.bytes += theirs.bytes
+                for metric, reservoir in samples.timings.items():
+                    reservoir.merge(theirs.timings[metric], self._random)
+
+    def __getstate__(self):
+        with self._lock:
+            return {'sample_size': self.sample_size, 'samples': dict(self._samples)}
+
+    def __setstate__(self, state):
+        self.sample_size = state['sample_size']
+        self._samples = state['samples']
+        self._random = random.Random()
+        self._lock = threading.Lock()
+
+    @property
+    def sessions(self):
+        """ Returns the sessions that have recorded events, in the order they first did. """
+
+        with self._lock:
+            return list(dict.fromkeys(session for session, _ in self._samples))
+
+    def summary(self, session=None, metric='total'):
+        """Summarizes the requests per page type.
+
+        :param session: only summarize the requests of this session, defaults to the whole team
+        :param metric: one of `METRICS` to take the percentiles of
+        :return: dictionary mapping page type -> dictionary of count, errors, bytes, p50, p95 and p99
+        :raises ValueError: if the metric is unknown
+        """
+
+        if metric not in self.METRICS:
+            raise ValueError(f'unknown metric {metric!r}, expected one of {", ".join(self.METRICS)}')
+
+        grouped = {}
+        with self._lock:
+            for (sample_session, page_type), samples in self._samples.items():
+                if session is not None and sample_session != session:
+                    continue
+                row = grouped.get(page_type)
+                if row is None:
+                    row = grouped[page_type] = _PageTypeSamples(self.sample_size)
+                row.count += samples.count
+                row.errors += samples.errors
+                row.bytes += samples.bytes
+                row.timings[metric].merge(samples.timings[metric], self._random)
+
+        summary = {}
+        for page_type, row in grouped.items():
+            values = sorted(row.timings[metric].values)
+            summary[page_type] = {
+                'count': row.count,
+                'errors': row.errors,
+                'bytes': row.bytes,
+                'p50': percentile(values, 0.50),
+                'p95': percentile(values, 0.95),
+                'p99': percentile(values, 0.99),
+            }
+        return summary
+
+    def __str__(self):
+        lines = [f'{"page type":<32} {"count":>7} {"errors":>7} {"p50 ms":>9} {"p95 ms":>9} {"p99 ms":>9}']
+        for page_type, row in sorted(self.summary().items()):
+            timings = ''.join(f' {row[key] * 1000:9.1f}' if row[key] is not None else f' {"-":>9}'
+                              for key in ('p50', 'p95', 'p99'))
+            lines.append(f'{page_type:<32} {row["count"]:7} {row["errors"]:7}{timings}')
+        return '\n'.join(lines)
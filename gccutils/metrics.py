@@ -0,0 +1,401 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import threading
+import math
+import os
+
+
+__all__ = ('Counter', 'Gauge', 'Histogram', 'MetricsRegistry', 'ScraperMetrics')
+
+
+# the content type of the prometheus text exposition format
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# the default histogram buckets in seconds, the same as those of the official prometheus clients
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 7.5, 10.0)
+
+
+def _format_value(value):
+    """ Formats a sample value the way the prometheus text format expects it. """
+
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    if math.isnan(value):
+        return 'NaN'
+    return repr(float(value))
+
+
+def _escape(value):
+    """ Escapes a label value for the prometheus text format. """
+
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class Metric:
+    """The base class of a metric with a value per combination of its label values.
+
+    Every method taking labels expects exactly the label names of the metric as keyword arguments.
+    """
+
+    TYPE = None
+
+    def __init__(self, name, documentation, labels=()):
+        """Constructor
+
+        :param name: the name of the metric, such as "gccutils_requests_total"
+        :param documentation: a description of what the metric measures
+        :param labels: the names of the labels distinguishing the values of the metric
+        """
+
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self._values = {}  # label values -> value
+        self._lock = threading.Lock()
+        if not self.label_names:
+            self._values[()] = self._initial()  # metrics without labels are exported from the start
+
+    def _initial(self):
+        """ Returns the value of a combination of label values that has not been updated yet. """
+
+        return 0
+
+    def _key(self, labels):
+        """Orders the label values as the label names are.
+
+        :raises ValueError: if the labels do not match the label names
+        """
+
+        if len(labels) != len(self.label_names) or any(name not in labels for name in self.label_names):
+            raise ValueError(f'{self.name} expects the labels {", ".join(self.label_names) or "(none)"}')
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    def _labels(self, key, extra=()):
+        """ Formats the label values of a sample, adding any extra (name, value) pairs. """
+
+        pairs = list(zip(self.label_names, key)) + list(extra)
+        if not pairs:
+            return ''
+        return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+    def samples(self):
+        """Returns the current samples of the metric.
+
+        :return: a list of (sample name, formatted labels, value) tuples
+        """
+
+        with self._lock:
+            return [(self.name, self._labels(key), value) for key, value in sorted(self._values.items())]
+
+    def render(self):
+        """ Returns the metric in the prometheus text format. """
+
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.TYPE}']
+        lines.extend(f'{name}{labels} {_format_value(value)}' for name, labels, value in self.samples())
+        return '\n'.join(lines)
+
+
+class Counter(Metric):
+    """ A metric that only ever goes up, such as the number of requests sent. """
+
+    TYPE = 'counter'
+
+    def inc(self, amount=1, **labels):
+        """Increases the counter.
+
+        :param amount: how much to increase it by
+        :raises ValueError: if the amount is negative
+        """
+
+        if amount < 0:
+            raise ValueError('a counter cannot decrease')
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        """ Returns the current value of the counter. """
+
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+
+class Gauge(Metric):
+    """ A metric that goes up and down, such as the number of sessions in use. """
+
+    TYPE = 'gauge'
+
+    def set(self, value, **labels):
+        """ Sets the gauge to a value. """
+
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount=1, **labels):
+        """ Increases the gauge. """
+
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        """ Decreases the gauge. """
+
+        self.inc(-amount, **labels)
+
+    def value(self, **labels):
+        """ Returns the current value of the gauge. """
+
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+
+class Histogram(Metric):
+    """ A metric counting observations into buckets, such as the durations of requests. """
+
+    TYPE = 'histogram'
+
+    def __init__(self, name, documentation, labels=(), buckets=DEFAULT_BUCKETS):
+        """Constructor
+
+        :param name: the name of the metric, such as "gccutils_request_duration_seconds"
+        :param documentation: a description of what the metric measures
+        :param labels: the names of the labels distinguishing the values of the metric
+        :param buckets: the upper bounds of the buckets, a bucket for infinity is always added
+        :raises ValueError: if there are no buckets
+        """
+
+        if not buckets:
+            raise ValueError('a histogram needs at least one bucket')
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labels)
+
+    def _initial(self):
+        return [[0] * len(self.buckets), 0.0, 0]  # the cumulative bucket counts, the sum and the count
+
+    def observe(self, value, **labels):
+        """ Counts an observation into the buckets it falls into. """
+
+        key = self._key(labels)
+        with self._lock:
+            counts = self._values.get(key)
+            if counts is None:
+                counts = self._values[key] = self._initial()
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[0][i] += 1
+            counts[1] += value
+            counts[2] += 1
+
+    def count(self, **labels):
+        """ Returns how many observations have been made. """
+
+        with self._lock:
+            counts = self._values.get(self._key(labels))
+            return counts[2] if counts is not None else 0
+
+    def samples(self):
+        samples = []
+        with self._lock:
+            for key, (buckets, total, count) in sorted(self._values.items()):
+                for bound, bucket_count in zip(self.buckets, buckets):
+                    samples.append((f'{self.name}_bucket', self._labels(key, [('le', _format_value(bound))]),
+                                    bucket_count))
+                samples.append((f'{self.name}_bucket', self._labels(key, [('le', '+Inf')]), count))
+                samples.append((f'{self.name}_sum', self._labels(key), total))
+                samples.append((f'{self.name}_count', self._labels(key), count))
+        return samples
+
+
+class MetricsRegistry:
+    """A set of metrics exported in the prometheus text format.
+
+    The metrics are either written to a file, which suits the textfile collector of
+    the node exporter, or served over http for prometheus to scrape directly.
+    """
+
+    def __init__(self):
+        """ Constructor """
+
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        """Adds a metric to the registry.
+
+        :param metric: the `Metric` to add
+        :return: the metric
+        :raises ValueError: if a metric of the same name is registered already
+        """
+
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f'a metric named {metric.name} is registered already')
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, labels=()):
+        """ Creates and registers a `Counter`. """
+
+        return self.register(Counter(name, documentation, labels))
+
+    def gauge(self, name, documentation, labels=()):
+        """ Creates and registers a `Gauge`. """
+
+        return self.register(Gauge(name, documentation, labels))
+
+    def histogram(self, name, documentation, labels=(), buckets=DEFAULT_BUCKETS):
+        """ Creates and registers a `Histogram`. """
+
+        return self.register(Histogram(name, documentation, labels, buckets))
+
+    def render(self):
+        """ Returns every metric in the prometheus text format. """
+
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return ''.join(metric.render() + '\n' for metric in metrics)
+
+    def write(self, path):
+        """Writes every metric to a file.
+
+        The file is replaced atomically, so a collector never reads a partial export.
+
+        :param path: the file to write, such as "/var/lib/node_exporter/gccutils.prom"
+        """
+
+        temporary = f'{path}.{os.getpid()}.tmp'
+        with open(temporary, 'w', encoding='utf-8') as file:
+            file.write(self.render())
+        os.replace(temporary, path)
+
+    def export(self, path, interval=15.0):
+        """Keeps writing every metric to a file from a background thread.
+
+        :param path: the file to write, see `write`
+        :param interval: seconds between writes
+        :return: a `threading.Event` that stops the exports once set, after a final write
+        """
+
+        stopped = threading.Event()
+
+        def _export():
+            while not stopped.wait(interval):
+                self.write(path)
+            self.write(path)
+
+        self.write(path)
+        threading.Thread(target=_export, daemon=True).start()
+        return stopped
+
+    def serve(self, port=9464, host='127.0.0.1'):
+        """Serves every metric over http from a background thread.
+
+        Only the local host is served unless another interface is given explicitly.
+
+        :param port: the port to listen on, 0 picks a free one
+        :param host: the interface to listen on
+        :return: the `http.server.ThreadingHTTPServer`, call its `shutdown` method to stop serving
+        """
+
+        registry = self
+
+        class _Handler(BaseHTTPRequestHandler):
+
+            def do_GET(self):
+                if self.path.split('?')[0] not in ('/', '/metrics'):
+                    self.send_error(404)
+                    return
+                body = registry.render().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', CONTENT_TYPE)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # scrapes are far too frequent to be worth logging
+
+        server = ThreadingHTTPServer((host, port), _Handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+
+class ScraperMetrics(MetricsRegistry):
+    """The metrics of the scrapers, covering their throughput, failures and sessions.
+
+    A `ScraperUtils` reports to the metrics it is given, as do the sessions of a
+    scraper manager created with them. Every metric is prefixed with "gccutils_".
+    """
+
+    def __init__(self):
+        """ Constructor """
+
+        super().__init__()
+        self.requests = self.counter(
+            'gccutils_requests_total', 'Requests sent to mygcc by page type and outcome.', ('page_type', 'outcome'))
+        self.response_bytes = self.counter(
+            'gccutils_response_bytes_total', 'Bytes received from mygcc by page type.', ('page_type',))
+        self.request_seconds = self.histogram(
+            'gccutils_request_duration_seconds', 'Time requests to mygcc took by page type.', ('page_type',))
+        self.parse_seconds = self.histogram(
+            'gccutils_parse_duration_seconds', 'Time spent parsing the pages of mygcc by page type.', ('page_type',))
+        self.rows = self.counter(
+            'gccutils_rows_emitted_total', 'Results passed on by the scrapers.', ('scraper',))
+        self.errors = self.counter(
+            'gccutils_errors_total', 'Errors that cost a scraper part of its work by type.', ('error',))
+        self.logins = self.counter(
+            'gccutils_logins_total', 'Logins by outcome, restored ones reused a stored session.', ('outcome',))
+        self.recoveries = self.counter(
+            'gccutils_session_recoveries_total', 'Expired sessions that were logged in again.')
+        self.active_sessions = self.gauge(
+            'gccutils_active_sessions', 'Logged-in sessions currently used by a scraper team.')
+
+    def record_request(self, event):
+        """Records a request, meant to be used as a hook of `ScraperUtils`.
+
+        :param event: the `RequestEvent` of the request
+        """
+
+        page_type = event.page_type
+        self.requests.inc(page_type=page_type, outcome=event.error or 'ok')
+        self.response_bytes.inc(event.bytes, page_type=page_type)
+        if event.total is not None:
+            self.request_seconds.observe(event.total, page_type=page_type)
+        self.parse_seconds.observe(event.parse, page_type=page_type)
+
+    def record_error(self, error):
+        """Records an error that cost a scraper part of its work.
+
+        :param error: the exception, counted by the name of its class such as "MissingElementError"
+        """
+
+        self.errors.inc(error=type(error).__name__)
+
+    def record_login(self, outcome):
+        """Records a login.
+
+        :param outcome: "success", "failure" or "restored"
+        """
+
+        self.logins.inc(outcome=outcome)
+
+    def record_recovery(self):
+        """ Records that an expired session was logged in again. """
+
+        self.recoveries.inc()
+
+    def counting_rows(self, callback, scraper):
+        """Wraps a callback to count every result passed to it.
+
+        :param callback: the callback receiving the results, whatever it returns is passed on
+        :param scraper: names the scraper the results come from
+        :return: the wrapped callback
+        """
+
+        def _callback(value):
+            self.rows.inc(scraper=scraper)
+            return callback(value)
+
+        return _callback
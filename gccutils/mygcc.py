@@ -1,11 +1,14 @@
 from gccutils.scraper_utils import ScraperUtils
+from gccutils.session_pool import SessionPool
 from gccutils.asyncscrapers.coursescraper import AsyncCourseScraper
+from gccutils.asyncscrapers.processscraper import ProcessAdviseeScraper, ProcessCourseScraper
+from gccutils.asyncscrapers.ledgerscraper import LedgerAdviseeScraper, LedgerCourseScraper
 from gccutils.asyncscrapers.adviseescraper import AsyncAdviseeScraper
 import gccutils.errors as errors
 
 
 class ProfileInformation:
-    PROFILEURL = 'https://my.gcc.edu/ICS/'
+    PROFILE_ROUTE = '/ICS/'
 
     def __init__(self, data_collection: ScraperUtils):
         self.dc = data_collection
@@ -219,7 +222,7 @@ class ProfileInformation:
         if self._screen != screen:
             self._screen = screen
             params = self._get_params(screen)
-            self.dc.http_get(self.PROFILEURL, params=params)
+            self.dc.http_get(self.dc.to_url(self.PROFILE_ROUTE), params=params)
 
     def _span_template(self, screen, elem_id):
         self._ensure_screen(screen)
@@ -235,7 +238,7 @@ class ProfileInformation:
 
 
 class StudentInformation:
-    STUDENTURL = 'https://my.gcc.edu/ICS/Student/'
+    STUDENT_ROUTE = '/ICS/Student/'
 
     def __init__(self, data_collection: ScraperUtils):
         self.dc = data_collection
@@ -244,7 +247,7 @@ class StudentInformation:
     @property
     def chapel(self):
         if self.__chapel is None:
-            self.dc.ensure_screen(self.STUDENTURL)
+            self.dc.ensure_screen(self.dc.to_url(self.STUDENT_ROUTE))
             iframe = self.dc.html.find('iframe', dict(id='pg1_V_iframe'))
             chapel = {}
             if iframe is not None:
@@ -269,47 +272,89 @@ class StudentInformation:
 
 
 class AcademicsInformation:
-    ACADEMICSURL = 'https://my.gcc.edu/ICS/Academics/'
+    ACADEMICS_ROUTE = '/ICS/Academics/'
 
-    def __init__(self, data_collection: ScraperUtils, username, password):
+    def __init__(self, data_collection: ScraperUtils, username, password, pool=None, metrics=None):
         self.dc = data_collection
         self.__username = username
         self.__password = password
+        self.__pool = pool
+        self.__metrics = metrics
 
-    def get_course_scraper(self, callback):
-        return AsyncCourseScraper(self.__username, self.__password, callback)
+    def get_course_scraper(self, callback, course_cache=None, requisite_cache=None, fields=None, query=None,
+                           checkpoint=None, concurrency=None, parse_pool=None):
+        return AsyncCourseScraper(self.__username, self.__password, callback, self.__pool,
+                                  course_cache, requisite_cache, fields, query, checkpoint, concurrency,
+                                  self.__metrics, parse_pool)
+
+    def get_aio_course_scraper(self, callback=None, **kwargs):
+        # imported here as the asyncio scrapers depend on the optional httpx package
+        from gccutils.aioscrapers.coursescraper import AioCourseScraper
+        kwargs.setdefault('metrics', self.__metrics)
+        return AioCourseScraper(self.__username, self.__password, callback, **kwargs)
+
+    def get_process_course_scraper(self, callback=None, **kwargs):
+        # every process logs in on its own, the pool only lends the session counting the terms
+        kwargs.setdefault('pool', self.__pool)
+        return ProcessCourseScraper(self.__username, self.__password, callback, **kwargs)
+
+    def get_ledger_course_scraper(self, ledger, callback=None, **kwargs):
+        kwargs.setdefault('pool', self.__pool)
+        kwargs.setdefault('metrics', self.__metrics)
+        return LedgerCourseScraper(self.__username, self.__password, ledger, callback=callback, **kwargs)
 
 
 class AdvisingInformation:
-    ADVISINGURL = 'https://my.gcc.edu/ICS/Advising/'
+    ADVISING_ROUTE = '/ICS/Advising/'
 
-    def __init__(self, data_collection: ScraperUtils, username, password):
+    def __init__(self, data_collection: ScraperUtils, username, password, pool=None, metrics=None):
         self.dc = data_collection
         self.__username = username
         self.__password = password
+        self.__pool = pool
+        self.__metrics = metrics
         self.__is_advisor = None
 
     @property
     def is_advisor(self):
         if self.__is_advisor is None:
             try:
-                self.dc.http_get(self.ADVISINGURL)
+                self.dc.http_get(self.dc.to_url(self.ADVISING_ROUTE))
                 self.__is_advisor = True
             except errors.UnauthorizedError:
                 self.__is_advisor = False
         return self.__is_advisor
 
-    def get_advisee_scraper(self, callback):
-        return AsyncAdviseeScraper(self.__username, self.__password, callback)
+    def get_advisee_scraper(self, callback, checkpoint=None, concurrency=None, parse_pool=None):
+        return AsyncAdviseeScraper(self.__username, self.__password, callback, self.__pool, checkpoint, concurrency,
+                                   self.__metrics, parse_pool)
+
+    def get_aio_advisee_scraper(self, callback=None, **kwargs):
+        # imported here as the asyncio scrapers depend on the optional httpx package
+        from gccutils.aioscrapers.adviseescraper import AioAdviseeScraper
+        kwargs.setdefault('metrics', self.__metrics)
+        return AioAdviseeScraper(self.__username, self.__password, callback, **kwargs)
+
+    def get_process_advisee_scraper(self, callback=None, **kwargs):
+        # every process logs in on its own, so neither the pool nor the metrics are shared with it
+        return ProcessAdviseeScraper(self.__username, self.__password, callback, **kwargs)
+
+    def get_ledger_advisee_scraper(self, ledger, callback=None, **kwargs):
+        kwargs.setdefault('pool', self.__pool)
+        kwargs.setdefault('metrics', self.__metrics)
+        return LedgerAdviseeScraper(self.__username, self.__password, ledger, callback=callback, **kwargs)
 
 
 class MyGcc:
 
-    def __init__(self, username, password):
-        self._dc = ScraperUtils()
+    def __init__(self, username, password, session_store=None, metrics=None):
+        self._dc = ScraperUtils(session_store=session_store, metrics=metrics)
         self.__username = username
         self.__password = password
+        self.metrics = metrics  # the `ScraperMetrics` every session reports to, if any
         self._logged_in = False
+        self._pool = SessionPool(  # shared by the scrapers
+            username, password, factory=lambda: ScraperUtils(session_store=session_store, metrics=metrics))
         self.__profile = None
         self.__student = None
         self.__academics = None
@@ -330,6 +375,7 @@ class MyGcc:
                 action, payload = dc.prepare_payload(nav_element=logout_btn)
                 post_url = dc.BASE_URL + action
                 dc.http_post(post_url, data=payload)
+            dc.forget_session(self.__username)
             self._logged_in = False
 
     @property
@@ -350,14 +396,16 @@ class MyGcc:
     def academics(self):
         if self.__academics is None:
             self._ensure_login()
-            self.__academics = AcademicsInformation(self._dc, self.__username, self.__password)
+            self.__academics = AcademicsInformation(self._dc, self.__username, self.__password, self._pool,
+                                                    self.metrics)
         return self.__academics
 
     @property
     def advising(self):
         if self.__advising is None:
             self._ensure_login()
-            self.__advising = AdvisingInformation(self._dc, self.__username, self.__password)
+            self.__advising = AdvisingInformation(self._dc, self.__username, self.__password, self._pool,
+                                                  self.metrics)
         return self.__advising
 
     def _ensure_login(self):
@@ -0,0 +1,42 @@
+from gccutils.form_state import parse_postback
+from collections import namedtuple
+
+
+__all__ = ('PageVisit', 'Postback', 'postback_fields')
+
+
+# a page loaded via GET request, every visit starts a new navigation path
+PageVisit = namedtuple('PageVisit', ('url', 'params'))
+
+# a postback identified by the fields that make it what it is, such as the
+# event target of a page link or the selected term of a search
+Postback = namedtuple('Postback', ('fields',))
+
+
+def postback_fields(nav_element=None, event_target=None, fields=None):
+    """Determines the fields that identify a postback independently of the page it is sent from.
+
+    The view-state and every other hidden field belong to the page and are rebuilt
+    from whichever page the postback is replayed on, only the submit button or
+    postback link that was clicked and any explicitly overridden fields are kept.
+
+    :param nav_element: an optional navigation element either submit or containing postback
+    :param event_target: an optional `__EVENTTARGET` overriding the one of the element
+    :param fields: optional form fields overriding those of the page
+    :return: a dictionary of the identifying fields
+    """
+
+    identity = {}
+    if nav_element is not None:
+        if nav_element.get('type') == 'submit':
+            identity[nav_element['name']] = nav_element.get('value', '')
+        else:
+            postback = parse_postback(nav_element.get('href'))
+            if postback is not None:
+                identity['__EVENTTARGET'], identity['__EVENTARGUMENT'] = postback
+
+    if isinstance(event_target, str):
+        identity['__EVENTTARGET'] = event_target
+    if fields:
+        identity.update(fields)
+    return identity
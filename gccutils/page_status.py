@@ -0,0 +1,63 @@
+from enum import Enum
+import re
+
+
+__all__ = ('PageStatus', 'classify_page', 'is_logged_in')
+
+
+class PageStatus(Enum):
+    """ The outcome of a request as reported by the page MyGCC responded with. """
+
+    OK = 'ok'
+    REDIRECTED = 'redirected'
+    NOT_LOGGED_IN = 'not-logged-in'
+    UNAUTHORIZED = 'unauthorized'
+    LOGIN_ERROR = 'login-error'
+
+
+REDIRECT_MESSAGE = b'You have been redirected to this page because you attempted to navigate'
+UNAUTHORIZED_MESSAGE = b'require you to be logged in'
+
+LOGOUT_ANCHOR_PATTERN = re.compile(rb'<a\s[^>]*?\bid\s*=\s*["\']?logout["\'\s/>]', re.IGNORECASE)
+LOGIN_ERROR_PATTERN = re.compile(rb'<span\s[^>]*?\bid\s*=\s*["\']?CP_V_lblLoginError["\'\s/>]', re.IGNORECASE)
+
+
+def classify_page(content):
+    """Determines the status of a page directly from its raw html.
+
+    This only performs substring searches over the markup, so it is cheap enough
+    to run on every response without building a BeautifulSoup structure.
+
+    :param content: the raw html of the page as bytes or text
+    :return: the `PageStatus` of the page
+    """
+
+    if isinstance(content, str):
+        content = content.encode('utf-8')
+
+    if REDIRECT_MESSAGE in content:
+        return PageStatus.REDIRECTED
+
+    if UNAUTHORIZED_MESSAGE in content:
+        if not is_logged_in(content):
+            return PageStatus.NOT_LOGGED_IN
+        return PageStatus.UNAUTHORIZED
+
+    # the element id is checked by substring first as it rarely appears
+    if b'CP_V_lblLoginError' in content and LOGIN_ERROR_PATTERN.search(content) is not None:
+        return PageStatus.LOGIN_ERROR
+
+    return PageStatus.OK
+
+
+def is_logged_in(content):
+    """Determines whether a page was served to a logged in user by looking for the logout anchor.
+
+    :param content: the raw html of the page as bytes or text
+    :return: True if the page contains the logout anchor
+    """
+
+    if isinstance(content, str):
+        content = content.encode('utf-8')
+
+    return LOGOUT_ANCHOR_PATTERN.search(content) is not None
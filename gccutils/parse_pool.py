@@ -0,0 +1,110 @@
+from gccutils.form_state import extract_form_state
+from gccutils.parsers import parse_html
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+import functools
+import requests
+import asyncio
+
+
+__all__ = ('ParsePool', 'extract_page', 'extract_page_state', 'process_context')
+
+
+def _decode(content, encoding):
+    """Decodes the body of a response exactly like `requests.Response.text` does in the threads.
+
+    requests assumes ISO-8859-1 for text without a charset and only leaves the encoding
+    unset where the content type names none at all, then detecting it from the body.
+    """
+
+    response = requests.Response()
+    response._content = content
+    response.encoding = encoding
+    return response.text
+
+
+def extract_page(content, encoding, parser, extractor, args=()):
+    """Builds the structures of a page and runs an extractor over them.
+
+    This is what the processes of a `ParsePool` run, the extractor and everything it
+    returns have to be picklable, so extractors are functions defined at module level.
+
+    :param content: the raw body of the response containing the page
+    :param encoding: the encoding of the body, None if the response did not specify one
+    :param parser: the html parser backend to use
+    :param extractor: a function taking the BeautifulSoup structure of the page and the args
+    :param args: further arguments of the extractor
+    :return: a (`FormState` of the page, result of the extractor) tuple
+    """
+
+    text = _decode(content, encoding)
+    return extract_form_state(text), extractor(parse_html(text, parser), *args)
+
+
+def extract_page_state(content, encoding):
+    """Extracts the `FormState` of a page without building its BeautifulSoup structure.
+
+    :param content: the raw body of the response containing the page
+    :param encoding: the encoding of the body, None if the response did not specify one
+    :return: the `FormState` of the page
+    """
+
+    return extract_form_state(_decode(content, encoding))
+
+
+def process_context():
+    """ Returns the multiprocessing context for worker processes, as forking a process with threads is unsafe. """
+
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('forkserver')
+    return multiprocessing.get_context('spawn')
+
+
+class ParsePool:
+    """A pool of processes building the structures of pages on behalf of scraper sessions.
+
+    Parsing html is pure python and holds the GIL, so a team of threads spends most
+    of its time waiting for each other once they are past a few. With a parse pool,
+    the threads only send requests and hand the raw response bodies to the pool,
+    which runs the page-specific extractors on every core and returns their small
+    results. Waiting for the result releases the GIL for the other threads.
+
+    A pool may be shared by every team, see `ScraperUtils.extract`.
+    """
+
+    def __init__(self, processes=None):
+        """Constructor
+
+        :param processes: how many processes parse pages, defaults to the number of cpu cores
+        """
+
+        self.processes = processes or multiprocessing.cpu_count()
+        self._executor = ProcessPoolExecutor(self.processes, mp_context=process_context())
+
+    def parse(self, function, *args):
+        """Runs a function in one of the processes and waits for its result.
+
+        :param function: a picklable function, such as `extract_page`
+        :param args: the picklable arguments of the function
+        :return: whatever the function returns
+        :raises Exception: whatever the function raises
+        """
+
+        return self._executor.submit(function, *args).result()
+
+    async def aparse(self, function, *args):
+        """ Runs a function in one of the processes without blocking the event loop, see `parse`. """
+
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(function, *args))
+
+    def close(self):
+        """ Waits for the pending pages and stops the processes. """
+
+        self._executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
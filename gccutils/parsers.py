@@ -0,0 +1,63 @@
+from bs4 import BeautifulSoup, FeatureNotFound
+
+
+__all__ = ('PARSERS', 'available_parsers', 'best_available_parser', 'is_parser_available', 'parse_html')
+
+
+# every backend that BeautifulSoup can build a tree with, fastest first
+PARSERS = ('lxml', 'html5lib', 'html.parser')
+
+# the pure-python backend that ships with the standard library
+DEFAULT_PARSER = 'html.parser'
+
+# avoids repeatedly importing missing backends
+_availability = {DEFAULT_PARSER: True}
+
+
+def is_parser_available(parser):
+    """Checks whether or not the specified parser backend is installed.
+
+    :param parser: the name of the parser backend
+    :return: True if BeautifulSoup is able to build trees using the parser
+    :raises ValueError: if the parser is not a known backend
+    """
+
+    if parser not in PARSERS:
+        raise ValueError(f'unknown parser backend {parser!r}, expected one of {PARSERS}')
+
+    available = _availability.get(parser)
+    if available is None:
+        try:
+            BeautifulSoup('', features=parser)
+            available = True
+        except FeatureNotFound:
+            available = False
+        _availability[parser] = available
+    return available
+
+
+def available_parsers():
+    """ Returns a tuple of every installed parser backend, fastest first. """
+
+    return tuple(parser for parser in PARSERS if is_parser_available(parser))
+
+
+def best_available_parser():
+    """ Returns the name of the fastest installed parser backend. """
+
+    return available_parsers()[0]
+
+
+def parse_html(markup, parser=None):
+    """Builds a BeautifulSoup structure from raw html using the specified backend.
+
+    :param markup: the raw html text or bytes to parse
+    :param parser: the name of the parser backend, defaults to `DEFAULT_PARSER`
+    :return: the BeautifulSoup representation of the markup
+    :raises ValueError: if the parser is unknown or not installed
+    """
+
+    parser = parser or DEFAULT_PARSER
+    if not is_parser_available(parser):
+        raise ValueError(f'parser backend {parser!r} is not installed')
+    return BeautifulSoup(markup, features=parser)
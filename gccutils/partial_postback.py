@@ -0,0 +1,170 @@
+from collections import namedtuple
+import gccutils.errors as errors
+import re
+
+
+__all__ = ('AJAX_HEADERS', 'AjaxState', 'DeltaEntry', 'UpdatePanel', 'build_async_payload', 'parse_delta')
+
+
+# the headers an ASP.NET `PageRequestManager` sends along with an asynchronous postback
+AJAX_HEADERS = {
+    'X-MicrosoftAjax': 'Delta=true',
+    'X-Requested-With': 'XMLHttpRequest',
+    'Cache-Control': 'no-cache'}
+
+# a single `length|type|id|content|` record of an asynchronous postback response
+DeltaEntry = namedtuple('DeltaEntry', ('type', 'id', 'content'))
+
+# a server side UpdatePanel, `children_as_triggers` decides if its own controls post asynchronously
+UpdatePanel = namedtuple('UpdatePanel', ('unique_id', 'client_id', 'children_as_triggers'))
+
+
+# newer runtimes register the panels and triggers within the initialization call itself
+INITIALIZE_PATTERN = re.compile(
+    r"PageRequestManager\._initialize\(\s*'([^']*)'(?:\s*,[^,\[]*,\s*\[([^\]]*)\]\s*,\s*\[([^\]]*)\])?")
+UPDATE_CONTROLS_PATTERN = re.compile(r"_updateControls\(\s*\[([^\]]*)\]\s*,\s*\[([^\]]*)\]")
+QUOTED_PATTERN = re.compile(r"'([^']*)'")
+
+
+def _parse_panel_ids(panel_ids):
+    """Parses the UpdatePanel identifiers registered with the `PageRequestManager`.
+
+    Older runtimes only list prefixed unique ids ("tUniqueId") while newer ones
+    list each prefixed unique id followed by its client id.
+
+    :param panel_ids: a list of the raw identifier strings
+    :return: a list of `UpdatePanel`'s
+    """
+
+    panel_ids = [panel_id for panel_id in panel_ids if panel_id]
+    paired = len(panel_ids) % 2 == 0 and all(
+        panel_ids[i][1:].replace('$', '_') == panel_ids[i + 1]
+        for i in range(0, len(panel_ids), 2))
+
+    panels = []
+    step = 2 if paired else 1
+    for i in range(0, len(panel_ids), step):
+        unique_id = panel_ids[i][1:]
+        client_id = panel_ids[i + 1] if paired else unique_id.replace('$', '_')
+        panels.append(UpdatePanel(unique_id, client_id, panel_ids[i][0] == 't'))
+    return panels
+
+
+class AjaxState:
+    """The asynchronous postback configuration of the `PageRequestManager` on a page."""
+
+    def __init__(self, script_manager=None, update_panels=None, async_triggers=None):
+        """Constructor
+
+        :param script_manager: the unique id of the ScriptManager, None if the page has none
+        :param update_panels: a list of `UpdatePanel`'s on the page
+        :param async_triggers: unique ids of controls outside the panels that post asynchronously
+        """
+
+        self.script_manager = script_manager
+        self.update_panels = update_panels if update_panels is not None else []
+        self.async_triggers = async_triggers if async_triggers is not None else []
+
+    @classmethod
+    def from_markup(cls, markup):
+        """Reads the `PageRequestManager` initialization script of a full page.
+
+        :param markup: the raw html text of the page
+        :return: the `AjaxState` of the page
+        """
+
+        # the substring check avoids running the patterns over most pages
+        if 'PageRequestManager' not in markup:
+            return cls()
+
+        match = INITIALIZE_PATTERN.search(markup)
+        if match is None:
+            return cls()
+        script_manager, panel_ids, trigger_ids = match.groups()
+
+        # older runtimes register them through a separate call instead
+        if panel_ids is None:
+            match = UPDATE_CONTROLS_PATTERN.search(markup)
+            if match is None:
+                return cls(script_manager)
+            panel_ids, trigger_ids = match.groups()
+
+        update_panels = _parse_panel_ids(QUOTED_PATTERN.findall(panel_ids))
+        async_triggers = QUOTED_PATTERN.findall(trigger_ids)
+
+        return cls(script_manager, update_panels, async_triggers)
+
+    def find_panel(self, panel_id):
+        """Finds an UpdatePanel by either its client id or its unique id.
+
+        :param panel_id: the client id or unique id of the panel
+        :return: the matching `UpdatePanel` or None if not found
+        """
+
+        for panel in self.update_panels:
+            if panel_id in (panel.client_id, panel.unique_id):
+                return panel
+        return None
+
+    def apply_delta(self, entries):
+        """Updates the registered panels and triggers from an asynchronous postback response.
+
+        :param entries: the `DeltaEntry`'s of the response
+        """
+
+        for entry in entries:
+            if entry.type == 'updatePanelIDs':
+                self.update_panels = _parse_panel_ids(entry.content.split(','))
+            elif entry.type == 'asyncPostBackControlIDs':
+                self.async_triggers = [control for control in entry.content.split(',') if control]
+
+
+def parse_delta(text):
+    """Splits the pipe delimited response of an asynchronous postback into its records.
+
+    :param text: the raw text of the response
+    :return: a list of `DeltaEntry`'s in the order they were sent
+    :raises PartialPostbackError: if the response is not a well formed delta
+    """
+
+    entries = []
+    position = 0
+    try:
+        while position < len(text):
+            length_end = text.index('|', position)
+            type_end = text.index('|', length_end + 1)
+            id_end = text.index('|', type_end + 1)
+            length = int(text[position:length_end])
+
+            content_start = id_end + 1
+            content_end = content_start + length
+            if text[content_end:content_end + 1] != '|':
+                raise ValueError('record length does not match its content')
+
+            entries.append(DeltaEntry(
+                text[length_end + 1:type_end],
+                text[type_end + 1:id_end],
+                text[content_start:content_end]))
+            position = content_end + 1
+
+    except ValueError as e:
+        raise errors.PartialPostbackError(f'Malformed asynchronous postback response: {e}')
+
+    return entries
+
+
+def build_async_payload(payload, script_manager, panel, event_target):
+    """Turns a regular postback payload into the payload of an asynchronous postback.
+
+    :param payload: the payload of the equivalent full postback, modified in place
+    :param script_manager: the unique id of the page's ScriptManager
+    :param panel: the `UpdatePanel` to be refreshed
+    :param event_target: the unique id of the control causing the postback
+    :return: the modified payload
+    """
+
+    payload[script_manager] = f'{panel.unique_id}|{event_target}'
+    payload['__ASYNCPOST'] = 'true'
+    payload.setdefault('__EVENTTARGET', '')
+    payload.setdefault('__EVENTARGUMENT', '')
+    return payload
@@ -0,0 +1,90 @@
+import random
+
+
+__all__ = ('RetryPolicy',)
+
+
+class RetryPolicy:
+    """Decides how long requests may take and which failed requests are sent again.
+
+    Failed requests are retried after a jittered exponential backoff. Requests that
+    are idempotent (GETs) are retried after any connection error or server error
+    response. Postbacks change the view-state kept on the server, so they are only
+    retried when the server cannot have processed them: when the connection could
+    not be established or the server answered that it is unavailable.
+    """
+
+    IDEMPOTENT_METHODS = frozenset(('GET', 'HEAD', 'OPTIONS'))
+
+    # responses that are worth waiting for, only the last one promises the request was not processed
+    RETRY_STATUSES = frozenset((500, 502, 503, 504))
+    UNPROCESSED_STATUSES = frozenset((503,))
+
+    def __init__(self, attempts=3, connect_timeout=10.0, read_timeout=60.0, backoff=0.5, max_backoff=8.0):
+        """Constructor
+
+        :param attempts: how many times a request is sent at most, 1 disables retries
+        :param connect_timeout: seconds to wait for a connection, None waits forever
+        :param read_timeout: seconds to wait for the server between bytes of the response, None waits forever
+        :param backoff: the base of the exponential backoff in seconds
+        :param max_backoff: the longest backoff in seconds
+        :raises ValueError: if attempts is less than 1
+        """
+
+        if attempts < 1:
+            raise ValueError('a request has to be sent at least once')
+
+        self.attempts = attempts
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+
+    def timeouts(self, remaining=None):
+        """Returns the timeouts of a request, shortened to fit into the time that is left.
+
+        :param remaining: seconds left until the deadline, None if there is none
+        :return: a (connect timeout, read timeout) tuple
+        """
+
+        connect, read = self.connect_timeout, self.read_timeout
+        if remaining is not None:
+            connect = remaining if connect is None else min(connect, remaining)
+            read = remaining if read is None else min(read, remaining)
+        return connect, read
+
+    def is_idempotent(self, method):
+        """Checks whether a request can be repeated without changing the state on the server.
+
+        :param method: the http method of the request
+        :return: True if the request is safe to repeat
+        """
+
+        return method.upper() in self.IDEMPOTENT_METHODS
+
+    def should_retry(self, method, failures, status=None, connected=True):
+        """Decides whether a failed request is sent again.
+
+        :param method: the http method of the request
+        :param failures: how many times the request has failed so far, including this one
+        :param status: the status code of the response, None if the request raised an error
+        :param connected: False if the connection could not be established, so nothing was sent
+        :return: True if the request should be retried
+        """
+
+        if failures >= self.attempts:
+            return False
+        if not connected:
+            return True
+        if self.is_idempotent(method):
+            return status is None or status in self.RETRY_STATUSES
+        return status in self.UNPROCESSED_STATUSES
+
+    def delay(self, failures):
+        """Returns the backoff before the next attempt, using the full jitter strategy.
+
+        :param failures: how many times the request has failed so far
+        :return: the seconds to wait
+        """
+
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** (failures - 1)))
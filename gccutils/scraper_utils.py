@@ -1,7 +1,19 @@
+from gccutils.form_state import extract_element_state, extract_form_state, extract_fragment_state, parse_postback
+from gccutils.instrumentation import RequestEvent, classify_response, default_page_type
+from gccutils.navigation import PageVisit, Postback, postback_fields
+from gccutils.partial_postback import AJAX_HEADERS, AjaxState, UpdatePanel, build_async_payload, parse_delta
+from gccutils.page_status import PageStatus, classify_page, is_logged_in
+from gccutils.parse_pool import extract_page, extract_page_state
+from gccutils.parsers import parse_html
+from gccutils.retry_policy import RetryPolicy
+from gccutils.session_steps import call, run_steps
+from urllib.parse import unquote
 import gccutils.errors as errors
-from bs4 import BeautifulSoup
+import contextlib
 import requests
+import urllib3
 import getpass
+import time
 
 
 class ScraperUtils:
@@ -14,68 +26,791 @@ class ScraperUtils:
 
     BASE_URL = 'https://my.gcc.edu'
 
-    def __init__(self):
+    # the parser backend used by instances that do not specify their own
+    DEFAULT_PARSER = 'html.parser'
+
+    # whether `postback` refreshes only the affected UpdatePanel when it is able to
+    PARTIAL_POSTBACKS = False
+
+    # the `SessionStore` used by instances that do not specify their own, None disables it
+    SESSION_STORE = None
+
+    # how many times a navigation step is retried after logging in again, 0 disables recovery
+    RECOVERY_ATTEMPTS = 2
+
+    # the `RetryPolicy` used by instances that do not specify their own
+    RETRY_POLICY = RetryPolicy()
+
+    # the exceptions of the http session that the retry policy may retry a request after
+    TRANSPORT_ERRORS = (requests.ConnectionError, requests.Timeout)
+
+    def __init__(self, parser=None, partial_postbacks=None, session_store=None, session_slot='default',
+                 retry_policy=None, metrics=None, base_url=None):
+        """Constructor
+
+        :param parser: the html parser backend to use, defaults to `ScraperUtils.DEFAULT_PARSER`
+        :param partial_postbacks: whether to use asynchronous postbacks, defaults to `ScraperUtils.PARTIAL_POSTBACKS`
+        :param session_store: a `SessionStore` to persist logins in, defaults to `ScraperUtils.SESSION_STORE`
+        :param session_slot: distinguishes the stored sessions of instances logged in as the same user
+        :param retry_policy: the `RetryPolicy` of every request, defaults to `ScraperUtils.RETRY_POLICY`
+        :param metrics: an optional `ScraperMetrics` to report requests, logins and errors to
+        :param base_url: the url of the portal, defaults to `ScraperUtils.BASE_URL`, such as that of a `FakePortal`
+        """
+
+        if base_url is not None:
+            self.BASE_URL = base_url.rstrip('/')
         self.session = requests.Session()
+        self.parser = parser
+        self.partial_postbacks = partial_postbacks
+        self.session_store = session_store
+        self.session_slot = session_slot
+        self.retry_policy = retry_policy
+        self.deadline = None        # the `time.monotonic` time no request may run past, if any
+        self.controller = None      # the `ConcurrencyController` shared by a team of sessions, if any
+        self.aborted = False        # set once the scraper using this instance is stopped, see `AbortedError`
+        self.parse_pool = None      # the `ParsePool` building the structures of pages, if any
+        self.hooks = []             # callables receiving the `RequestEvent` of every request
+        self.metrics = metrics      # the `ScraperMetrics` that receive every `RequestEvent` as well, if any
+        self._event = None          # the event of the current page, passed to the hooks once it is left
+        self._page_type = None
+        self._payload_seconds = 0.0
         self.response = None
-        self.html = None
+        self._page_response = None  # the last response that contained a full page
+        self._deltas = []           # asynchronous postback responses applied on top of that page
+        self._html = None
+        self._form_state = None
+        self._ajax_state = None
+        self.navigation = []        # the `PageVisit` and `Postback` steps leading to the current page
+        self._credentials = None    # the credentials of the last login, used to log in again
+        self._recovering = False
+
+    def _get_retry_policy(self):
+        """ Returns the retry policy of this instance. """
+
+        if self.retry_policy is not None:
+            return self.retry_policy
+        return self.RETRY_POLICY
+
+    def remaining_time(self):
+        """Returns how long requests may still take before the deadline passes.
+
+        :return: the seconds left, or None if there is no deadline
+        :raises DeadlineExceededError: if the deadline has passed
+        """
+
+        if self.deadline is None:
+            return None
+        remaining = self.deadline - time.monotonic()
+        if remaining <= 0:
+            raise errors.DeadlineExceededError('The scrape ran past its deadline.')
+        return remaining
+
+    def _send_steps(self, method, url, **kwargs):
+        """Sends a request with the timeouts of the retry policy, retrying it as the policy allows.
+
+        Written as steps, see `session_steps`, so that the asyncio scrapers share it.
+
+        :return: the response, which may still be a server error once the policy gives up
+        :raises DeadlineExceededError: if the deadline passes before a response arrives
+        :raises RequestException: if the request failed and the policy gives up
+        """
+
+        policy = self._get_retry_policy()
+        failures = 0
+        while True:
+            kwargs['timeout'] = self._timeouts(policy)
+
+            try:
+                response = yield call(self._request, method, url, **kwargs)
+            except self.TRANSPORT_ERRORS as e:
+                failures += 1
+                if not policy.should_retry(method, failures, connected=self._was_connected(e)):
+                    raise
+            else:
+                if response.status_code < 500:
+                    return response
+                failures += 1
+                if not policy.should_retry(method, failures, response.status_code):
+                    return response
+
+            delay = policy.delay(failures)
+            remaining = self.remaining_time()
+            yield call(self._sleep, delay if remaining is None else min(delay, remaining))
+
+    def _timeouts(self, policy):
+        """ Returns the timeouts of the next request as the http session takes them. """
+
+        return policy.timeouts(self.remaining_time())
+
+    def _sleep(self, seconds):
+        """ Waits between the attempts of a request. """
+
+        time.sleep(seconds)
+
+    def _request(self, method, url, **kwargs):
+        """ Sends a single request, reporting how it went to the concurrency controller if there is one. """
+
+        controller = self.controller
+        if controller is None:
+            return self._transmit(method, url, **kwargs)
+
+        controller.acquire(self.remaining_time(), lambda: self.aborted)
+        start = time.monotonic()
+        failed = True
+        try:
+            response = self._transmit(method, url, **kwargs)
+            failed = response.status_code == 429 or response.status_code >= 500
+            return response
+        finally:
+            controller.release(time.monotonic() - start, failed)
+
+    def _transmit(self, method, url, **kwargs):
+        """ Sends a single request over the http session, timing it for the hooks if there are any. """
+
+        if not self.is_timed():
+            return self.session.request(method, url, **kwargs)
+
+        event = self._start_event(method, url)
+        start = time.perf_counter()
+        try:
+            # the body is streamed so that waiting for the headers is told apart from downloading it
+            response = self.session.request(method, url, stream=True, **kwargs)
+            event.ttfb = time.perf_counter() - start
+            event.bytes = len(response.content)
+            event.total = time.perf_counter() - start
+            event.download = event.total - event.ttfb
+            event.status = response.status_code
+            event.error = classify_response(response)
+            return response
+        except Exception as e:
+            event.total = time.perf_counter() - start
+            event.error = self._classify_exception(e)
+            raise
+
+    @staticmethod
+    def _was_connected(error):
+        """Tells whether a failed request got as far as a connection, so that it may have been sent.
+
+        requests raises a `ConnectionError` both when no connection could be established, such as
+        when it is refused or the host name does not resolve, and when an established one breaks
+        off mid-response. Only the urllib3 error it wraps tells them apart.
+
+        :param error: the `ConnectionError` or `Timeout` raised by the http session
+        :return: False if the request cannot have reached the server
+        """
+
+        if isinstance(error, requests.ConnectTimeout):
+            return False
+        if not isinstance(error, requests.ConnectionError) or not error.args:
+            return True
+        reason = getattr(error.args[0], 'reason', error.args[0])  # the retries of urllib3 wrap the cause
+        return not isinstance(reason, urllib3.exceptions.NewConnectionError)
+
+    @staticmethod
+    def _classify_exception(error):
+        """ Classifies an exception raised by the http session for a `RequestEvent`. """
+
+        if isinstance(error, requests.Timeout):
+            return 'timeout'
+        if isinstance(error, requests.ConnectionError):
+            return 'connection-error'
+        return 'request-error'
+
+    def is_timed(self):
+        """ Returns whether requests are timed, which is the case when anything receives their events. """
+
+        return bool(self.hooks) or self.metrics is not None
+
+    def _start_event(self, method, url):
+        """ Passes the event of the page being left to the hooks and starts the event of a new request. """
+
+        self.flush_events()
+        page_type = self._page_type if self._page_type is not None else default_page_type(url)
+        self._event = RequestEvent(method, url, page_type, self._payload_seconds)
+        self._payload_seconds = 0.0
+        return self._event
+
+    def _record_parse(self, seconds):
+        """ Adds time spent building the structures of the current page to its event. """
+
+        if self._event is not None:
+            self._event.parse += seconds
+
+    def flush_events(self):
+        """ Passes the event of the current page to the hooks without waiting for the next request. """
+
+        event, self._event = self._event, None
+        if event is not None:
+            for hook in self.hooks:
+                hook(event)
+            if self.metrics is not None:
+                self.metrics.record_request(event)
+
+    def record_error(self, error):
+        """Reports an error that cost the scraper using this instance part of its work to the metrics.
+
+        :param error: the exception that was caught
+        """
+
+        if self.metrics is not None:
+            self.metrics.record_error(error)
+
+    def _record_login(self, outcome):
+        """ Reports the outcome of a login to the metrics, see `ScraperMetrics.record_login`. """
+
+        if self.metrics is not None:
+            self.metrics.record_login(outcome)
+
+    @contextlib.contextmanager
+    def labelled(self, page_type):
+        """Reports the requests sent within the block as requesting the given type of page.
+
+        :param page_type: the logical type of the requested pages, such as "results"
+        """
+
+        previous, self._page_type = self._page_type, page_type
+        try:
+            yield
+        finally:
+            self._page_type = previous
 
     def http_get(self, url, check_errors=True, **kwargs):
         """Executes an HTTP GET request to the specified url.
 
-        The response of the request gets saved to the `response` attribute.
+        The response of the request gets saved to the `response` attribute. The page
+        is only parsed once something reads the `html` attribute, error checking is
+        performed on the raw response and does not require parsing.
+
+        The visit starts a new navigation path. Should the session have expired, it
+        logs in again and retries, see `recover`.
 
         :param url: the url to send the GET request to
         :param check_errors: whether or not to check if problems occurred, default True
         :param kwargs: optional arguments to include with the request
         """
 
-        self.response = self.session.get(url, **kwargs)
-        self.refresh_html()  # allows for immediate self.html reference
+        run_steps(self._http_get_steps(url, check_errors, **kwargs))
+
+    def _http_get_steps(self, url, check_errors=True, **kwargs):
+        """ The steps of `http_get`. """
+
+        step = PageVisit(url, kwargs.get('params'))
+        attempts = 0
+        while True:
+            try:
+                if attempts:
+                    yield from self._recover_steps([])  # a page loaded via GET does not depend on any earlier page
+                yield from self._load_steps('GET', url, check_errors, **kwargs)
+                break
+            except (errors.NotLoggedInError, errors.PageRedirectError):
+                attempts += 1
+                if not check_errors or not self._can_recover(attempts):
+                    raise
+
+        self.navigation = [step]
+
+    def _load_steps(self, method, url, check_errors=True, **kwargs):
+        """ Loads a page without recording it in the navigation path or recovering from errors. """
+
+        self._load_page((yield from self._send_steps(method, url, **kwargs)))
         if check_errors:     # throws an exception if an error occurred
             self.check_for_error_message()
 
     def http_post(self, url, check_errors=True, **kwargs):
         """Executes an HTTP POST request to the specified url.
 
-        The response of the request gets saved to the `response` attribute.
+        The response of the request gets saved to the `response` attribute. The page
+        is only parsed once something reads the `html` attribute, error checking is
+        performed on the raw response and does not require parsing.
+
+        Raw posts are neither recorded in the navigation path nor recovered from,
+        use `postback` to navigate through the forms of MyGCC instead.
 
         :param url: the url to send the POST request to
         :param check_errors: whether or not to check if problems occurred, default True
         :param kwargs: optional arguments to include with the request
         """
 
-        self.response = self.session.post(url, **kwargs)
-        self.refresh_html()  # allows for immediate self.html reference
-        if check_errors:     # throws an exception if an error occurred
+        run_steps(self._load_steps('POST', url, check_errors, **kwargs))
+
+    def http_async_post(self, url, update_panel, event_target, payload, check_errors=True):
+        """Executes an ASP.NET asynchronous postback that only re-renders a single UpdatePanel.
+
+        The pipe delimited response is applied on top of the current page: updated hidden
+        fields (such as the view-state) are written into the cached `form_state` and only
+        the changed panel fragments get parsed into the `html` structure. Responses that
+        turn out to be full pages are loaded as if `http_post` had been used.
+
+        :param url: the url to send the POST request to
+        :param update_panel: the `UpdatePanel` to be refreshed
+        :param event_target: the unique id of the control causing the postback
+        :param payload: the payload of the equivalent full postback
+        :param check_errors: whether or not to check if problems occurred, default True
+        :raises PartialPostbackError: if the server reports an error or the response is malformed
+        """
+
+        run_steps(self._async_post_steps(url, update_panel, event_target, payload, check_errors))
+
+    def _async_post_steps(self, url, update_panel, event_target, payload, check_errors=True):
+        """ The steps of `http_async_post`. """
+
+        payload = self._prepare_async_payload(update_panel, event_target, payload)
+        response = yield from self._send_steps('POST', url, data=payload, headers=AJAX_HEADERS)
+
+        redirect_url = self._receive_delta(response)
+        if redirect_url is not None:
+            yield from self._load_steps('GET', redirect_url, check_errors)
+        elif check_errors:  # throws an exception if an error occurred
             self.check_for_error_message()
 
+    def postback(self, nav_element=None, event_target=None, partial=None, check_errors=True, fields=None):
+        """Posts the current form back to the server as if the navigation element was clicked.
+
+        When partial postbacks are enabled and the element lives within (or is registered
+        as a trigger of) an UpdatePanel, only that panel is requested and re-parsed.
+
+        The postback is recorded in the navigation path by the fields identifying it.
+        Should the session have expired or the view-state been rejected, it logs in
+        again, replays the path and retries, see `recover`.
+
+        :param nav_element: an optional navigation element either submit or containing postback
+        :param event_target: an optional `__EVENTTARGET` overriding the one of the element
+        :param partial: whether to use an asynchronous postback, defaults to `partial_postbacks`
+        :param check_errors: whether or not to check if problems occurred, default True
+        :param fields: optional form fields overriding those of the page, such as the selected term
+        """
+
+        run_steps(self._postback_steps(nav_element, event_target, partial, check_errors, fields))
+
+    def _postback_steps(self, nav_element=None, event_target=None, partial=None, check_errors=True, fields=None):
+        """ The steps of `postback`. """
+
+        step = Postback(postback_fields(nav_element, event_target, fields))
+        path = list(self.navigation)
+        attempts = 0
+        while True:
+            try:
+                if attempts:
+                    yield from self._recover_steps(path)
+                    # the element belongs to the expired page, the step is rebuilt from its fields
+                    nav_element, event_target, fields = None, None, step.fields
+                yield from self._send_postback_steps(nav_element, event_target, partial, check_errors, fields)
+                break
+            except (errors.NotLoggedInError, errors.PageRedirectError):
+                attempts += 1
+                if not check_errors or not self._can_recover(attempts):
+                    self.navigation = path
+                    raise
+
+        self.navigation.append(step)
+
+    def _send_postback_steps(self, nav_element, event_target, partial, check_errors, fields):
+        """ Sends a postback without recording it or recovering from errors. """
+
+        url, update_panel, trigger, payload = self._prepare_postback(nav_element, event_target, partial, fields)
+        if update_panel is not None:
+            yield from self._async_post_steps(url, update_panel, trigger, payload, check_errors)
+        else:
+            yield from self._load_steps('POST', url, check_errors, data=payload)
+
+    def _prepare_postback(self, nav_element, event_target, partial, fields=None):
+        """Determines how and where a postback from the navigation element is to be sent.
+
+        :return: the post url, the `UpdatePanel` to refresh (None for a full postback),
+            the unique id of the triggering control and the payload
+        """
+
+        if self.is_timed():
+            self.form_state  # built beforehand, so that only building the payload is timed
+        start = time.perf_counter()
+        action, payload = self.prepare_payload(nav_element=nav_element)
+        if isinstance(event_target, str):
+            payload['__EVENTTARGET'] = event_target
+        if fields:
+            payload.update(fields)
+        self._payload_seconds += time.perf_counter() - start
+
+        if partial is None:
+            partial = self.partial_postbacks
+        if partial is None:
+            partial = self.PARTIAL_POSTBACKS
+
+        if partial:
+            if nav_element is not None and nav_element.get('type') == 'submit':
+                trigger = nav_element['name']
+            else:
+                trigger = payload.get('__EVENTTARGET', '')
+
+            update_panel = self.find_update_panel(nav_element, trigger)
+            if update_panel is not None:
+                return self.to_url(action), update_panel, trigger, payload
+
+        return self.to_url(action), None, None, payload
+
+    def _prepare_async_payload(self, update_panel, event_target, payload):
+        """ Turns the payload of a full postback into the payload of an asynchronous one. """
+
+        script_manager = self.ajax_state.script_manager
+        start = time.perf_counter()
+        payload = build_async_payload(payload, script_manager, update_panel, event_target)
+        self._payload_seconds += time.perf_counter() - start
+        return payload
+
+    def _receive_delta(self, response):
+        """Applies the response of an asynchronous postback to the current page.
+
+        :param response: the response of the asynchronous postback
+        :return: the url the server asked to be redirected to, otherwise None
+        :raises PartialPostbackError: if the server reports an error or the response is malformed
+        """
+
+        start = time.perf_counter()
+        try:
+            entries = parse_delta(response.text)
+        except errors.PartialPostbackError:
+            if not response.text.lstrip().startswith('<'):
+                raise
+            self._load_page(response)  # the server responded with a full page instead
+            return None
+
+        for entry in entries:
+            if entry.type == 'error':
+                raise errors.PartialPostbackError(entry.content)
+            if entry.type == 'pageRedirect':
+                return self.to_url(unquote(entry.content))
+
+        self.response = response
+        self._apply_delta(entries)
+        self._record_parse(time.perf_counter() - start)
+        return None
+
+    def _can_recover(self, attempts):
+        """ Returns whether a navigation step that has failed `attempts` times may be retried. """
+
+        return not self._recovering and self._credentials is not None and attempts <= self.RECOVERY_ATTEMPTS
+
+    def recover(self, path=None):
+        """Logs in again and replays a navigation path to rebuild the server-side state of its page.
+
+        MyGCC keeps the state of every page on the server, so an expired session loses
+        more than its login: the page has to be reached again the way it was before.
+        The path is replayed from the fresh pages, only the fields identifying each
+        postback are taken from the recorded steps.
+
+        :param path: the `PageVisit` and `Postback` steps to replay, defaults to `navigation`
+        :raises NotLoggedInError: if there has been no login to repeat
+        :raises LoginError: if logging in again fails
+        :raises PageError: if the path cannot be replayed
+        """
+
+        run_steps(self._recover_steps(path))
+
+    def _recover_steps(self, path=None):
+        """ The steps of `recover`. """
+
+        if self._credentials is None:
+            raise errors.NotLoggedInError('Cannot log in again without having logged in before.')
+        if path is None:
+            path = list(self.navigation)
+
+        username, password = self._credentials
+        if self.metrics is not None:
+            self.metrics.record_recovery()
+        self._recovering = True
+        try:
+            self.forget_session(username)
+            yield from self._login_steps(username, password)
+            for step in path:
+                if isinstance(step, PageVisit):
+                    yield from self._http_get_steps(step.url, params=step.params)
+                else:
+                    yield from self._postback_steps(fields=step.fields)
+        finally:
+            self._recovering = False
+
+    @contextlib.contextmanager
+    def excursion(self):
+        """Leaves the navigation steps taken within the block out of the navigation path.
+
+        Meant for visiting a page and navigating back from it, such as the detail page
+        of a results row, so that recovering later on does not replay the round trip.
+        """
+
+        length = len(self.navigation)
+        try:
+            yield
+        finally:
+            del self.navigation[length:]
+
+    def find_update_panel(self, nav_element, trigger):
+        """Determines which UpdatePanel an asynchronous postback from a control should refresh.
+
+        :param nav_element: the navigation element causing the postback, may be None
+        :param trigger: the unique id of the control causing the postback
+        :return: the `UpdatePanel` to refresh or None if the postback must be a full one
+        """
+
+        ajax_state = self.ajax_state
+        if ajax_state is None or ajax_state.script_manager is None or not trigger:
+            return None
+
+        # controls within a panel that has children as triggers refresh that panel
+        if nav_element is not None:
+            for parent in nav_element.parents:
+                parent_id = parent.get('id') if parent.name else None
+                if parent_id is not None:
+                    panel = ajax_state.find_panel(parent_id)
+                    if panel is not None:
+                        return panel if panel.children_as_triggers else None
+
+        # explicitly registered triggers post back through the script manager itself
+        if trigger in ajax_state.async_triggers:
+            return UpdatePanel(ajax_state.script_manager, None, False)
+
+        return None
+
     def perform_login(self, username=None, password=None):
         """Attempts to login to https://my.gcc.edu/ using the provided credentials.
 
         If no credentials are provided, they will be requested via a command line prompt.
+        When a session store is configured, a stored session of the user is restored
+        first and the login is skipped entirely if it is still valid.
 
         :param username: the username to be used for login
         :param password: the password to be used for login
         :raises LoginError: if the supplied credentials are invalid
         """
 
-        self.http_get(self.BASE_URL)  # the base url contains the login fields
+        run_steps(self._login_steps(username, password))
+
+    def _login_steps(self, username=None, password=None):
+        """ The steps of `perform_login`. """
+
+        if username and password:
+            self._credentials = username, password
+
+        restored = self._restore_session(username)
+        yield from self._http_get_steps(self.BASE_URL)  # the base url contains the login fields
+        if restored:
+            if self._page_is_logged_in():
+                self._record_login('restored')
+                return  # the stored session is still valid
+            self.forget_session(username)
+            yield from self._http_get_steps(self.BASE_URL)
+
+        login_request = self._prepare_login(username, password)
+        if login_request is not None:
+            url, payload = login_request
+            try:
+                yield from self._load_steps('POST', url, data=payload)
+            except errors.LoginError:
+                self._record_login('failure')
+                raise
+            self._record_login('success')
+            self._save_session(username)
+
+    def _get_session_store(self):
+        """ Returns the session store of this instance, if any. """
+
+        if self.session_store is not None:
+            return self.session_store
+        return self.SESSION_STORE
+
+    def _cookie_jar(self):
+        """ Returns the `http.cookiejar.CookieJar` of the underlying http session. """
+
+        return self.session.cookies
+
+    def _restore_session(self, username):
+        """ Loads the stored cookies of the user, returning whether any were restored. """
+
+        store = self._get_session_store()
+        if store is None or not username:
+            return False
+        return store.load(username, self._cookie_jar(), self.session_slot)
+
+    def _save_session(self, username):
+        """ Stores the cookies of the user if the login succeeded. """
+
+        store = self._get_session_store()
+        if store is not None and username and self._page_is_logged_in():
+            store.save(username, self._cookie_jar(), self.session_slot)
+
+    def forget_session(self, username):
+        """Removes the stored session of the user, such as after it expired or was logged out.
+
+        :param username: the username the session belongs to
+        """
+
+        store = self._get_session_store()
+        if store is not None and username:
+            store.delete(username, self.session_slot)
+        self._cookie_jar().clear()
+
+    def _prepare_login(self, username, password):
+        """Builds the login request from the current page.
+
+        :return: the post url and payload, or None if the page has no login button
+        """
+
         login_btn = self.html.find('input', {'type': 'submit', 'id': 'siteNavBar_btnLogin'})
-        if login_btn is not None:
-            action, payload = self.prepare_payload(nav_element=login_btn)
-            payload['userName'] = username or input('Username: ')
-            payload['password'] = password or getpass.getpass()
-            self.http_post(self.BASE_URL + action, data=payload)
+        if login_btn is None:
+            return None
+
+        action, payload = self.prepare_payload(nav_element=login_btn)
+        payload['userName'] = username or input('Username: ')
+        payload['password'] = password or getpass.getpass()
+        self._credentials = payload['userName'], payload['password']
+        return self.BASE_URL + action, payload
+
+    @property
+    def html(self):
+        """ The BeautifulSoup structure of the current page, built when first accessed. """
+
+        if self._html is None and self._page_response is not None:
+            start = time.perf_counter()
+            raw_html_text = self._page_response.text
+            html = parse_html(raw_html_text, self.parser or self.DEFAULT_PARSER)
+            for entries in self._deltas:
+                self._apply_delta_to_html(html, entries)
+            self._html = html
+            self._record_parse(time.perf_counter() - start)
+        return self._html
+
+    @html.setter
+    def html(self, value):
+        self._html = value
+
+    @property
+    def form_state(self):
+        """ The `FormState` of the current page, extracted without building its BeautifulSoup structure. """
+
+        if self._form_state is None and self._page_response is not None:
+            start = time.perf_counter()
+            form_state = self._extract_form_state()
+            for entries in self._deltas:
+                self._apply_delta_to_form_state(form_state, entries)
+            self._form_state = form_state
+            self._record_parse(time.perf_counter() - start)
+        return self._form_state
+
+    def _extract_form_state(self):
+        """ Extracts the `FormState` of the current page, in the parse pool if there is one. """
+
+        response = self._page_response
+        if self.parse_pool is None:
+            return extract_form_state(response.text)
+        return self.parse_pool.parse(extract_page_state, response.content, response.encoding)
+
+    def extract(self, extractor, *args):
+        """Runs an extractor over the BeautifulSoup structure of the current page.
+
+        With a parse pool, the page is parsed by one of its processes instead, along
+        with its `FormState` so that leaving the page does not parse it here either.
+        Pages that are parsed already or were changed by asynchronous postbacks are
+        extracted from directly.
+
+        :param extractor: a picklable function taking the BeautifulSoup structure and the args
+        :param args: further picklable arguments of the extractor
+        :return: whatever the extractor returns
+        """
 
-    def refresh_html(self):
-        """ Rebuilds the BeautifulSoup structure of the current page. """
+        if not self._can_offload():
+            return extractor(self.html, *args)
+
+        start = time.perf_counter()
+        response = self._page_response
+        form_state, result = self.parse_pool.parse(
+            extract_page, response.content, response.encoding, self.parser or self.DEFAULT_PARSER, extractor, args)
+        self._adopt_form_state(form_state, start)
+        return result
+
+    def _can_offload(self):
+        """ Returns whether the current page can be handed to the parse pool. """
+
+        return (self.parse_pool is not None and self._page_response is not None
+                and self._html is None and not self._deltas)
+
+    def _adopt_form_state(self, form_state, start):
+        """ Keeps the `FormState` extracted by the parse pool, timing the parse from the given start. """
 
-        if self.response is not None:
-            raw_html_text = self.response.text
-            self.html = BeautifulSoup(raw_html_text, features='html.parser')
+        if self._form_state is None:
+            self._form_state = form_state
+        self._record_parse(time.perf_counter() - start)
+
+    @property
+    def ajax_state(self):
+        """ The `AjaxState` of the current page, describing its UpdatePanels. """
+
+        if self._ajax_state is None and self._page_response is not None:
+            start = time.perf_counter()
+            ajax_state = AjaxState.from_markup(self._page_response.text)
+            for entries in self._deltas:
+                ajax_state.apply_delta(entries)
+            self._ajax_state = ajax_state
+            self._record_parse(time.perf_counter() - start)
+        return self._ajax_state
+
+    def refresh_html(self):
+        """ Discards the page structures so they get rebuilt from the current response. """
+
+        self._html = None
+        self._form_state = None
+        self._ajax_state = None
+
+    def _load_page(self, response):
+        """ Makes a response containing a full page the current page. """
+
+        self.response = self._page_response = response
+        self._deltas = []
+        self.refresh_html()  # the new page gets parsed on first self.html reference
+
+    def _apply_delta(self, entries):
+        """ Applies an asynchronous postback response to the current page and its built structures. """
+
+        self._deltas.append(entries)
+        if self._html is not None:
+            self._apply_delta_to_html(self._html, entries)
+        if self._form_state is not None:
+            self._apply_delta_to_form_state(self._form_state, entries)
+        if self._ajax_state is not None:
+            self._ajax_state.apply_delta(entries)
+
+    def _apply_delta_to_html(self, html, entries):
+        """ Replaces the content of every re-rendered UpdatePanel within the structure. """
+
+        for entry in entries:
+            if entry.type == 'updatePanel':
+                panel = html.find(id=entry.id)
+                if panel is None:
+                    raise errors.PartialPostbackError(f'UpdatePanel {entry.id} not found.')
+
+                # only the fragment gets parsed, lxml and html5lib wrap it within a body
+                fragment = parse_html(entry.content, self.parser or self.DEFAULT_PARSER)
+                nodes = fragment.body.contents if fragment.body is not None else fragment.contents
+                panel.clear()
+                for node in list(nodes):
+                    panel.append(node.extract())
+
+    def _apply_delta_to_form_state(self, form_state, entries):
+        """Writes the updated hidden fields and re-rendered form controls into the form state.
+
+        The controls a re-rendered UpdatePanel held before are dropped, those of a panel
+        re-rendered for the first time are read from the full page the deltas apply to.
+        """
 
-        else:  # for when the scraper has not been used yet
-            self.html = None
+        for entry in entries:
+            if entry.type == 'hiddenField':
+                form_state.fields[entry.id] = entry.content
+            elif entry.type == 'formAction':
+                form_state.action = entry.content
+            elif entry.type == 'updatePanel':
+                replaced = form_state.panels.get(entry.id)
+                if replaced is None:
+                    replaced = extract_element_state(self._page_response.text, entry.id)
+                panel_state = extract_fragment_state(entry.content)
+                form_state.merge(panel_state, replaced)
+                form_state.panels[entry.id] = panel_state
 
     def to_url(self, path):
         """Ensures the base url is prefixed to the specified path.
@@ -105,16 +840,44 @@ class ScraperUtils:
         """
         Builds a payload for sending post requests from the current page.
 
+        The current page is read with a streaming form-state extractor, only an
+        explicitly supplied `html` structure gets walked element by element.
+
         :param html: a BeautifulSoup representation of the current page
         :param nav_element: an optional navigation element either submit or containing postback
         :return: post url, a dictionary containing the payload keys and values
         """
 
         if html is None:
-            html = self.html
+            form_state = self.form_state
+            if form_state is None:
+                return '', {}
+            action, payload = form_state.action, form_state.payload()
 
-        if html is None:
-            return '', {}
+        else:
+            action, payload = self.prepare_payload_from_html(html)
+
+        if nav_element is not None:
+            # include the optional parameter if it is of type submit
+            if nav_element.get('type') == 'submit':
+                payload[nav_element['name']] = nav_element.get('value', '')
+
+            else:
+                # javascript:__doPostBack('eventTargetValue','eventArgumentValue')
+                postback = parse_postback(nav_element.get('href'))
+                if postback is not None:
+                    payload['__EVENTTARGET'], payload['__EVENTARGUMENT'] = postback
+
+        return action, payload
+
+    @staticmethod
+    def prepare_payload_from_html(html):
+        """
+        Builds the default payload of a page by walking its BeautifulSoup structure.
+
+        :param html: a BeautifulSoup representation of the page
+        :return: post url, a dictionary containing the payload keys and values
+        """
 
         # this is the top level form element
         form = html.find('form', {'name': 'MAINFORM'})
@@ -160,46 +923,56 @@ class ScraperUtils:
             else:
                 payload[input_name] = input_value
 
-        if nav_element is not None:
-            # include the optional parameter if it is of type submit
-            if nav_element.get('type') == 'submit':
-                payload[nav_element['name']] = nav_element.get('value', '')
+        return action, payload
 
-            else:
-                href = nav_element.get('href')
-                if href is not None and '__doPostBack' in href:
-                    # javascript:__doPostBack('eventTargetValue','eventArgumentValue')
-                    href = href.replace('javascript:__doPostBack(', '')
-                    href = href.replace(')', '')
-                    href = href.replace("'", '')
-                    href_elements = href.split(',', 1)
-                    if len(href_elements) == 2:
-                        payload['__EVENTTARGET'] = href_elements[0]
-                        payload['__EVENTARGUMENT'] = href_elements[1]
+    def page_status(self, html=None):
+        """Classifies the current page without building its BeautifulSoup structure.
 
-        return action, payload
+        :param html: an optional BeautifulSoup representation of the page to classify instead
+        :return: the `PageStatus` of the page, or None if no page has been loaded
+        """
 
-    def check_for_error_message(self, html=None):
-        """ Checks if you are unauthorized, not logged in, or were redirected. """
+        if html is not None:
+            return classify_page(str(html))
 
-        if html is None:
-            html = self.html
+        if self.response is None:
+            return None
 
-        if html is None:
-            return
+        return classify_page(self.response.content)
 
-        raw_html_text = str(html)
-        is_logged_in = html.find('a', {'id': 'logout'}) is not None
-        redirect_error = "You have been redirected to this page because you attempted to navigate" in raw_html_text
-        unauthorized_error = "require you to be logged in" in raw_html_text
+    def is_logged_in(self, refresh=False):
+        """Checks whether the current page was served to a logged in user.
 
-        if redirect_error:
+        :param refresh: whether to first load the home page to check the session on the server
+        :return: True if the page contains the logout anchor
+        """
+
+        if refresh:
+            self.http_get(self.BASE_URL, check_errors=False)
+        return self._page_is_logged_in()
+
+    def _page_is_logged_in(self):
+        """ Checks the current page for the logout anchor without sending any requests. """
+
+        if self.response is None:
+            return False
+        return is_logged_in(self.response.content)
+
+    def check_for_error_message(self, html=None):
+        """ Checks if you are unauthorized, not logged in, or were redirected. """
+
+        status = self.page_status(html)
+
+        if status is PageStatus.REDIRECTED:
             raise errors.PageRedirectError('Page was redirected due to improper navigation.')
-        elif not is_logged_in and unauthorized_error:
+        elif status is PageStatus.NOT_LOGGED_IN:
             raise errors.NotLoggedInError('You must be logged in to view this page.')
-        elif unauthorized_error:
+        elif status is PageStatus.UNAUTHORIZED:
             raise errors.UnauthorizedError('You are not authorized to view this page.')
-        else:
+        elif status is PageStatus.LOGIN_ERROR:
+            # only the error text requires the page structure
+            if html is None:
+                html = self.html
             element = html.find('span', {'id': 'CP_V_lblLoginError'})
             if element is not None:
                 raise errors.LoginError(element.get_text())
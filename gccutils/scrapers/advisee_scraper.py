@@ -186,32 +186,35 @@ class AdviseeScraper:
         return email, name, user_id, nav_element
 
     def build_student_dict(self, email, name, user_id, nav_element):
-        # if any navigation fails here, we cannot recover without restarting
-        self.perform_navigation(nav_element)  # navigate to student overview
+        # an expired session is recovered by replaying the path to the roster page,
+        # which leaves out the round trip through the student overview
+        with self.scraper.excursion():
+            self.perform_navigation(nav_element)  # navigate to student overview
 
-        try:
+            try:
 
-            parser = AdviseeOverviewParser(self.scraper.html)
-            overview = parser.parse()
-            overview['email'] = email
-            overview['name'] = name
-            overview['user_id'] = user_id
+                parser = AdviseeOverviewParser(self.scraper.html)
+                overview = parser.parse()
+                overview['email'] = email
+                overview['name'] = name
+                overview['user_id'] = user_id
 
-            return overview
+                return overview
 
-        except errors.ScraperError:
-            traceback.print_exc()
-        finally:
-            # The __EVENTTARGET postback identifier is hardcoded because MyGCC is a jerk.
-            # We cannot reliably obtain the navigation element to get back to the roster
-            #   since MyGCC will randomly not include it within the breadcrumb trail.
-            self.perform_navigation(None, self.STUDENT_TO_ROSTER_EVENT_TARGET)
+            except errors.ScraperError:
+                traceback.print_exc()
+            finally:
+                # The __EVENTTARGET postback identifier is hardcoded because MyGCC is a jerk.
+                # We cannot reliably obtain the navigation element to get back to the roster
+                #   since MyGCC will randomly not include it within the breadcrumb trail.
+                self.perform_navigation(None, self.STUDENT_TO_ROSTER_EVENT_TARGET)
 
     def try_nav_to_next_page(self):
         next_page = self.get_next_page_element()
         if next_page is None:
             return False
         self.perform_navigation(next_page)
+        return True
 
     def get_next_page_element(self):
         # find the navigation container
@@ -228,10 +231,4 @@ class AdviseeScraper:
                 return nav_links[-1]
 
     def perform_navigation(self, nav_element, event_target=None):
-        scraper = self.scraper
-        action, payload = scraper.prepare_payload(nav_element=nav_element)
-
-        if isinstance(event_target, str):
-            payload['__EVENTTARGET'] = event_target
-
-        scraper.http_post(scraper.to_url(action), data=payload)
+        self.scraper.postback(nav_element, event_target)
@@ -0,0 +1,131 @@
+from gccutils.scraper_utils import ScraperUtils
+from concurrent.futures import ThreadPoolExecutor
+import itertools
+import threading
+import time
+
+
+__all__ = ('SessionPool',)
+
+
+class SessionPool:
+    """A pool of logged-in `ScraperUtils` instances that can be lent out and returned.
+
+    Logins are performed concurrently and their cost is only paid once: instances
+    returned to the pool stay logged in and are handed out again on the next run.
+    Instances that have been idle for a while are health-checked before being lent.
+    """
+
+    def __init__(self, username, password, max_idle=300, factory=ScraperUtils):
+        """Constructor
+
+        :param username: the username to be used for logging in
+        :param password: the password to be used for logging in
+        :param max_idle: seconds an instance may sit idle before it gets health-checked
+        :param factory: callable creating new (logged out) `ScraperUtils` instances
+        """
+
+        self.__username = username
+        self.__password = password
+        self.max_idle = max_idle
+        self.factory = factory
+        self._idle = []  # (instance, time returned) pairs, most recently returned last
+        self._lock = threading.Lock()
+        self._slots = itertools.count()
+
+    def __len__(self):
+        """ Returns how many idle instances the pool holds. """
+
+        with self._lock:
+            return len(self._idle)
+
+    def login(self):
+        """Creates and logs in a new instance.
+
+        :return: the logged in `ScraperUtils` instance
+        :raises LoginError: if the credentials are invalid
+        """
+
+        dc = self.factory()
+
+        # each instance keeps its own stored session when a session store is used
+        with self._lock:
+            dc.session_slot = f'pool-{next(self._slots)}'
+
+        dc.perform_login(self.__username, self.__password)
+        return dc
+
+    def fill(self, size):
+        """Logs in new instances concurrently until the pool holds at least `size` idle ones.
+
+        :param size: the desired number of idle instances
+        """
+
+        missing = size - len(self)
+        if missing > 0:
+            for dc in self._login_many(missing):
+                self.release(dc)
+
+    def acquire(self):
+        """Lends out a logged-in instance, logging in a new one if none are idle.
+
+        :return: a logged-in `ScraperUtils` instance
+        """
+
+        return self.acquire_many(1)[0]
+
+    def acquire_many(self, count):
+        """Lends out several logged-in instances, logging in any missing ones concurrently.
+
+        :param count: how many instances to lend out
+        :return: a list of logged-in `ScraperUtils` instances
+        """
+
+        with self._lock:
+            taken = self._idle[-count:] if count else []
+            del self._idle[len(self._idle) - len(taken):]
+
+        # health-check the instances that sat idle for too long at the same time
+        now = time.time()
+        stale = [dc for dc, returned in taken if now - returned > self.max_idle]
+        instances = [dc for dc, returned in taken if now - returned <= self.max_idle]
+        if stale:
+            with ThreadPoolExecutor(len(stale)) as executor:
+                instances.extend(executor.map(self._ensure_logged_in, stale))
+
+        instances.extend(self._login_many(count - len(instances)))
+        return instances
+
+    def release(self, dc):
+        """Returns a lent instance to the pool.
+
+        :param dc: the `ScraperUtils` instance to return
+        """
+
+        with self._lock:
+            self._idle.append((dc, time.time()))
+
+    def clear(self):
+        """ Discards every idle instance. """
+
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for dc, _ in idle:
+            dc.session.close()
+
+    def _login_many(self, count):
+        """ Logs in `count` new instances concurrently. """
+
+        if count <= 0:
+            return []
+        if count == 1:
+            return [self.login()]
+        with ThreadPoolExecutor(count) as executor:
+            return list(executor.map(lambda _: self.login(), range(count)))
+
+    def _ensure_logged_in(self, dc):
+        """ Logs an instance back in if its session on the server has expired. """
+
+        if not dc.is_logged_in(refresh=True):
+            dc.perform_login(self.__username, self.__password)
+        return dc
@@ -0,0 +1,82 @@
+from collections import namedtuple
+import inspect
+
+
+__all__ = ('Call', 'call', 'run_steps', 'arun_steps')
+
+
+# a call the page logic of a session needs made on its behalf, such as a postback or handing out a result
+Call = namedtuple('Call', ('function', 'args', 'kwargs'))
+
+
+def call(function, *args, **kwargs):
+    """Describes a call for the driver of the steps to make.
+
+    The page logic of the scrapers is written once as generators that yield every
+    call which may send a request, wait for work or hand out a result. The threaded
+    sessions make these calls directly with `run_steps`, the asyncio sessions await
+    the coroutines they return with `arun_steps`. Whatever a call returns is sent
+    back into the generator and whatever it raises is thrown into it, so the logic
+    reads like plain code: `rows = yield call(dc.extract, find_rows)`.
+
+    :param function: the function or coroutine function to call
+    :param args: the arguments of the call
+    :param kwargs: the keyword arguments of the call
+    :return: the `Call` to yield
+    """
+
+    return Call(function, args, kwargs)
+
+
+def run_steps(steps):
+    """Runs page logic, making each of its calls in the current thread.
+
+    :param steps: a generator yielding `Call`'s
+    :return: whatever the generator returns
+    :raises Exception: whatever the generator raises
+    """
+
+    value, error = None, None
+    try:
+        while True:
+            try:
+                step = steps.send(value) if error is None else steps.throw(error)
+            except StopIteration as stop:
+                return stop.value
+
+            value, error = None, None
+            try:
+                value = step.function(*step.args, **step.kwargs)
+            except Exception as e:
+                error = e
+    finally:
+        steps.close()
+
+
+async def arun_steps(steps):
+    """Runs page logic on the event loop, awaiting the calls that return awaitables.
+
+    Cancelling the coroutine closes the generator, leaving its `with` blocks on the way out.
+
+    :param steps: a generator yielding `Call`'s
+    :return: whatever the generator returns
+    :raises Exception: whatever the generator raises
+    """
+
+    value, error = None, None
+    try:
+        while True:
+            try:
+                step = steps.send(value) if error is None else steps.throw(error)
+            except StopIteration as stop:
+                return stop.value
+
+            value, error = None, None
+            try:
+                value = step.function(*step.args, **step.kwargs)
+                if inspect.isawaitable(value):
+                    value = await value
+            except Exception as e:
+                error = e
+    finally:
+        steps.close()
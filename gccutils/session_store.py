@@ -0,0 +1,124 @@
+from http.cookiejar import Cookie
+import hashlib
+import json
+import time
+import os
+
+
+__all__ = ('SessionStore',)
+
+
+def _cookie_to_dict(cookie):
+    """ Converts a cookie into a json serializable dictionary. """
+
+    return {
+        'name': cookie.name,
+        'value': cookie.value,
+        'domain': cookie.domain,
+        'path': cookie.path,
+        'secure': cookie.secure,
+        'expires': cookie.expires,
+        'rest': dict(getattr(cookie, '_rest', {}))}
+
+
+def _dict_to_cookie(values):
+    """ Converts a dictionary created by `_cookie_to_dict` back into a cookie. """
+
+    domain = values['domain']
+    return Cookie(
+        version=0, name=values['name'], value=values['value'],
+        port=None, port_specified=False,
+        domain=domain, domain_specified=bool(domain), domain_initial_dot=domain.startswith('.'),
+        path=values['path'], path_specified=True,
+        secure=values['secure'], expires=values['expires'], discard=False,
+        comment=None, comment_url=None, rest=values['rest'])
+
+
+class SessionStore:
+    """An opt-in on-disk cache of logged-in cookie jars, keyed by username.
+
+    Restoring a cached jar lets a new process skip the login round trip for as long
+    as the session is still valid on the server. The cookies grant access to the
+    account, so the store directory is only accessible by its owner (mode 0700) and
+    every file is created with mode 0600. Usernames are hashed into the file names.
+    """
+
+    def __init__(self, directory=None, max_age=None):
+        """Constructor
+
+        :param directory: where to keep the sessions, defaults to ~/.cache/gccutils/sessions
+        :param max_age: optional seconds after which a stored session is no longer restored
+        """
+
+        if directory is None:
+            directory = os.path.join(os.path.expanduser('~'), '.cache', 'gccutils', 'sessions')
+        self.directory = directory
+        self.max_age = max_age
+
+    def path(self, username, slot='default'):
+        """Returns the file a session is stored within.
+
+        :param username: the username the session belongs to
+        :param slot: distinguishes several concurrent sessions of the same user
+        :return: the path of the session file
+        """
+
+        key = hashlib.sha256(f'{username}\0{slot}'.encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, key + '.json')
+
+    def save(self, username, cookie_jar, slot='default'):
+        """Writes the cookies of a logged-in session to disk.
+
+        :param username: the username the session belongs to
+        :param cookie_jar: the `http.cookiejar.CookieJar` of the session
+        :param slot: distinguishes several concurrent sessions of the same user
+        """
+
+        os.makedirs(self.directory, mode=0o700, exist_ok=True)
+        os.chmod(self.directory, 0o700)
+
+        data = json.dumps({
+            'saved': time.time(),
+            'cookies': [_cookie_to_dict(cookie) for cookie in cookie_jar]})
+
+        # written to a temporary file first so readers never see partial sessions
+        path = self.path(username, slot)
+        temp_path = f'{path}.{os.getpid()}.tmp'
+        fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'w') as file:
+            file.write(data)
+        os.replace(temp_path, path)
+
+    def load(self, username, cookie_jar, slot='default'):
+        """Restores the cookies of a stored session into a cookie jar.
+
+        :param username: the username the session belongs to
+        :param cookie_jar: the `http.cookiejar.CookieJar` to restore the cookies into
+        :param slot: distinguishes several concurrent sessions of the same user
+        :return: True if a session was restored
+        """
+
+        try:
+            with open(self.path(username, slot)) as file:
+                data = json.load(file)
+        except (OSError, ValueError):
+            return False
+
+        if self.max_age is not None and time.time() - data.get('saved', 0) > self.max_age:
+            return False
+
+        for values in data.get('cookies', []):
+            cookie_jar.set_cookie(_dict_to_cookie(values))
+        return True
+
+    def delete(self, username, slot='default'):
+        """Removes a stored session, such as after it has expired.
+
+        :param username: the username the session belongs to
+        :param slot: distinguishes several concurrent sessions of the same user
+        """
+
+        try:
+            os.remove(self.path(username, slot))
+        except FileNotFoundError:
+            pass
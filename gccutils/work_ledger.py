@@ -0,0 +1,216 @@
+import contextlib
+import threading
+import sqlite3
+import pickle
+import time
+import os
+
+
+__all__ = ('WorkLedger',)
+
+
+class WorkLedger:
+    """The units of work of crawls split across machines, kept in a SQLite database on a shared filesystem.
+
+    Every crawl is divided into a fixed number of units, which nodes lease for a
+    while, keep leased by sending heartbeats, and commit the results of once done.
+    A unit whose lease runs out, because its node died or lost its connection, is
+    leased to the next node asking for work. Results are stored by a unique key,
+    so a unit that ends up committed twice does not store anything twice, and a
+    commit is only accepted from the node that currently holds the lease.
+
+    Leases are compared to the wall clock, so the clocks of the nodes have to agree
+    within a fraction of the lease duration. SQLite relies on the locking of the
+    filesystem, which network filesystems do not always implement faithfully.
+
+    Results are stored pickled, and unpickling runs whatever code the data asks for.
+    Anyone able to write to the database can therefore run code on every node reading
+    its results, so it must only be writable by the nodes of the crawl and trusted users.
+    """
+
+    def __init__(self, path, timeout=30.0):
+        """Constructor
+
+        :param path: the SQLite database shared by the nodes
+        :param timeout: seconds to wait for another node to finish writing to the database
+        """
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.path = path
+        self._lock = threading.Lock()
+        # transactions are begun explicitly, so that leasing a unit locks the database right away
+        self._connection = sqlite3.connect(path, timeout=timeout, isolation_level=None, check_same_thread=False)
+        with self._transaction() as connection:
+            connection.execute('CREATE TABLE IF NOT EXISTS crawls (crawl TEXT PRIMARY KEY, units INTEGER)')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS units (crawl TEXT, unit INTEGER, state TEXT, owner TEXT, '
+                'expires REAL, attempts INTEGER, PRIMARY KEY (crawl, unit))')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS results (crawl TEXT, key TEXT, unit INTEGER, value BLOB, '
+                'PRIMARY KEY (crawl, key))')
+
+    @contextlib.contextmanager
+    def _transaction(self):
+        """ Runs statements within a transaction holding the write lock of the database. """
+
+        with self._lock:
+            connection = self._connection
+            connection.execute('BEGIN IMMEDIATE')
+            try:
+                yield connection
+            except BaseException:
+                connection.execute('ROLLBACK')
+                raise
+            connection.execute('COMMIT')
+
+    def create(self, crawl, units):
+        """Divides a crawl into units of work, unless another node already has.
+
+        :param crawl: the name of the crawl
+        :param units: how many units to divide the crawl into
+        :return: how many units the crawl is divided into, which is what the first node asked for
+        :raises ValueError: if the number of units is not positive
+        """
+
+        if units < 1:
+            raise ValueError('a crawl needs at least one unit of work')
+
+        with self._transaction() as connection:
+            if connection.execute('INSERT OR IGNORE INTO crawls VALUES (?, ?)', (crawl, units)).rowcount:
+                connection.executemany("INSERT INTO units VALUES (?, ?, 'pending', NULL, NULL, 0)",
+                                       ((crawl, unit) for unit in range(units)))
+            return connection.execute('SELECT units FROM crawls WHERE crawl = ?', (crawl,)).fetchone()[0]
+
+    def lease(self, crawl, owner, duration, max_attempts=None):
+        """Leases a unit of work that is pending or whose lease has run out.
+
+        Units leased `max_attempts` times without being committed are given up on
+        instead, so a unit that keeps failing does not hold up the crawl forever.
+
+        :param crawl: the name of the crawl
+        :param owner: identifies the node, such as its host name and process id
+        :param duration: seconds until the lease runs out unless renewed by a heartbeat
+        :param max_attempts: how often a unit may be leased, defaults to no limit
+        :return: the unit, or None if every unit is committed, given up on or leased to a live node
+        """
+
+        now = time.time()
+        with self._transaction() as connection:
+            while True:
+                row = connection.execute(
+                    "SELECT unit, attempts FROM units WHERE crawl = ? AND (state = 'pending' "
+                    "OR (state = 'leased' AND expires < ?)) ORDER BY attempts, unit LIMIT 1", (crawl, now)).fetchone()
+                if row is None:
+                    return None
+
+                unit, attempts = row
+                if max_attempts is not None and attempts >= max_attempts:
+                    connection.execute("UPDATE units SET state = 'failed', owner = NULL WHERE crawl = ? AND unit = ?",
+                                       (crawl, unit))
+                    continue
+
+                connection.execute(
+                    "UPDATE units SET state = 'leased', owner = ?, expires = ?, attempts = attempts + 1 "
+                    "WHERE crawl = ? AND unit = ?", (owner, now + duration, crawl, unit))
+                return unit
+
+    def heartbeat(self, crawl, unit, owner, duration):
+        """Renews the lease of a unit.
+
+        :param crawl: the name of the crawl
+        :param unit: the leased unit
+        :param owner: identifies the node holding the lease
+        :param duration: seconds from now until the lease runs out
+        :return: False if the lease was lost to another node, whose results take precedence then
+        """
+
+        with self._transaction() as connection:
+            return bool(connection.execute(
+                "UPDATE units SET expires = ? WHERE crawl = ? AND unit = ? AND state = 'leased' AND owner = ?",
+                (time.time() + duration, crawl, unit, owner)).rowcount)
+
+    def release(self, crawl, unit, owner):
+        """Hands a unit back without committing it, so that it is leased again right away.
+
+        :param crawl: the name of the crawl
+        :param unit: the leased unit
+        :param owner: identifies the node holding the lease
+        """
+
+        with self._transaction() as connection:
+            connection.execute(
+                "UPDATE units SET state = 'pending', owner = NULL, expires = NULL "
+                "WHERE crawl = ? AND unit = ? AND state = 'leased' AND owner = ?", (crawl, unit, owner))
+
+    def commit(self, crawl, unit, owner, results):
+        """Stores the results of a unit and marks it as done.
+
+        The results are stored by key, replacing any stored under the same key before.
+        Nothing is stored unless the node still holds the lease of the unit.
+
+        :param crawl: the name of the crawl
+        :param unit: the leased unit
+        :param owner: identifies the node holding the lease
+        :param results: an iterable of (key, picklable result) pairs
+        :return: False if the lease was lost to another node and nothing was stored
+        """
+
+        rows = [(crawl, str(key), unit, pickle.dumps(value)) for key, value in results]
+        with self._transaction() as connection:
+            if not connection.execute(
+                    "UPDATE units SET state = 'done', expires = NULL "
+                    "WHERE crawl = ? AND unit = ? AND state = 'leased' AND owner = ?", (crawl, unit, owner)).rowcount:
+                return False
+            connection.executemany('INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?)', rows)
+            return True
+
+    def progress(self, crawl):
+        """Counts the units of a crawl by state.
+
+        :param crawl: the name of the crawl
+        :return: dictionary mapping "pending", "leased", "done" and "failed" to how many units are in that state
+        """
+
+        progress = dict.fromkeys(('pending', 'leased', 'done', 'failed'), 0)
+        with self._transaction() as connection:
+            for state, count in connection.execute(
+                    'SELECT state, COUNT(*) FROM units WHERE crawl = ? GROUP BY state', (crawl,)):
+                progress[state] = count
+        return progress
+
+    def is_finished(self, crawl):
+        """ Returns whether every unit of a crawl has been committed or given up on. """
+
+        progress = self.progress(crawl)
+        return not progress['pending'] and not progress['leased']
+
+    def results(self, crawl):
+        """Returns the committed results of a crawl.
+
+        The results are unpickled, so the database has to be trusted, see `WorkLedger`.
+
+        :param crawl: the name of the crawl
+        :return: a list of the results, ordered by key
+        """
+
+        with self._transaction() as connection:
+            rows = connection.execute('SELECT value FROM results WHERE crawl = ? ORDER BY key', (crawl,)).fetchall()
+        return [pickle.loads(value) for value, in rows]
+
+    def clear(self, crawl):
+        """Forgets a crawl along with its results, so that it starts over.
+
+        :param crawl: the name of the crawl
+        """
+
+        with self._transaction() as connection:
+            for table in ('crawls', 'units', 'results'):
+                connection.execute(f'DELETE FROM {table} WHERE crawl = ?', (crawl,))
+
+    def close(self):
+        """ Closes the database connection. """
+
+        self._connection.close()
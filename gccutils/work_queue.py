@@ -0,0 +1,196 @@
+import threading
+import asyncio
+
+
+__all__ = ('WorkQueue', 'AioWorkQueue')
+
+
+class WorkQueue:
+    """A thread-safe queue of work units shared by a team of scraper sessions.
+
+    Sessions take units whenever they are idle, so the work is divided by how fast
+    each session gets through it rather than up front. Units may be added while the
+    team is running, typically by the session that discovered them, and every unit
+    is only handed out once no matter how often it is added, unless it is retried.
+
+    The queue is exhausted once no units are pending and none are in progress, as a
+    unit in progress may still add more.
+    """
+
+    def __init__(self):
+        """ Constructor """
+
+        self._pending = []
+        self._seen = set()
+        self._retries = {}  # unit -> how often it has been retried
+        self._in_progress = 0
+        self._closed = False
+        self._condition = threading.Condition()
+
+    def __len__(self):
+        """ Returns how many units are waiting to be handed out. """
+
+        return len(self._pending)
+
+    def _add(self, units):
+        """ Adds the units that have not been seen before, returning whether any were. """
+
+        added = False
+        for unit in units:
+            if unit not in self._seen:
+                self._seen.add(unit)
+                self._pending.append(unit)
+                added = True
+        return added
+
+    def _requeue(self, unit, retries):
+        """ Adds a unit again unless it has been retried `retries` times, returning whether it was. """
+
+        count = self._retries.get(unit, 0)
+        if count >= retries:
+            return False
+        self._retries[unit] = count + 1
+        self._pending.append(unit)
+        return True
+
+    def _take(self, prefer):
+        """ Removes the preferred pending unit, the oldest one if there is no preference. """
+
+        index = 0
+        if prefer is not None:
+            index = min(range(len(self._pending)), key=lambda i: prefer(self._pending[i]))
+        self._in_progress += 1
+        return self._pending.pop(index)
+
+    def _exhausted(self):
+        """ Returns whether no unit will ever be handed out again. """
+
+        return self._closed or (not self._pending and not self._in_progress)
+
+    def put(self, *units):
+        """Adds units of work, ignoring any that have been added before.
+
+        :param units: the hashable units of work to add
+        """
+
+        with self._condition:
+            if self._add(units):
+                self._condition.notify_all()
+
+    def retry(self, unit, retries):
+        """Hands out a unit taken with `get` again, such as one that could not be reached.
+
+        Has to be called before the unit is handed back with `done`.
+
+        :param unit: the unit of work to retry
+        :param retries: how often the unit may be retried altogether
+        :return: True if the unit will be handed out again, False if it has been retried too often
+        """
+
+        with self._condition:
+            if not self._requeue(unit, retries):
+                return False
+            self._condition.notify_all()
+            return True
+
+    def get(self, prefer=None):
+        """Takes a unit of work, waiting while other sessions may still add more.
+
+        Every unit taken has to be handed back with `done` once it has been worked on.
+
+        :param prefer: optional key function, the pending unit with the lowest key is taken
+        :return: the unit of work, or None if there is no work left
+        """
+
+        with self._condition:
+            while not self._pending and not self._exhausted():
+                self._condition.wait()
+            if self._exhausted():
+                return None
+            return self._take(prefer)
+
+    def done(self, unit):
+        """Marks a unit taken with `get` as finished.
+
+        :param unit: the finished unit of work
+        """
+
+        with self._condition:
+            self._in_progress -= 1
+            self._condition.notify_all()
+
+    def close(self):
+        """ Stops handing out work, waking every waiting session. """
+
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+
+class AioWorkQueue(WorkQueue):
+    """The asyncio counterpart of `WorkQueue` for sessions sharing an event loop.
+
+    `get` is a coroutine, every other method is the same as for `WorkQueue`.
+    """
+
+    def __init__(self):
+        """ Constructor """
+
+        super().__init__()
+        self._wakeup = None  # created lazily as it has to belong to the running loop
+
+    def _notify(self):
+        """ Wakes every coroutine waiting for work. """
+
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def put(self, *units):
+        """Adds units of work, ignoring any that have been added before.
+
+        :param units: the hashable units of work to add
+        """
+
+        if self._add(units):
+            self._notify()
+
+    def retry(self, unit, retries):
+        """Hands out a unit taken with `get` again, such as one that could not be reached.
+
+        See `WorkQueue.retry` for a description of the parameters.
+        """
+
+        if not self._requeue(unit, retries):
+            return False
+        self._notify()
+        return True
+
+    async def get(self, prefer=None):
+        """Takes a unit of work, waiting while other sessions may still add more.
+
+        See `WorkQueue.get` for a description of the parameters.
+        """
+
+        while not self._pending and not self._exhausted():
+            if self._wakeup is None:
+                self._wakeup = asyncio.Event()
+            self._wakeup.clear()
+            await self._wakeup.wait()
+        if self._exhausted():
+            return None
+        return self._take(prefer)
+
+    def done(self, unit):
+        """Marks a unit taken with `get` as finished.
+
+        :param unit: the finished unit of work
+        """
+
+        self._in_progress -= 1
+        self._notify()
+
+    def close(self):
+        """ Stops handing out work, waking every waiting session. """
+
+        self._closed = True
+        self._notify()
@@ -0,0 +1,54 @@
+import pytest
+
+from gccutils.fake_portal import FakePortal, serve
+from gccutils.scraper_utils import ScraperUtils
+
+
+@pytest.fixture
+def portal_factory():
+    """ Serves `FakePortal`'s on localhost, pointing the scrapers at the newest one. """
+
+    base_url = ScraperUtils.BASE_URL
+    servers = []
+
+    def _serve(**kwargs):
+        portal = FakePortal(**kwargs)
+        server = serve(portal)
+        servers.append(server)
+        ScraperUtils.BASE_URL = server.url
+        return portal
+
+    yield _serve
+
+    ScraperUtils.BASE_URL = base_url
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture
+def portal(portal_factory):
+    """ A small fault-free `FakePortal`. """
+
+    return portal_factory(terms=2, courses=30, advisees=30, page_size=10, roster_page_size=10)
+
+
+def course_keys(courses):
+    """ Returns the comparable fields of scraped `Course`'s. """
+
+    return sorted((course.term, course.code, course.section, course.name, course.hours,
+                   tuple(tuple(group) for group in course.requisites)) for course in courses)
+
+
+def catalog_keys(portal, keep=None):
+    """Returns the fields the course scrapers are expected to scrape from a `FakePortal`.
+
+    :param keep: an optional callable taking a term and a section, telling which sections to expect
+    """
+
+    terms = dict(portal.terms)
+    return sorted((terms[term], f'{section.department} {section.number}', section.section, section.title,
+                   section.credits, tuple(tuple((kind.lower(), code) for kind, code in group)
+                                          for group in section.requisites))
+                  for term, sections in portal.catalog.items() for section in sections
+                  if keep is None or keep(term, section))
@@ -0,0 +1,80 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from gccutils import errors
+from gccutils.concurrency import AioConcurrencyController, ConcurrencyController
+
+
+def test_cancelled_acquire_frees_its_slot():
+    async def _run():
+        controller = AioConcurrencyController(initial=1, minimum=1, maximum=1, max_rps=1)
+        await controller.acquire()
+        controller.release(0.01)
+
+        # the next request has to wait a second for its turn, and is cancelled meanwhile
+        waiting = asyncio.ensure_future(controller.acquire())
+        await asyncio.sleep(0.05)
+        waiting.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiting
+        assert controller.in_flight == 0
+
+    asyncio.run(_run())
+
+
+def _blocked_controller():
+    controller = ConcurrencyController(initial=1, minimum=1, maximum=1)
+    controller.acquire()  # the only slot is taken by a request that never completes
+    return controller
+
+
+def test_acquire_gives_up_at_the_deadline():
+    controller = _blocked_controller()
+    start = time.monotonic()
+    with pytest.raises(errors.DeadlineExceededError):
+        controller.acquire(timeout=0.1)
+    assert time.monotonic() - start < 1
+    assert controller.in_flight == 1
+
+
+def test_acquire_gives_up_once_stopped():
+    controller = _blocked_controller()
+    stopped = threading.Event()
+    raised = []
+
+    def _wait():
+        try:
+            controller.acquire(aborted=stopped.is_set)
+        except errors.AbortedError as e:
+            raised.append(e)
+
+    waiter = threading.Thread(target=_wait)
+    waiter.start()
+    time.sleep(0.05)
+    stopped.set()
+    controller.wake()
+    waiter.join(1)
+    assert not waiter.is_alive() and raised
+
+
+def test_pacing_gives_up_at_the_deadline():
+    controller = ConcurrencyController(initial=2, minimum=1, maximum=2, max_rps=1)
+    controller.acquire()
+    # the next request would have to wait a second for its turn
+    with pytest.raises(errors.DeadlineExceededError):
+        controller.acquire(timeout=0.1)
+    assert controller.in_flight == 1
+
+
+def test_aio_acquire_gives_up_at_the_deadline():
+    async def _run():
+        controller = AioConcurrencyController(initial=1, minimum=1, maximum=1)
+        await controller.acquire()
+        with pytest.raises(errors.DeadlineExceededError):
+            await controller.acquire(timeout=0.1)
+        assert controller.in_flight == 1
+
+    asyncio.run(_run())
@@ -0,0 +1,73 @@
+import os
+
+import pytest
+import requests
+
+from gccutils.form_state import extract_element_state, extract_form_state
+from gccutils.parsers import parse_html
+from gccutils.partial_postback import DeltaEntry
+from gccutils.scraper_utils import ScraperUtils
+
+
+PAGES = os.path.join(os.path.dirname(__file__), 'pages')
+
+
+def _read_page(name):
+    with open(os.path.join(PAGES, name), encoding='utf-8') as file:
+        return file.read()
+
+
+@pytest.mark.parametrize('name', sorted(os.listdir(PAGES)))
+def test_extract_form_state_matches_tree_walk(name):
+    text = _read_page(name)
+    action, payload = ScraperUtils.prepare_payload_from_html(parse_html(text))
+    form_state = extract_form_state(text)
+
+    assert form_state.action == action
+    # compared field by field first for a readable failure, then in order as that is how they are posted
+    for field, value in payload.items():
+        assert form_state.fields.get(field) == value, field
+    assert list(form_state.fields.items()) == list(payload.items())
+
+
+PANEL_PAGE = '''<html><body><form name="MAINFORM" method="post" action="/ICS/Advising/">
+<input type="hidden" name="__VIEWSTATE" value="before" />
+<div id="pg0_V_upFilters"><div>
+<input type="text" name="pg0$V$txtName" value="Smith" />
+<select name="pg0$V$ddlYear"><option value="2024">2024</option></select>
+<input type="submit" name="pg0$V$btnFilter" value="Filter" />
+<a id="lnkClear" href="javascript:__doPostBack('pg0$V$lnkClear','')">Clear</a>
+</div></div>
+<input type="text" name="pg0$V$txtOutside" value="kept" />
+</form></body></html>'''
+
+
+def test_extract_element_state_reads_only_the_element():
+    panel = extract_element_state(PANEL_PAGE, 'pg0_V_upFilters')
+    assert panel.fields == {'pg0$V$ddlYear': '2024', 'pg0$V$txtName': 'Smith'}
+    assert panel.submits == {'pg0$V$btnFilter': 'Filter'}
+    assert [postback.text for postback in panel.postbacks] == ['Clear']
+    assert extract_element_state(PANEL_PAGE, 'missing').fields == {}
+
+
+def test_rerendered_panel_drops_removed_fields():
+    response = requests.Response()
+    response._content = PANEL_PAGE.encode('utf-8')
+    response.encoding = 'utf-8'
+    dc = ScraperUtils()
+    dc._load_page(response)
+    dc.form_state  # built before the deltas, which are applied to it as they arrive
+
+    # the panel is re-rendered twice, without the name filter and then without the year
+    dc._apply_delta([DeltaEntry('updatePanel', 'pg0_V_upFilters',
+                                '<select name="pg0$V$ddlYear"><option value="2025">2025</option></select>'),
+                     DeltaEntry('hiddenField', '__VIEWSTATE', 'after')])
+    dc._apply_delta([DeltaEntry('updatePanel', 'pg0_V_upFilters', '<input type="text" name="pg0$V$txtYear" />')])
+
+    expected = {'__VIEWSTATE': 'after', 'pg0$V$txtOutside': 'kept', 'pg0$V$txtYear': ''}
+    assert dc.form_state.fields == expected and not dc.form_state.submits and not dc.form_state.postbacks
+    # rebuilt from the page and every delta, as when the state is first needed after they arrived
+    dc.refresh_html()
+    assert dc.form_state.fields == expected
+    # the structure holds the same controls, only the hidden fields are not written into it
+    assert dc.prepare_payload_from_html(dc.html)[1].keys() == expected.keys()
@@ -0,0 +1,35 @@
+import pickle
+
+from gccutils.instrumentation import RequestEvent, RequestStats
+
+
+def _event(total, page_type='results'):
+    event = RequestEvent('POST', '/ICS/', page_type)
+    event.total = total
+    event.bytes = 100
+    return event
+
+
+def test_percentiles_are_exact_below_the_sample_size():
+    stats = RequestStats()
+    for i in range(1, 101):
+        stats.record(i % 2, _event(i / 100))
+
+    row = stats.summary()['results']
+    assert (row['count'], row['bytes']) == (100, 10000)
+    assert (row['p50'], row['p95'], row['p99']) == (0.5, 0.95, 0.99)
+
+
+def test_samples_stay_bounded_across_processes():
+    worker = RequestStats(sample_size=64)
+    for i in range(10000):
+        worker.record(0, _event(i / 10000))
+    # the worker sends its stats back pickled, which must not carry every request
+    received = pickle.loads(pickle.dumps(worker))
+    assert all(len(reservoir.values) <= 64 for reservoir in received._samples[(0, 'results')].timings.values())
+
+    stats = RequestStats(sample_size=64)
+    stats.merge(received, prefix=3)
+    row = stats.summary(session=(3, 0))['results']
+    assert row['count'] == 10000
+    assert 0.3 < row['p50'] < 0.7
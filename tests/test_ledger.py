@@ -0,0 +1,53 @@
+import time
+
+from gccutils.asyncscrapers.ledgerscraper import LedgerCourseScraper
+from gccutils.parse_pool import process_context
+from gccutils.scraper_utils import ScraperUtils
+from gccutils.work_ledger import WorkLedger
+
+from conftest import catalog_keys, course_keys
+
+
+def _take_part(path, base_url, reports):
+    """ Runs a node of the crawl in a process of its own, as on another machine. """
+
+    ScraperUtils.BASE_URL = base_url
+    scraper = LedgerCourseScraper('student', 'password', WorkLedger(path), units=4, lease=10.0, team_size=1)
+    scraper.POLL_INTERVAL = 0.2
+    scraper.run(deadline=60)
+    reports.put((scraper.committed, scraper.failed))
+
+
+def test_processes_share_a_crawl(portal_factory, tmp_path):
+    portal = portal_factory(terms=4, courses=15, page_size=10)
+    path = str(tmp_path / 'ledger.db')
+    WorkLedger(path).close()  # created up front, so that the nodes do not race to create the tables
+
+    context = process_context()
+    reports = context.Queue()
+    nodes = [context.Process(target=_take_part, args=(path, ScraperUtils.BASE_URL, reports)) for _ in range(3)]
+    for node in nodes:
+        node.start()
+    outcomes = [reports.get(timeout=120) for _ in nodes]
+    for node in nodes:
+        node.join()
+
+    # every unit is committed by exactly one of the nodes
+    assert sum(committed for committed, _ in outcomes) == 4
+    assert not any(failed for _, failed in outcomes)
+    ledger = WorkLedger(path)
+    assert ledger.progress('courses') == {'pending': 0, 'leased': 0, 'done': 4, 'failed': 0}
+    assert course_keys(ledger.results('courses')) == catalog_keys(portal)
+
+
+def test_units_given_up_on_are_reported(portal, tmp_path):
+    ledger = WorkLedger(str(tmp_path / 'ledger.db'))
+    ledger.create('courses', 2)
+    ledger.lease('courses', 'a node that died', 0.01)
+    time.sleep(0.05)
+
+    scraper = LedgerCourseScraper('student', 'password', ledger, units=2, max_attempts=1, team_size=1)
+    assert scraper.run()  # finished, but without the unit of the node that died
+    assert scraper.failed and scraper.committed == 1
+    assert ledger.progress('courses')['failed'] == 1
+    assert 0 < len(scraper.start_and_wait()) < len(catalog_keys(portal))
@@ -0,0 +1,21 @@
+import requests
+
+from gccutils.parse_pool import extract_page_state
+
+
+PAGE = '<form name="MAINFORM" action="/ICS/"><input type="hidden" name="name" value="José Müller" /></form>'
+
+
+def _response(content, encoding):
+    response = requests.Response()
+    response._content = content
+    response.encoding = encoding
+    return response
+
+
+def test_pages_are_decoded_like_in_the_threads():
+    for content in (PAGE.encode('utf-8'), PAGE.encode('iso-8859-1')):
+        # as sent without any content type, and as text/html without a charset
+        for encoding in (None, 'ISO-8859-1'):
+            expected = _response(content, encoding).text
+            assert extract_page_state(content, encoding).fields['name'] in expected
@@ -0,0 +1,35 @@
+import socket
+import threading
+
+import pytest
+import requests
+
+from gccutils.scraper_utils import ScraperUtils
+
+
+def _failed_request(url):
+    with pytest.raises(requests.RequestException) as info:
+        requests.post(url, timeout=5)
+    return info.value
+
+
+def test_refused_connection_was_not_sent():
+    with socket.socket() as closed:
+        closed.bind(('127.0.0.1', 0))
+        port = closed.getsockname()[1]
+    assert not ScraperUtils._was_connected(_failed_request(f'http://127.0.0.1:{port}/'))
+
+
+def test_dropped_connection_may_have_been_sent():
+    with socket.socket() as server:
+        server.bind(('127.0.0.1', 0))
+        server.listen()
+
+        def _drop():
+            connection, _ = server.accept()
+            connection.recv(4096)
+            connection.close()
+
+        threading.Thread(target=_drop, daemon=True).start()
+        error = _failed_request(f'http://127.0.0.1:{server.getsockname()[1]}/')
+    assert isinstance(error, requests.ConnectionError) and ScraperUtils._was_connected(error)
@@ -0,0 +1,389 @@
+import asyncio
+import time
+
+import pytest
+
+from gccutils import errors
+from gccutils.asyncscrapers.adviseescraper import AsyncAdviseeScraper
+from gccutils.asyncscrapers.coursescraper import (AsyncCourseScraper, AsyncCourseScraperSession, CoursePage,
+                                                  CourseQuery, LIST_FIELDS)
+from gccutils.asyncscrapers.processscraper import ProcessAdviseeScraper, ProcessCourseScraper
+from gccutils.checkpoint import CrawlCheckpoint
+from gccutils.course_cache import CourseCache, RequisiteCache
+from gccutils.metrics import ScraperMetrics
+
+from conftest import catalog_keys, course_keys
+
+
+def test_course_crawl(portal):
+    courses = AsyncCourseScraper('student', 'password', None, team_size=3).start_and_wait()
+    assert course_keys(courses) == catalog_keys(portal)
+
+
+def test_advisee_crawl(portal):
+    advisees = AsyncAdviseeScraper('student', 'password', None, team_size=2).start_and_wait()
+    assert sorted(advisee['user_id'] for advisee in advisees) == sorted(advisee.user_id for advisee in portal.roster)
+
+
+def test_aio_crawls(portal):
+    pytest.importorskip('httpx')
+    from gccutils.aioscrapers.adviseescraper import AioAdviseeScraper
+    from gccutils.aioscrapers.coursescraper import AioCourseScraper
+
+    scraper = AioCourseScraper('student', 'password', num_sessions=3)
+    courses = asyncio.run(scraper.start_and_wait())
+    assert course_keys(courses) == catalog_keys(portal) and not scraper.failed
+    scraper = AioAdviseeScraper('student', 'password')
+    advisees = asyncio.run(scraper.start_and_wait())
+    assert len(advisees) == len(portal.roster) and not scraper.failed
+
+    # like the threads, a run left unfinished counts as failed
+    scraper = AioCourseScraper('student', 'password', num_sessions=3)
+
+    async def _first():
+        results = scraper.results()
+        await results.__anext__()
+        await results.aclose()
+
+    asyncio.run(_first())
+    assert scraper.failed
+
+
+def test_process_crawls(portal):
+    # there are only as many workers as terms, each with a small team
+    scraper = ProcessCourseScraper('student', 'password', processes=8)
+    assert course_keys(scraper.start_and_wait()) == catalog_keys(portal)
+    assert scraper.shard_count == len(portal.terms) and scraper.team_size == ProcessCourseScraper.TEAM_SIZE
+    assert not scraper.failed
+    assert len(scraper.pool) == 1  # the session counting the terms was returned to the pool
+
+    scraper = ProcessAdviseeScraper('student', 'password', processes=2)
+    assert len(scraper.start_and_wait()) == len(portal.roster) and not scraper.failed
+
+
+def test_cancelled_aresults_stops_the_team(portal_factory):
+    portal_factory(courses=30, latency=0.05)
+    scraper = AsyncCourseScraper('student', 'password', None, team_size=2)
+
+    async def _consume():
+        async for _ in scraper.aresults():
+            pass
+
+    async def _run():
+        consumer = asyncio.ensure_future(_consume())
+        await asyncio.sleep(1)
+        consumer.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await consumer
+
+    asyncio.run(_run())
+    assert not scraper.is_running()
+
+
+def test_active_sessions_are_only_counted_while_running(portal):
+    metrics = ScraperMetrics()
+    scraper = AsyncCourseScraper('student', 'password', None, metrics=metrics, team_size=2)
+    assert metrics.active_sessions.value() == 0  # the team of the constructor has not started
+
+    observed = []
+    for _ in scraper.results():
+        observed.append(metrics.active_sessions.value())
+    assert set(observed) == {2}
+    assert metrics.active_sessions.value() == 0
+
+    # the sessions returned to the pool no longer report to the metrics
+    assert all(dc.metrics is None for dc, _ in scraper.pool._idle)
+
+    scraper.start()
+    while scraper.is_running():
+        time.sleep(0.01)
+    assert metrics.active_sessions.value() == 0
+
+
+
+def test_aio_active_sessions_are_only_counted_while_running(portal, monkeypatch):
+    pytest.importorskip('httpx')
+    from gccutils.aioscrapers.coursescraper import AioCourseScraper
+    from gccutils.aioscrapers.scrapersession import AioScraperSession
+
+    metrics = ScraperMetrics()
+    logging_in = []
+    login = AioScraperSession.login
+
+    async def _login(session):
+        logging_in.append(metrics.active_sessions.value())
+        await login(session)
+
+    monkeypatch.setattr(AioScraperSession, 'login', _login)
+
+    async def _observe(scraper):
+        return [metrics.active_sessions.value() async for _ in scraper.results()]
+
+    assert set(asyncio.run(_observe(AioCourseScraper('student', 'password', metrics=metrics, num_sessions=2)))) == {2}
+    assert logging_in == [0, 0]  # like the threads, the sessions are counted once logged in
+    assert metrics.active_sessions.value() == 0
+
+    # a team that never logged in was never active
+    with pytest.raises(errors.LoginError):
+        asyncio.run(_observe(AioCourseScraper('student', 'wrong', metrics=metrics, num_sessions=2)))
+    assert metrics.active_sessions.value() == 0
+
+def test_course_cache_skips_unchanged_rows(portal, tmp_path, monkeypatch):
+    path = str(tmp_path / 'courses.json')
+    cache = CourseCache(path)
+    saves = []
+    save = cache.save
+    monkeypatch.setattr(cache, 'save', lambda: saves.append(save()))
+    first = AsyncCourseScraper('student', 'password', None, course_cache=cache, team_size=2).start_and_wait()
+    assert cache.hits == 0
+    assert len(saves) == 1  # by the manager, not by every session of the team
+
+    requests = portal.requests
+    cache = CourseCache(path)
+    second = AsyncCourseScraper('student', 'password', None, course_cache=cache, team_size=2).start_and_wait()
+    assert cache.hits == len(first) and cache.misses == 0
+    assert course_keys(second) == course_keys(first)
+    # only the results pages are loaded, none of the detail pages
+    assert portal.requests - requests < len(first)
+
+
+def test_checkpoint_restart(portal, tmp_path):
+    checkpoint = CrawlCheckpoint(str(tmp_path / 'checkpoint.db'))
+    first = []
+
+    def interrupt(course):
+        first.append(course)
+        if len(first) == 12:
+            scraper.stop()
+
+    scraper = AsyncCourseScraper('student', 'password', interrupt, checkpoint=checkpoint, team_size=2)
+    scraper.start()
+    while scraper.is_running():
+        time.sleep(0.01)
+
+    rest = AsyncCourseScraper('student', 'password', None, checkpoint=checkpoint, team_size=2).start_and_wait()
+    assert 12 <= len(first) < len(catalog_keys(portal))
+    assert course_keys(first + rest) == catalog_keys(portal)
+
+    # the finished crawl lets the next one start over
+    term = next(iter(portal.catalog))
+    assert checkpoint.page(AsyncCourseScraperSession.CHECKPOINT_NAME, CoursePage(term, 1)) is None
+
+
+def test_checkpoint_keeps_failed_rows(portal, tmp_path):
+    checkpoint = CrawlCheckpoint(str(tmp_path / 'checkpoint.db'))
+    first, failed = [], []
+
+    def fail_once(course):
+        if len(first) == 5 and not failed:
+            failed.append(course)
+            raise ValueError('the callback failed')
+        first.append(course)
+
+    scraper = AsyncCourseScraper('student', 'password', fail_once, checkpoint=checkpoint, team_size=2)
+    scraper.start()
+    while scraper.is_running():
+        time.sleep(0.01)
+    assert scraper.failed and len(first) == len(catalog_keys(portal)) - 1
+
+    # only the failed row is left to the next crawl, which clears the checkpoint when started as well
+    rest = []
+    scraper = AsyncCourseScraper('student', 'password', rest.append, checkpoint=checkpoint, team_size=2)
+    scraper.start()
+    while scraper.is_running():
+        time.sleep(0.01)
+    assert not scraper.failed and course_keys(rest) == course_keys(failed)
+    term = next(iter(portal.catalog))
+    assert checkpoint.page(AsyncCourseScraperSession.CHECKPOINT_NAME, CoursePage(term, 1)) is None
+
+
+def test_course_crawl_with_expiring_logins(portal_factory):
+    # a single session searches one term after another, replaying the searches as its logins expire
+    portal = portal_factory(terms=3, courses=30, page_size=10, session_lifetime=25)
+    scraper = AsyncCourseScraper('student', 'password', None, team_size=1)
+    assert course_keys(scraper.start_and_wait()) == catalog_keys(portal)
+    assert not scraper.failed
+
+
+
+def test_aio_course_crawl_with_expiring_logins(portal_factory):
+    pytest.importorskip('httpx')
+    from gccutils.aioscrapers.coursescraper import AioCourseScraper
+
+    # the asyncio sessions recover through the same steps as the threads
+    portal = portal_factory(terms=3, courses=30, page_size=10, session_lifetime=25, error_rate=0.05)
+    courses = asyncio.run(AioCourseScraper('student', 'password', num_sessions=1).start_and_wait())
+    assert course_keys(courses) == catalog_keys(portal)
+
+def test_advisee_crawl_with_expiring_logins(portal_factory):
+    portal = portal_factory(advisees=30, roster_page_size=10, session_lifetime=25)
+    scraper = AsyncAdviseeScraper('student', 'password', None, team_size=2)
+    assert len(scraper.start_and_wait()) == len(portal.roster)
+    assert not scraper.failed
+
+
+def test_unreachable_page_is_retried(portal, monkeypatch):
+    nav_to_page = AsyncCourseScraperSession.nav_to_page
+    failures = []
+
+    def flaky_nav_to_page(self, course_page):
+        if course_page.page == 2 and course_page not in failures:
+            failures.append(course_page)
+            raise errors.MissingElementError(f'page {course_page.page} of term {course_page.term} not found')
+        return (yield from nav_to_page(self, course_page))
+
+    monkeypatch.setattr(AsyncCourseScraperSession, 'nav_to_page', flaky_nav_to_page)
+    scraper = AsyncCourseScraper('student', 'password', None, team_size=2)
+    assert course_keys(scraper.start_and_wait()) == catalog_keys(portal)
+    assert len(failures) == len(portal.catalog) and not scraper.failed
+
+
+def test_course_crawl_with_redirects(portal_factory):
+    portal = portal_factory(terms=2, courses=40, page_size=10, error_rate=0.05)
+    scraper = AsyncCourseScraper('student', 'password', None, team_size=2)
+    courses = course_keys(scraper.start_and_wait())
+    expected = catalog_keys(portal)
+
+    # a row may still fail once its retries are used up, but the crawl reports it
+    assert len(set(courses)) == len(courses) and set(courses) <= set(expected)
+    assert scraper.failed or courses == expected
+    assert len(courses) >= 0.9 * len(expected)
+
+
+def test_course_crawl_with_larger_pages(portal_factory, monkeypatch):
+    portal = portal_factory(terms=2, courses=120, page_size=10, page_sizes=(10, 25, 50))
+    # the catalog of the stand-in gives a course other requisites in every term
+    scraper = AsyncCourseScraper('student', 'password', None, requisite_cache=RequisiteCache(per_term=True),
+                                 team_size=2)
+    assert course_keys(scraper.start_and_wait()) == catalog_keys(portal)
+    assert scraper.stats.page_size == 50 and scraper.stats.default_page_size == 10
+    assert scraper.stats.pages == 6 and scraper.stats.pages_saved == 18
+
+    # a server rejecting the largest size is searched with the default one instead
+    search = portal._post_search
+
+    def _reject(session, data, target):
+        if data.get('pg0$V$ddlPageSize') == '50':
+            return '500 Internal Server Error', '<html><body><h1>Server Error</h1></body></html>'
+        return search(session, data, target)
+
+    monkeypatch.setattr(portal, '_post_search', _reject)
+    scraper = AsyncCourseScraper('student', 'password', None, requisite_cache=RequisiteCache(per_term=True),
+                                 team_size=2)
+    assert course_keys(scraper.start_and_wait()) == catalog_keys(portal)
+    assert scraper.stats.page_size_rejected and scraper.stats.page_size is None
+    assert scraper.stats.pages_saved == 0
+
+
+def test_course_query(portal, monkeypatch):
+    term = portal.terms[0][0]
+    department = portal.catalog[term][0].department
+
+    def _matches(course_term, course):
+        return course_term == term and course.department == department and course.seats > 0
+
+    expected = [course for course in portal.catalog[term] if _matches(term, course)]
+    assert expected
+
+    opened = []
+    detail_page = portal._course
+
+    def _record(session):
+        opened.append(session.course)
+        return detail_page(session)
+
+    monkeypatch.setattr(portal, '_course', _record)
+    query = CourseQuery(terms=CourseQuery.CURRENT, department=department, open_only=True)
+    courses = AsyncCourseScraper('student', 'password', None, query=query, team_size=2).start_and_wait()
+    assert course_keys(courses) == catalog_keys(portal, _matches)
+    assert sorted(opened) == sorted(expected)
+
+    # a server ignoring the filters lists every course, the rows filtered out are still never opened
+    search = portal._post_search
+
+    def _ignore_filters(session, data, target):
+        data = {name: value for name, value in data.items() if name not in ('pg0$V$ddlDept', 'pg0$V$chkOpenOnly')}
+        return search(session, data, target)
+
+    monkeypatch.setattr(portal, '_post_search', _ignore_filters)
+    opened.clear()
+    courses = AsyncCourseScraper('student', 'password', None, query=query, team_size=2).start_and_wait()
+    assert course_keys(courses) == catalog_keys(portal, _matches)
+    assert sorted(opened) == sorted(expected)
+
+
+def test_list_only_crawl_matches_a_full_crawl(portal):
+    requests = portal.requests
+    full = AsyncCourseScraper('student', 'password', None, team_size=2).start_and_wait()
+    full_requests, requests = portal.requests - requests, portal.requests
+
+    listed = AsyncCourseScraper('student', 'password', None, fields=LIST_FIELDS, team_size=2).start_and_wait()
+    list_requests = portal.requests - requests
+
+    def _fields(course):
+        return course.term, course.code, course.section, course.name, course.hours
+
+    assert sorted(map(_fields, listed)) == sorted(map(_fields, full))
+    assert all(course.requisites is None for course in listed)
+    # only the search and its results pages are loaded, not the detail pages of every course
+    assert list_requests * 5 < full_requests
+
+
+def _record_requisite_visits(portal, monkeypatch):
+    visits = []
+    requisites_page = portal._requisites
+
+    def _record(session):
+        visits.append((session.term, f'{session.course.department} {session.course.number}'))
+        return requisites_page(session)
+
+    monkeypatch.setattr(portal, '_requisites', _record)
+    return visits
+
+
+def _courses_with_requisites(portal):
+    return {(term, f'{section.department} {section.number}')
+            for term, sections in portal.catalog.items() for section in sections if section.requisites}
+
+
+def test_requisite_cache_resolves_every_course_once(portal_factory, monkeypatch):
+    # most courses of the catalog have several sections sharing their requisites
+    portal = portal_factory(terms=1, courses=60, page_size=20)
+    visits = _record_requisite_visits(portal, monkeypatch)
+    expected = _courses_with_requisites(portal)
+    sections = sum(bool(section.requisites) for sections in portal.catalog.values() for section in sections)
+    assert len(expected) < sections
+
+    cache = RequisiteCache()
+    courses = AsyncCourseScraper('student', 'password', None, requisite_cache=cache, team_size=1).start_and_wait()
+    assert course_keys(courses) == catalog_keys(portal)
+    assert sorted(visits) == sorted(expected) and len(cache) == len(expected)
+
+    # kept across runs, the requisite pages are not visited again until the cache is invalidated
+    visits.clear()
+    courses = AsyncCourseScraper('student', 'password', None, requisite_cache=cache, team_size=1).start_and_wait()
+    assert course_keys(courses) == catalog_keys(portal) and visits == []
+
+    cache.invalidate()
+    AsyncCourseScraper('student', 'password', None, requisite_cache=cache, team_size=1).start_and_wait()
+    assert sorted(visits) == sorted(expected)
+
+
+def test_requisite_cache_per_term(portal_factory, monkeypatch):
+    # the stand-in gives a course other requisites in every term
+    portal = portal_factory(terms=2, courses=60, page_size=20)
+    visits = _record_requisite_visits(portal, monkeypatch)
+    expected = _courses_with_requisites(portal)
+
+    cache = RequisiteCache(per_term=True)
+    courses = AsyncCourseScraper('student', 'password', None, requisite_cache=cache, team_size=1).start_and_wait()
+    assert course_keys(courses) == catalog_keys(portal)
+    assert sorted(visits) == sorted(expected)
+
+    # invalidating a term only resolves the requisites of its courses again
+    term = portal.terms[0][0]
+    visits.clear()
+    cache.invalidate(term)
+    courses = AsyncCourseScraper('student', 'password', None, requisite_cache=cache, team_size=1).start_and_wait()
+    assert course_keys(courses) == catalog_keys(portal)
+    assert sorted(visits) == sorted(key for key in expected if key[0] == term)
@@ -0,0 +1,49 @@
+import os
+import stat
+
+from gccutils.scraper_utils import ScraperUtils
+from gccutils.session_store import SessionStore
+
+
+def _count_logins(portal, monkeypatch):
+    logins = []
+    login = portal._login
+
+    def _record(session, data):
+        logins.append(data.get('userName'))
+        return login(session, data)
+
+    monkeypatch.setattr(portal, '_login', _record)
+    return logins
+
+
+def test_stored_session_skips_the_login(portal, monkeypatch, tmp_path):
+    logins = _count_logins(portal, monkeypatch)
+    store = SessionStore(str(tmp_path / 'sessions'))
+
+    ScraperUtils(session_store=store).perform_login('student', 'password')
+    assert logins == ['student']
+
+    path = store.path('student')
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+    assert stat.S_IMODE(os.stat(store.directory).st_mode) == 0o700
+
+    # a new instance, such as that of a new process, restores the session without posting the login form
+    dc = ScraperUtils(session_store=store)
+    dc.perform_login('student', 'password')
+    assert logins == ['student'] and dc.is_logged_in()
+
+
+def test_expired_stored_session_logs_in_again(portal, monkeypatch, tmp_path):
+    logins = _count_logins(portal, monkeypatch)
+    store = SessionStore(str(tmp_path / 'sessions'))
+    ScraperUtils(session_store=store).perform_login('student', 'password')
+    with open(store.path('student')) as file:
+        stored = file.read()
+
+    portal._sessions.clear()  # the server forgets every session
+    dc = ScraperUtils(session_store=store)
+    dc.perform_login('student', 'password')
+    assert logins == ['student', 'student'] and dc.is_logged_in()
+    with open(store.path('student')) as file:
+        assert file.read() != stored  # the new session replaced the expired one